@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -11,10 +11,82 @@ class Settings(BaseSettings):
     # Qdrant Configuration
     qdrant_url: str = "http://localhost:6333"
     qdrant_api_key: Optional[str] = None
-    collection_name: str = "documents"
-    qdrant_timeout: float = 60.0
+    collection_name: str = "documents"  # Collection name or alias
+    qdrant_timeout: float = 10.0  # Client-side cap; requests also get their deadline
     prefetch_limit: int = 25
 
+    # Several Qdrant nodes instead of qdrant_url: a list of shards (disjoint
+    # parts of the collection, queried in parallel and merged by score), each
+    # a list of replica URLs. Replicas are chosen by observed latency; a call
+    # slower than the replica's recent hedge percentile is sent to another.
+    qdrant_shards: List[List[str]] = []
+    qdrant_hedge_percentile: float = 95.0
+
+    # Retriever: "qdrant", or "local" to search an Arrow export in process
+    # (FAISS dense index, BM25 inverted index and numpy MaxSim), without Qdrant
+    retriever_backend: str = "qdrant"
+    local_index_path: Optional[str] = None
+
+    # ColBERT rerank: "always", or "adaptive" to skip it when the dense and
+    # BM25 prefetches agree on at least rerank_skip_overlap of the top results
+    rerank_mode: str = "always"
+    rerank_skip_overlap: float = 0.8
+
+    # Where the ColBERT rerank runs: "qdrant" (multivectors in the collection)
+    # or "local" (numpy MaxSim over the store written by ingestion)
+    rerank_backend: str = "qdrant"
+    colbert_store_path: Optional[str] = None
+
+    # Request deadline: clients may ask for a shorter one in X-Request-Timeout-Ms.
+    # Embedding, retrieval, LLM first token and LLM completion each get what is
+    # left of it, and the request fails with 504 naming the stage that ran out.
+    request_timeout_ms: float = 30000.0
+
+    # Streaming: consecutive text deltas are sent as one SSE frame once the
+    # buffered text reaches stream_flush_chars or is stream_flush_ms old
+    # (0 sends every delta as it arrives)
+    stream_flush_ms: float = 50.0
+    stream_flush_chars: int = 256
+    # Requests answered at once over one /openai/ws connection
+    ws_max_requests: int = 16
+    # Messages queued for a client that reads slowly before its requests wait
+    ws_send_queue: int = 256
+
+    # Load-aware degradation: step down from hybrid + ColBERT to hybrid RRF to
+    # dense-only when in-flight retrievals or their recent p95 exceed the limits
+    load_policy_enabled: bool = False
+    load_max_inflight: int = 8
+    load_target_p95_ms: float = 500.0
+    load_cooldown_seconds: float = 5.0
+
+    # Search result cache (0, the default, disables it), emptied when the
+    # collection version changes; checked every result_cache_check_seconds.
+    # The version is the alias target, its points count and the modification
+    # times of the docstore and ColBERT store, so it misses writes that keep
+    # the count: payload updates and upserts over existing IDs. Enable it only
+    # when the collection is rebuilt or appended to, never edited in place.
+    result_cache_size: int = 0
+    result_cache_check_seconds: float = 5.0
+
+    # Conversation sessions (/sessions), kept in memory and expired after
+    # session_ttl_seconds idle. Follow-ups reuse the previous retrieval while
+    # their dense cosine similarity to the query that made it stays above
+    # session_topic_similarity; history is cut to session_history_tokens.
+    session_ttl_seconds: float = 1800.0
+    session_max_sessions: int = 10000
+    session_topic_similarity: float = 0.6
+    session_history_tokens: int = 2000
+
+    # Document store: chunk texts fetched by point ID instead of from Qdrant payloads
+    docstore_path: Optional[str] = None
+
+    # PCA projections for reduced dense vectors, written by ingestion as
+    # <collection>.npz. The one of the collection the alias points to is
+    # applied to queries, looked up again every dense_projection_check_seconds.
+    # The local retriever reads the projection saved next to its export.
+    dense_projection_dir: Optional[str] = None
+    dense_projection_check_seconds: float = 5.0
+
     # Model Configuration
     dense_model_name: str = (
         "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
@@ -24,6 +96,8 @@ class Settings(BaseSettings):
 
     # OpenAI Configuration
     openai_api_key: Optional[str] = None
+    # Another Responses API server, e.g. benchmarks/fake_openai.py in load tests
+    openai_base_url: Optional[str] = None
     openai_model: str = "gpt-4o-mini"
     openai_temperature: float = 0.5
     openai_max_output_tokens: int = 4096
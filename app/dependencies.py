@@ -0,0 +1,78 @@
+from functools import lru_cache
+from typing import Optional, Union
+from fastapi import Header
+from app.config.settings import Settings
+from app.services.deadline import Deadline, current_deadline
+from app.services.embedder import QueryEmbedder
+from app.services.load_policy import LoadPolicy
+from app.services.local_retriever import LocalHybridRetriever
+from app.services.openai_service import OpenAIService
+from app.services.projection import CollectionProjection
+from app.services.retriever import QdrantRetriever
+from app.services.sessions import SessionStore, token_counter
+
+# Shared by all requests of the process: the embedding models are loaded
+# once and the load policy sees every in-flight request.
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+@lru_cache
+def get_embedder() -> QueryEmbedder:
+    settings = get_settings()
+    return QueryEmbedder(
+        dense_model_name=settings.dense_model_name,
+        bm25_model_name=settings.bm25_model_name,
+        late_interaction_model_name=settings.late_interaction_model_name,
+        # Follows the collection the retriever serves, across alias swaps
+        dense_projection=CollectionProjection(
+            get_retriever().dense_projection_source,
+            settings.dense_projection_check_seconds,
+        ),
+    )
+
+
+@lru_cache
+def get_retriever() -> Union[QdrantRetriever, LocalHybridRetriever]:
+    settings = get_settings()
+    if settings.retriever_backend == "local":
+        return LocalHybridRetriever(settings=settings)
+    return QdrantRetriever(settings=settings)
+
+
+@lru_cache
+def get_openai_service() -> OpenAIService:
+    return OpenAIService(settings=get_settings())
+
+
+@lru_cache
+def get_load_policy() -> LoadPolicy:
+    return LoadPolicy(settings=get_settings())
+
+
+@lru_cache
+def get_session_store() -> SessionStore:
+    settings = get_settings()
+    return SessionStore(
+        ttl_seconds=settings.session_ttl_seconds,
+        max_sessions=settings.session_max_sessions,
+        topic_similarity=settings.session_topic_similarity,
+        history_tokens=settings.session_history_tokens,
+        count_tokens=token_counter(settings.openai_model),
+    )
+
+
+async def get_deadline(
+    x_request_timeout_ms: Optional[float] = Header(default=None),
+) -> Deadline:
+    # Clients can shorten the default budget, never extend it. Set here, in
+    # the request's task, so threadpool calls made by the endpoint see it.
+    budget_ms = get_settings().request_timeout_ms
+    if x_request_timeout_ms is not None and x_request_timeout_ms > 0:
+        budget_ms = min(budget_ms, x_request_timeout_ms)
+    deadline = Deadline(budget_ms / 1000)
+    current_deadline.set(deadline)
+    return deadline
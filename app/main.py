@@ -1,7 +1,15 @@
-from fastapi import FastAPI
-from app.config.settings import Settings
+from fastapi import Depends, FastAPI
 from app.routers.search import router as search_router
 from app.routers.openai import router as openai_router
+from app.routers.sessions import router as sessions_router
+from app.services.cluster import QdrantCluster
+from app.services.metrics import metrics
+from app.dependencies import (
+    get_load_policy,
+    get_retriever,
+    get_session_store,
+    get_settings,
+)
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
@@ -12,10 +20,6 @@ logging.basicConfig(
 )
 
 
-def get_settings():
-    return Settings()
-
-
 def create_application():
     # Initialize settings
     settings = get_settings()
@@ -41,6 +45,7 @@ def create_application():
     # Add routers
     app.include_router(search_router)
     app.include_router(openai_router)
+    app.include_router(sessions_router)
 
     @app.get("/")
     async def root():
@@ -51,6 +56,24 @@ def create_application():
         logging.info("Health endpoint was called")
         return {"status": "Ok"}
 
+    @app.get("/metrics")
+    async def get_metrics(
+        retriever=Depends(get_retriever),
+        load_policy=Depends(get_load_policy),
+        sessions=Depends(get_session_store),
+    ):
+        cache = retriever.result_cache
+        cluster = getattr(retriever, "client", None)
+        return {
+            **metrics.snapshot(),
+            "load_policy": load_policy.state(),
+            "result_cache": cache.state() if cache is not None else None,
+            "sessions": sessions.state(),
+            "qdrant_cluster": (
+                cluster.state() if isinstance(cluster, QdrantCluster) else None
+            ),
+        }
+
     return app
 
 
@@ -1,15 +1,26 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from app.models.embeddings import Document
 
 
+class SearchFilters(BaseModel):
+    # Entity group -> accepted values, e.g. {"LEGISLACAO": ["Lei nº 5.194"]}
+    entities: Optional[Dict[str, List[str]]] = None
+    headings: Optional[List[str]] = None
+    page_numbers: Optional[List[int]] = None
+    chunk_ids: Optional[List[int]] = None
+    sources: Optional[List[str]] = None
+
+
 class SearchRequest(BaseModel):
     query: str
     limit: Optional[int] = 5
+    filters: Optional[SearchFilters] = None
 
 
 class SearchResponse(BaseModel):
     results: List[Document]
+    tier: Optional[str] = None  # Retrieval tier used (see load_policy.TIERS)
 
 
 class OpenAIRequest(BaseModel):
@@ -18,8 +29,25 @@ class OpenAIRequest(BaseModel):
     temperature: Optional[float] = None
     max_output_tokens: Optional[int] = None
     limit: Optional[int] = 5
+    filters: Optional[SearchFilters] = None
 
 
 class OpenAIResponse(BaseModel):
     answer: str
     source_documents: List[Document]
+    tier: Optional[str] = None
+
+
+class SessionTurn(BaseModel):
+    query: str
+    answer: str
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    turns: List[SessionTurn] = []  # Only the turns kept within the token budget
+
+
+class SessionMessageResponse(OpenAIResponse):
+    session_id: str
+    reused_retrieval: bool  # Documents of the previous turn, without a new search
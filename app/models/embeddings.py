@@ -9,8 +9,10 @@ class SparseVector(BaseModel):
 
 class QueryEmbeddings(BaseModel):
     dense: List[float]
-    sparse_bm25: SparseVector
-    late: List[List[float]]
+    # Omitted for dense-only retrieval
+    sparse_bm25: Optional[SparseVector] = None
+    # Omitted when the ColBERT rerank may be skipped (computed on demand)
+    late: Optional[List[List[float]]] = None
 
 
 class Document(BaseModel):
@@ -1,40 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from app.models.api import OpenAIRequest, OpenAIResponse
-from app.services.retriever import QdrantRetriever
+from app.services.retriever import QdrantRetriever, SearchUnavailable
+from app.services.deadline import Deadline, DeadlineExceeded, current_deadline
 from app.services.embedder import QueryEmbedder
 from app.services.openai_service import OpenAIService
+from app.services.load_policy import LoadPolicy
+from app.services.pipeline import retrieve
+from app.services.sse import (
+    coalesce_deltas,
+    coalesce_events,
+    documents_event,
+    documents_frame,
+    frame,
+)
 from app.config.settings import Settings
+from app.dependencies import (
+    get_deadline,
+    get_embedder,
+    get_load_policy,
+    get_openai_service,
+    get_retriever,
+    get_settings,
+)
 from langsmith import traceable
+from pydantic import ValidationError
+import asyncio
 import logging
-import json
-from typing import AsyncGenerator
+import orjson
+from typing import Any, AsyncGenerator, Dict
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/openai", tags=["openai"])
 
 
-def get_settings():
-    return Settings()
-
-
-def get_embedder(settings: Settings = Depends(get_settings)):
-    return QueryEmbedder(
-        dense_model_name=settings.dense_model_name,
-        bm25_model_name=settings.bm25_model_name,
-        late_interaction_model_name=settings.late_interaction_model_name,
-    )
-
-
-def get_retriever(settings: Settings = Depends(get_settings)):
-    return QdrantRetriever(settings=settings)
-
-
-def get_openai_service(settings: Settings = Depends(get_settings)):
-    return OpenAIService(settings=settings)
-
-
 @traceable(name="rag_pipeline")
 @router.post("", response_model=OpenAIResponse)
 async def generate_openai_response(
@@ -42,30 +43,56 @@ async def generate_openai_response(
     embedder: QueryEmbedder = Depends(get_embedder),
     retriever: QdrantRetriever = Depends(get_retriever),
     openai_service: OpenAIService = Depends(get_openai_service),
+    load_policy: LoadPolicy = Depends(get_load_policy),
+    deadline: Deadline = Depends(get_deadline),
 ):
     try:
-        query_embeddings = embedder.embed_query(request.query)
-
-        context_documents = retriever.search_documents(
-            embeddings=query_embeddings, limit=request.limit
-        )
+        with load_policy.track() as tier:
+            context_documents = await deadline.run(
+                run_in_threadpool(
+                    retrieve,
+                    embedder,
+                    retriever,
+                    request.query,
+                    request.limit,
+                    request.filters,
+                    tier,
+                    deadline,
+                ),
+                stage="retrieval",
+            )
 
         if not context_documents:
             logger.warning(
                 "No relevant documents found for query", extra={"query": request.query}
             )
 
-        answer = openai_service.generate_response(
-            query=request.query,
-            context_documents=context_documents,
-            model=request.model,
-            temperature=request.temperature,
-            max_output_tokens=request.max_output_tokens,
+        # The HTTP call itself is bounded too, so the worker thread is freed
+        deadline.enter("llm_completion")
+        answer = await deadline.run(
+            run_in_threadpool(
+                openai_service.generate_response,
+                query=request.query,
+                context_documents=context_documents,
+                model=request.model,
+                temperature=request.temperature,
+                max_output_tokens=request.max_output_tokens,
+                timeout=deadline.remaining(),
+            )
         )
 
-        return OpenAIResponse(answer=answer, source_documents=context_documents)
+        return OpenAIResponse(
+            answer=answer, source_documents=context_documents, tier=tier
+        )
 
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
+        # A dependency gave up on the timeout the deadline handed it
+        if deadline.remaining() == 0:
+            raise HTTPException(status_code=504, detail=str(deadline.exceeded()))
+        if isinstance(e, SearchUnavailable):
+            raise HTTPException(status_code=503, detail=str(e))
         logger.error(
             "OpenAI generation failed", extra={"error": str(e), "query": request.query}
         )
@@ -82,43 +109,63 @@ async def generate_openai_stream_response(
     embedder: QueryEmbedder = Depends(get_embedder),
     retriever: QdrantRetriever = Depends(get_retriever),
     openai_service: OpenAIService = Depends(get_openai_service),
+    load_policy: LoadPolicy = Depends(get_load_policy),
+    deadline: Deadline = Depends(get_deadline),
+    settings: Settings = Depends(get_settings),
 ):
     try:
-        query_embeddings = embedder.embed_query(request.query)
-
-        context_documents = retriever.search_documents(
-            embeddings=query_embeddings, limit=request.limit
-        )
+        with load_policy.track() as tier:
+            context_documents = await deadline.run(
+                run_in_threadpool(
+                    retrieve,
+                    embedder,
+                    retriever,
+                    request.query,
+                    request.limit,
+                    request.filters,
+                    tier,
+                    deadline,
+                ),
+                stage="retrieval",
+            )
 
         if not context_documents:
             logger.warning(
                 "No relevant documents found for query", extra={"query": request.query}
             )
 
-        async def event_generator() -> AsyncGenerator[str, None]:
+        # Serialized once, before the stream starts
+        sources = documents_frame(tier, context_documents)
+
+        async def event_generator() -> AsyncGenerator[bytes, None]:
             try:
                 # First, send the source documents
-                yield f"data: {json.dumps({'type': 'source_documents', 'documents': [doc.model_dump() for doc in context_documents]})}\n\n"
+                yield sources
 
-                # Then stream the response
-                async for chunk in openai_service.generate_stream_response(
-                    query=request.query,
-                    context_documents=context_documents,
-                    model=request.model,
-                    temperature=request.temperature,
-                    max_output_tokens=request.max_output_tokens,
+                # Then stream the response, text deltas merged into fewer frames
+                async for data in coalesce_deltas(
+                    openai_service.generate_stream_response(
+                        query=request.query,
+                        context_documents=context_documents,
+                        model=request.model,
+                        temperature=request.temperature,
+                        max_output_tokens=request.max_output_tokens,
+                        deadline=deadline,
+                    ),
+                    flush_ms=settings.stream_flush_ms,
+                    flush_chars=settings.stream_flush_chars,
                 ):
-                    yield f"data: {chunk}\n\n"
+                    yield data
 
                 # Send completion event
-                yield f"data: {json.dumps({'type': 'stream_completed'})}\n\n"
+                yield frame({"type": "stream_completed"})
 
             except Exception as e:
                 logger.error(
                     "Stream generation failed",
                     extra={"error": str(e), "query": request.query},
                 )
-                yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+                yield frame({"type": "error", "message": str(e)})
 
         return StreamingResponse(
             event_generator(),
@@ -130,7 +177,14 @@ async def generate_openai_stream_response(
             },
         )
 
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
+        # A dependency gave up on the timeout the deadline handed it
+        if deadline.remaining() == 0:
+            raise HTTPException(status_code=504, detail=str(deadline.exceeded()))
+        if isinstance(e, SearchUnavailable):
+            raise HTTPException(status_code=503, detail=str(e))
         logger.error(
             "OpenAI stream generation failed",
             extra={"error": str(e), "query": request.query},
@@ -138,3 +192,158 @@ async def generate_openai_stream_response(
         raise HTTPException(
             status_code=500, detail=f"OpenAI stream generation failed: {str(e)}"
         )
+
+
+# WebSocket API
+@router.websocket("/ws")
+async def generate_openai_websocket(
+    websocket: WebSocket,
+    embedder: QueryEmbedder = Depends(get_embedder),
+    retriever: QdrantRetriever = Depends(get_retriever),
+    openai_service: OpenAIService = Depends(get_openai_service),
+    load_policy: LoadPolicy = Depends(get_load_policy),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Many RAG requests over one connection.
+
+    Client messages are {"type": "request", "request_id": ..., <OpenAIRequest
+    fields>, "timeout_ms": optional} and {"type": "cancel", "request_id": ...}.
+    Every server message is one event of /openai/stream tagged with its
+    request_id, plus "cancelled" for a cancelled request.
+    """
+    await websocket.accept()
+    # Bounded, so a client that reads slowly makes the requests wait instead
+    # of piling up their events in memory
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.ws_send_queue)
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def send(request_id: str, event: Dict[str, Any]):
+        await outbox.put(orjson.dumps({**event, "request_id": request_id}))
+
+    async def writer():
+        # A single writer, so events of concurrent requests never interleave
+        while True:
+            data = await outbox.get()
+            await websocket.send_text(data.decode())
+
+    async def answer(request_id: str, request: OpenAIRequest, budget_ms: float):
+        deadline = Deadline(budget_ms / 1000)
+        current_deadline.set(deadline)
+        try:
+            with load_policy.track() as tier:
+                context_documents = await deadline.run(
+                    run_in_threadpool(
+                        retrieve,
+                        embedder,
+                        retriever,
+                        request.query,
+                        request.limit,
+                        request.filters,
+                        tier,
+                        deadline,
+                    ),
+                    stage="retrieval",
+                )
+            await outbox.put(
+                documents_event(tier, context_documents, request_id=request_id)
+            )
+
+            async for batch in coalesce_events(
+                openai_service.generate_stream_response(
+                    query=request.query,
+                    context_documents=context_documents,
+                    model=request.model,
+                    temperature=request.temperature,
+                    max_output_tokens=request.max_output_tokens,
+                    deadline=deadline,
+                ),
+                flush_ms=settings.stream_flush_ms,
+                flush_chars=settings.stream_flush_chars,
+            ):
+                for event in batch:
+                    await send(request_id, event)
+            await send(request_id, {"type": "stream_completed"})
+
+        except asyncio.CancelledError:
+            # Never wait here: on disconnect nobody drains the outbox any more
+            try:
+                outbox.put_nowait(
+                    orjson.dumps({"type": "cancelled", "request_id": request_id})
+                )
+            except asyncio.QueueFull:
+                pass
+            raise
+        except DeadlineExceeded as e:
+            await send(
+                request_id, {"type": "error", "stage": e.stage, "message": str(e)}
+            )
+        except Exception as e:
+            logger.error(
+                "WebSocket request failed",
+                extra={"error": str(e), "query": request.query},
+            )
+            await send(request_id, {"type": "error", "message": str(e)})
+        finally:
+            tasks.pop(request_id, None)
+
+    writer_task = asyncio.create_task(writer())
+    try:
+        while True:
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            try:
+                # Binary frames are not messages of this protocol
+                text = received.get("text")
+                message = orjson.loads(text) if text is not None else None
+            except orjson.JSONDecodeError:
+                message = None
+            if not isinstance(message, dict):
+                await send("", {"type": "error", "message": "Invalid message"})
+                continue
+            request_id = str(message.get("request_id", ""))
+
+            if message.get("type") == "cancel":
+                task = tasks.get(request_id)
+                if task is not None:
+                    task.cancel()
+                continue
+
+            if message.get("type") != "request" or not request_id:
+                await send(request_id, {"type": "error", "message": "Invalid message"})
+                continue
+            if request_id in tasks:
+                await send(
+                    request_id, {"type": "error", "message": "Duplicate request_id"}
+                )
+                continue
+            if len(tasks) >= settings.ws_max_requests:
+                await send(
+                    request_id, {"type": "error", "message": "Too many requests"}
+                )
+                continue
+
+            try:
+                request = OpenAIRequest.model_validate(message)
+            except ValidationError as e:
+                await send(request_id, {"type": "error", "message": str(e)})
+                continue
+
+            # As with X-Request-Timeout-Ms, clients can only shorten the budget
+            budget_ms = settings.request_timeout_ms
+            timeout_ms = message.get("timeout_ms")
+            if isinstance(timeout_ms, (int, float)) and timeout_ms > 0:
+                budget_ms = min(budget_ms, timeout_ms)
+            tasks[request_id] = asyncio.create_task(
+                answer(request_id, request, budget_ms)
+            )
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Nobody is left to read the answers: stop them and their upstream calls
+        running = [*tasks.values(), writer_task]
+        for task in running:
+            task.cancel()
+        await asyncio.wait(running)
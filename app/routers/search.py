@@ -1,44 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.models.api import SearchRequest, SearchResponse
-from app.services.retriever import QdrantRetriever
+from app.services.retriever import QdrantRetriever, SearchUnavailable
+from app.services.deadline import Deadline, DeadlineExceeded
 from app.services.embedder import QueryEmbedder
-from app.config.settings import Settings
+from app.services.load_policy import LoadPolicy
+from app.services.pipeline import retrieve
+from app.dependencies import (
+    get_deadline,
+    get_embedder,
+    get_load_policy,
+    get_retriever,
+)
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/search", tags=["search"])
 
 
-def get_settings():
-    return Settings()
-
-
-def get_embedder(settings: Settings = Depends(get_settings)):
-    return QueryEmbedder(
-        dense_model_name=settings.dense_model_name,
-        bm25_model_name=settings.bm25_model_name,
-        late_interaction_model_name=settings.late_interaction_model_name,
-    )
-
-
-def get_retriever(settings: Settings = Depends(get_settings)):
-    return QdrantRetriever(settings=settings)
-
-
 @router.post("", response_model=SearchResponse)
 async def search_documents(
     request: SearchRequest,
     embedder: QueryEmbedder = Depends(get_embedder),
     retriever: QdrantRetriever = Depends(get_retriever),
+    load_policy: LoadPolicy = Depends(get_load_policy),
+    deadline: Deadline = Depends(get_deadline),
 ):
     try:
-        # Generate embeddings for the query
-        query_embeddings = embedder.embed_query(request.query)
-
-        # Search documents using the generated embeddings
-        results = retriever.search_documents(
-            embeddings=query_embeddings, limit=request.limit
-        )
-
-        return SearchResponse(results=results)
-
+        # Embed and search off the event loop, in the tier the load allows
+        with load_policy.track() as tier:
+            results = await deadline.run(
+                run_in_threadpool(
+                    retrieve,
+                    embedder,
+                    retriever,
+                    request.query,
+                    request.limit,
+                    request.filters,
+                    tier,
+                    deadline,
+                ),
+                stage="search",
+            )
+
+        return SearchResponse(results=results, tier=tier)
+
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
+        # A dependency gave up on the timeout the deadline handed it
+        if deadline.remaining() == 0:
+            raise HTTPException(status_code=504, detail=str(deadline.exceeded()))
+        if isinstance(e, SearchUnavailable):
+            raise HTTPException(status_code=503, detail=str(e))
+        logger.error("Search failed", extra={"error": str(e), "query": request.query})
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
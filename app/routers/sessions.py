@@ -0,0 +1,251 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.models.api import (
+    OpenAIRequest,
+    SessionMessageResponse,
+    SessionResponse,
+    SessionTurn,
+)
+from app.models.embeddings import Document
+from app.services.retriever import QdrantRetriever, SearchUnavailable
+from app.services.deadline import Deadline, DeadlineExceeded
+from app.services.embedder import QueryEmbedder
+from app.services.openai_service import OpenAIService
+from app.services.load_policy import LoadPolicy
+from app.services.pipeline import retrieve
+from app.services.sessions import Session, SessionStore
+from app.services.sse import coalesce_deltas, documents_frame, frame
+from app.config.settings import Settings
+from app.dependencies import (
+    get_deadline,
+    get_embedder,
+    get_load_policy,
+    get_openai_service,
+    get_retriever,
+    get_session_store,
+    get_settings,
+)
+import logging
+from typing import AsyncGenerator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/sessions", tags=["sessions"])
+
+
+def get_session(
+    session_id: str, store: SessionStore = Depends(get_session_store)
+) -> Session:
+    session = store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+
+async def session_documents(
+    request: OpenAIRequest,
+    session: Session,
+    store: SessionStore,
+    embedder: QueryEmbedder,
+    retriever: QdrantRetriever,
+    load_policy: LoadPolicy,
+    deadline: Deadline,
+) -> Tuple[List[Document], str, bool]:
+    """
+    Documents for a turn: the previous retrieval while the topic holds,
+    otherwise a new search reusing the dense vector of the topic check.
+    """
+    deadline.enter("embedding")
+    dense = await deadline.run(run_in_threadpool(embedder.embed_dense, request.query))
+
+    # The result cache's version also tells when the collection was re-ingested
+    version = (
+        await run_in_threadpool(retriever.result_cache.current_version)
+        if retriever.result_cache is not None
+        else None
+    )
+    cached = store.cached_documents(
+        session, dense, request.limit, request.filters, version
+    )
+    if cached is not None:
+        return cached.documents, cached.tier, True
+
+    with load_policy.track() as tier:
+        documents = await deadline.run(
+            run_in_threadpool(
+                retrieve,
+                embedder,
+                retriever,
+                request.query,
+                request.limit,
+                request.filters,
+                tier,
+                deadline,
+                dense,
+            ),
+            stage="retrieval",
+        )
+    store.remember_retrieval(
+        session, dense, request.limit, request.filters, tier, documents, version
+    )
+    return documents, tier, False
+
+
+@router.post("", response_model=SessionResponse)
+async def create_session(store: SessionStore = Depends(get_session_store)):
+    return SessionResponse(session_id=store.create().id)
+
+
+@router.get("/{session_id}", response_model=SessionResponse)
+async def get_session_turns(session: Session = Depends(get_session)):
+    return SessionResponse(
+        session_id=session.id,
+        turns=[SessionTurn(query=t.query, answer=t.answer) for t in session.turns],
+    )
+
+
+@router.delete("/{session_id}")
+async def delete_session(
+    session_id: str, store: SessionStore = Depends(get_session_store)
+):
+    if not store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"deleted": session_id}
+
+
+@router.post("/{session_id}/messages", response_model=SessionMessageResponse)
+async def send_message(
+    request: OpenAIRequest,
+    session: Session = Depends(get_session),
+    store: SessionStore = Depends(get_session_store),
+    embedder: QueryEmbedder = Depends(get_embedder),
+    retriever: QdrantRetriever = Depends(get_retriever),
+    openai_service: OpenAIService = Depends(get_openai_service),
+    load_policy: LoadPolicy = Depends(get_load_policy),
+    deadline: Deadline = Depends(get_deadline),
+):
+    try:
+        context_documents, tier, reused = await session_documents(
+            request, session, store, embedder, retriever, load_policy, deadline
+        )
+
+        deadline.enter("llm_completion")
+        answer = await deadline.run(
+            run_in_threadpool(
+                openai_service.generate_response,
+                query=request.query,
+                context_documents=context_documents,
+                model=request.model,
+                temperature=request.temperature,
+                max_output_tokens=request.max_output_tokens,
+                timeout=deadline.remaining(),
+                history=store.history(session),
+            )
+        )
+        store.add_turn(session, request.query, answer)
+
+        return SessionMessageResponse(
+            session_id=session.id,
+            answer=answer,
+            source_documents=context_documents,
+            tier=tier,
+            reused_retrieval=reused,
+        )
+
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        # A dependency gave up on the timeout the deadline handed it
+        if deadline.remaining() == 0:
+            raise HTTPException(status_code=504, detail=str(deadline.exceeded()))
+        if isinstance(e, SearchUnavailable):
+            raise HTTPException(status_code=503, detail=str(e))
+        logger.error(
+            "Session message failed", extra={"error": str(e), "query": request.query}
+        )
+        raise HTTPException(status_code=500, detail=f"Session message failed: {str(e)}")
+
+
+@router.post("/{session_id}/messages/stream")
+async def send_message_stream(
+    request: OpenAIRequest,
+    session: Session = Depends(get_session),
+    store: SessionStore = Depends(get_session_store),
+    embedder: QueryEmbedder = Depends(get_embedder),
+    retriever: QdrantRetriever = Depends(get_retriever),
+    openai_service: OpenAIService = Depends(get_openai_service),
+    load_policy: LoadPolicy = Depends(get_load_policy),
+    deadline: Deadline = Depends(get_deadline),
+    settings: Settings = Depends(get_settings),
+):
+    try:
+        context_documents, tier, reused = await session_documents(
+            request, session, store, embedder, retriever, load_policy, deadline
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        if deadline.remaining() == 0:
+            raise HTTPException(status_code=504, detail=str(deadline.exceeded()))
+        if isinstance(e, SearchUnavailable):
+            raise HTTPException(status_code=503, detail=str(e))
+        logger.error(
+            "Session message failed", extra={"error": str(e), "query": request.query}
+        )
+        raise HTTPException(status_code=500, detail=f"Session message failed: {str(e)}")
+
+    sources = documents_frame(tier, context_documents)
+    history = store.history(session)
+
+    async def recorded_events():
+        # The answer is kept as a turn only once the model completed it
+        parts = []
+        async for event in openai_service.generate_stream_response(
+            query=request.query,
+            context_documents=context_documents,
+            model=request.model,
+            temperature=request.temperature,
+            max_output_tokens=request.max_output_tokens,
+            deadline=deadline,
+            history=history,
+        ):
+            if event["type"] == "text_delta":
+                parts.append(event["delta"])
+            elif event["type"] == "response.completed":
+                store.add_turn(session, request.query, "".join(parts))
+            yield event
+
+    async def event_generator() -> AsyncGenerator[bytes, None]:
+        try:
+            yield sources + frame(
+                {
+                    "type": "session",
+                    "session_id": session.id,
+                    "reused_retrieval": reused,
+                }
+            )
+            async for data in coalesce_deltas(
+                recorded_events(),
+                flush_ms=settings.stream_flush_ms,
+                flush_chars=settings.stream_flush_chars,
+            ):
+                yield data
+            yield frame({"type": "stream_completed"})
+
+        except Exception as e:
+            logger.error(
+                "Session stream failed",
+                extra={"error": str(e), "query": request.query},
+            )
+            yield frame({"type": "error", "message": str(e)})
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable Nginx buffering
+        },
+    )
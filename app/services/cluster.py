@@ -0,0 +1,217 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Sequence
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import QueryRequest, QueryResponse, ScoredPoint
+from app.services.metrics import metrics, percentile
+import threading
+import time
+
+EWMA_ALPHA = 0.2  # Weight of the newest latency sample
+MIN_HEDGE_SAMPLES = 20  # Samples before a replica's p95 is trusted
+DEFAULT_HEDGE_SECONDS = 0.1  # Hedge delay until then
+MIN_HEDGE_SECONDS = 0.005
+REQUEST_WORKERS = 32  # Threads issuing requests to all replicas
+
+
+class Replica:
+    """
+    One Qdrant node with its observed latency.
+    """
+
+    def __init__(self, name: str, client: QdrantClient, window: int = 200):
+        self.name = name
+        self.client = client
+        self.ewma = 0.0  # Seconds; 0 until the first response
+        self.inflight = 0
+        self.recent = deque(maxlen=window)
+
+    def cost(self) -> float:
+        # Latency weighted by queued work, so one fast node is not swamped
+        return self.ewma * (self.inflight + 1)
+
+
+class ReplicaSet:
+    """
+    Replicas holding the same data. Each call goes to the replica with the
+    lowest observed cost; if it is still running after that replica's
+    recent p95, the call is hedged to the next one and the first answer wins.
+    Failed calls are retried on the remaining replicas.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        executor: ThreadPoolExecutor,
+        hedge_percentile: float = 95.0,
+    ):
+        self.replicas = replicas
+        self.executor = executor
+        self.hedge_percentile = hedge_percentile
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, replica: Replica) -> float:
+        with self._lock:
+            if len(replica.recent) < MIN_HEDGE_SAMPLES:
+                return DEFAULT_HEDGE_SECONDS
+            return max(
+                MIN_HEDGE_SECONDS, percentile(replica.recent, self.hedge_percentile)
+            )
+
+    def _run(self, replica: Replica, fn: Callable[[QdrantClient], Any]):
+        with self._lock:
+            replica.inflight += 1
+        start = time.perf_counter()
+        try:
+            result = fn(replica.client)
+        except Exception:
+            metrics.increment("qdrant.replica_errors")
+            with self._lock:
+                # Push failing replicas to the back until they answer again
+                replica.ewma = max(replica.ewma * 2, DEFAULT_HEDGE_SECONDS)
+            raise
+        finally:
+            with self._lock:
+                replica.inflight -= 1
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            replica.ewma = (
+                elapsed
+                if replica.ewma == 0.0
+                else EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * replica.ewma
+            )
+            replica.recent.append(elapsed)
+        metrics.observe(f"qdrant.{replica.name}.seconds", elapsed)
+        return result
+
+    def call(self, fn: Callable[[QdrantClient], Any]):
+        with self._lock:
+            candidates = sorted(self.replicas, key=Replica.cost)
+
+        if len(candidates) == 1:
+            return self._run(candidates[0], fn)
+
+        pending, error, hedged = set(), None, False
+        for replica in candidates:
+            pending.add(self.executor.submit(self._run, replica, fn))
+            # After one hedge, further replicas are only tried on errors
+            timeout = None if hedged else self.hedge_delay(replica)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not done:
+                hedged = True
+                metrics.increment("qdrant.hedged")
+
+        # Every replica was tried; take the first in-flight one that succeeds
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def state(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "name": r.name,
+                    "ewma_ms": r.ewma * 1000,
+                    "inflight": r.inflight,
+                }
+                for r in self.replicas
+            ]
+
+
+def merge_by_score(responses: Sequence[QueryResponse], limit: int):
+    # Shards hold disjoint points; a point seen twice keeps its best score
+    best: Dict[Any, ScoredPoint] = {}
+    for response in responses:
+        for point in response.points:
+            if point.id not in best or point.score > best[point.id].score:
+                best[point.id] = point
+    points = sorted(best.values(), key=lambda point: point.score, reverse=True)
+    return QueryResponse(points=points[:limit])
+
+
+class QdrantCluster:
+    """
+    The query and retrieve methods of QdrantClient over several Qdrant nodes.
+
+    shards is a list of replica lists: each shard holds a disjoint part of
+    the collection and is queried in parallel, and the results are merged by
+    score. Dense, MaxSim and BM25 scores are comparable across shards (BM25
+    IDF is computed per shard, so only approximately).
+    """
+
+    def __init__(
+        self, shards: List[List[QdrantClient]], hedge_percentile: float = 95.0
+    ):
+        if not shards or not all(shards):
+            raise ValueError("QdrantCluster needs at least one replica per shard")
+
+        self.request_executor = ThreadPoolExecutor(max_workers=REQUEST_WORKERS)
+        # Shard calls block on their replica requests, so they get their own pool
+        self.scatter_executor = ThreadPoolExecutor(max_workers=REQUEST_WORKERS)
+        self.shards = [
+            ReplicaSet(
+                [
+                    Replica(f"shard{i}.replica{j}", client)
+                    for j, client in enumerate(replicas)
+                ],
+                self.request_executor,
+                hedge_percentile,
+            )
+            for i, replicas in enumerate(shards)
+        ]
+
+    @classmethod
+    def from_urls(cls, shard_urls: List[List[str]], hedge_percentile=95.0, **params):
+        return cls(
+            [[QdrantClient(url=url, **params) for url in urls] for urls in shard_urls],
+            hedge_percentile,
+        )
+
+    def map(self, fn: Callable[[QdrantClient], Any]) -> List[Any]:
+        """
+        Call fn on one replica of every shard, in parallel.
+        """
+        if len(self.shards) == 1:
+            return [self.shards[0].call(fn)]
+        futures = [self.scatter_executor.submit(s.call, fn) for s in self.shards]
+        return [future.result() for future in futures]
+
+    def query_points(self, limit: int = 10, **kwargs) -> QueryResponse:
+        responses = self.map(lambda client: client.query_points(limit=limit, **kwargs))
+        return merge_by_score(responses, limit)
+
+    def query_batch_points(
+        self, collection_name: str, requests: List[QueryRequest], **kwargs
+    ) -> List[QueryResponse]:
+        per_shard = self.map(
+            lambda client: client.query_batch_points(
+                collection_name=collection_name, requests=requests, **kwargs
+            )
+        )
+        return [
+            merge_by_score(
+                [responses[i] for responses in per_shard], request.limit or 10
+            )
+            for i, request in enumerate(requests)
+        ]
+
+    def retrieve(self, collection_name: str, ids: List[Any], **kwargs) -> List[Any]:
+        # Each shard returns the points it holds
+        per_shard = self.map(
+            lambda client: client.retrieve(
+                collection_name=collection_name, ids=ids, **kwargs
+            )
+        )
+        return [record for records in per_shard for record in records]
+
+    def state(self) -> List[List[Dict[str, Any]]]:
+        return [shard.state() for shard in self.shards]
@@ -0,0 +1,98 @@
+from typing import Dict, List, Sequence
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+
+
+def maxsim_scores(query: np.ndarray, documents: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Late-interaction MaxSim score of one query against many documents.
+
+    All document token vectors are scored in a single matmul, then reduced
+    per document with a segmented max.
+    """
+    lengths = np.array([len(d) for d in documents])
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    similarities = query @ np.concatenate(documents).T  # (query tokens, all tokens)
+    return np.maximum.reduceat(similarities, offsets, axis=1).sum(axis=0)
+
+
+class ColbertStore:
+    """
+    Read-only access to the ColBERT passage matrices written by ingestion
+    (ingestion/colbert_store.py). Token vectors are memory-mapped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._vectors = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{os.path.join(self.path, 'index.db')}?mode=ro", uri=True
+            )
+            self._local.connection = connection
+        return connection
+
+    def _mapped_vectors(self, rows_needed: int) -> np.ndarray:
+        # Re-map when ingestion appended rows after the last mapping
+        with self._lock:
+            if self._vectors is None or len(self._vectors) < rows_needed:
+                self._vectors = np.memmap(
+                    os.path.join(self.path, "vectors.bin"), dtype=self.dtype, mode="r"
+                ).reshape(-1, self.dim)
+            return self._vectors
+
+    def version(self) -> int:
+        # Appends rewrite the vectors file and the index, changing their mtimes
+        return max(entry.stat().st_mtime_ns for entry in os.scandir(self.path))
+
+    def get_many(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        if not ids:
+            return {}
+
+        placeholders = ",".join("?" * len(ids))
+        rows = (
+            self._connection()
+            .execute(
+                f"SELECT id, offset, length FROM vectors WHERE id IN ({placeholders})",
+                [str(point_id) for point_id in ids],
+            )
+            .fetchall()
+        )
+        if not rows:
+            return {}
+
+        vectors = self._mapped_vectors(
+            max(offset + length for _, offset, length in rows)
+        )
+        return {
+            point_id: np.asarray(vectors[offset : offset + length], dtype=np.float32)
+            for point_id, offset, length in rows
+        }
+
+    def rerank(self, query: List[List[float]], ids: Sequence[str]) -> List[str]:
+        """
+        Order candidate IDs by MaxSim. IDs missing from the store go last.
+        """
+        matrices = self.get_many(ids)
+        found = [str(point_id) for point_id in ids if str(point_id) in matrices]
+        if not found:
+            return [str(point_id) for point_id in ids]
+
+        scores = maxsim_scores(
+            np.asarray(query, dtype=np.float32), [matrices[i] for i in found]
+        )
+        ranked = [found[i] for i in np.argsort(-scores, kind="stable")]
+        return ranked + [str(i) for i in ids if str(i) not in matrices]
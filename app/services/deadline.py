@@ -0,0 +1,85 @@
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+from app.services.metrics import metrics
+import asyncio
+import math
+import time
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: Optional[str], budget: float):
+        self.stage = stage
+        self.budget = budget
+        super().__init__(
+            f"Request deadline of {budget * 1000:.0f} ms exceeded during {stage}"
+        )
+
+
+class Deadline:
+    """
+    Time by which a request must be answered.
+
+    Each stage runs with whatever budget is left and fails fast once it is
+    gone; the stage that ran out is counted in deadline.exceeded.<stage>.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.stage: Optional[str] = None
+        self._counted = False
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def exceeded(self) -> DeadlineExceeded:
+        # Counted once, even when abandoned threadpool work fails again later
+        if not self._counted:
+            self._counted = True
+            metrics.increment(f"deadline.exceeded.{self.stage}")
+        return DeadlineExceeded(self.stage, self.budget)
+
+    def enter(self, stage: str):
+        """
+        Start a stage, failing if no budget is left for it.
+        """
+        self.stage = stage
+        if self.remaining() <= 0:
+            raise self.exceeded()
+
+    async def run(self, awaitable: Awaitable[T], stage: Optional[str] = None) -> T:
+        """
+        Await within the remaining budget. Work in a thread keeps running after
+        a timeout, but stops at its next enter().
+        """
+        if stage is not None:
+            try:
+                self.enter(stage)
+            except DeadlineExceeded:
+                # Never started, so close it rather than leave it unawaited
+                if asyncio.iscoroutine(awaitable):
+                    awaitable.close()
+                raise
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.remaining())
+        except asyncio.TimeoutError:
+            raise self.exceeded()
+
+
+# Deadline of the request being served; copied into threadpool workers
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def qdrant_timeout() -> Optional[int]:
+    """
+    Server-side timeout for Qdrant calls of the current request, in whole
+    seconds as the API expects, so Qdrant stops working on abandoned queries.
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return max(1, math.ceil(deadline.remaining()))
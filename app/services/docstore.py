@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Sequence, Tuple
+from app.models.embeddings import Document
+from app.services.metrics import metrics
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentStore:
+    """
+    Read-only access to the chunk texts and metadata written by ingestion
+    (ingestion/docstore.py), keyed by Qdrant point ID.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def version(self) -> int:
+        # Ingestion rewrites the file in place, which changes its mtime
+        return os.stat(self.path).st_mtime_ns
+
+    def get_many(self, ids: Sequence[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        if not ids:
+            return {}
+
+        # One bulk read for all hits
+        placeholders = ",".join("?" * len(ids))
+        rows: List[Tuple[str, str, str]] = (
+            self._connection()
+            .execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})",
+                [str(point_id) for point_id in ids],
+            )
+            .fetchall()
+        )
+        return {
+            point_id: (text, json.loads(metadata)) for point_id, text, metadata in rows
+        }
+
+    def documents(self, ids: Sequence[str]) -> List[Document]:
+        """
+        Documents for the given IDs, in the same order.
+
+        IDs without a row mean the store is out of sync with the collection:
+        they are dropped, logged and counted in docstore.missing.
+        """
+        stored = self.get_many(ids)
+        missing = [point_id for point_id in ids if point_id not in stored]
+        if missing:
+            metrics.increment("docstore.missing", len(missing))
+            logger.warning(
+                "Search hits missing from the document store",
+                extra={"missing_ids": missing, "docstore": self.path},
+            )
+        return [
+            Document(page_content=stored[point_id][0], metadata=stored[point_id][1])
+            for point_id in ids
+            if point_id in stored
+        ]
@@ -1,7 +1,9 @@
 from fastembed import TextEmbedding
 from fastembed.sparse.bm25 import Bm25
 from app.models.embeddings import QueryEmbeddings, SparseVector
+from app.services.projection import CollectionProjection
 from fastembed.late_interaction import LateInteractionTextEmbedding
+from typing import List, Optional
 import os
 
 
@@ -11,6 +13,7 @@ class QueryEmbedder:
         dense_model_name: str,
         bm25_model_name: str,
         late_interaction_model_name: str,
+        dense_projection: Optional[CollectionProjection] = None,
     ):
         # Disable tokenizer parallelism to prevent deadlocks
         if "TOKENIZERS_PARALLELISM" not in os.environ:
@@ -27,19 +30,43 @@ class QueryEmbedder:
             )
         )
 
-    def embed_query(self, query: str) -> QueryEmbeddings:
+        # PCA projection used when the collection stores reduced dense vectors
+        self.dense_projection = dense_projection
+
+    def embed_late(self, query: str) -> List[List[float]]:
+        # Get late interaction embeddings (token-level vectors)
+        return next(self.late_interaction_model.embed(query)).tolist()
+
+    def embed_dense(self, query: str) -> List[float]:
         # Get dense embeddings (e.g., [0.1, 0.2, ...])
-        dense_vector = next(self.dense_embedding_model.embed(query)).tolist()
+        dense_vector = next(self.dense_embedding_model.embed(query))
+        if self.dense_projection is not None:
+            return self.dense_projection.apply(dense_vector)
+        return dense_vector.tolist()
+
+    def embed_query(
+        self,
+        query: str,
+        late: bool = True,
+        sparse: bool = True,
+        dense: Optional[List[float]] = None,
+    ) -> QueryEmbeddings:
+        # The dense vector may already have been computed by the caller
+        dense_vector = dense if dense is not None else self.embed_dense(query)
 
         # Get sparse BM25 embeddings (keyword weights)
-        sparse_vector = next(self.bm25_embedding_model.embed(query))
+        sparse_vector = (
+            SparseVector(**next(self.bm25_embedding_model.embed(query)).as_object())
+            if sparse
+            else None
+        )
 
-        # Get late interaction embeddings (token-level vectors)
-        late_vector = next(self.late_interaction_model.embed(query)).tolist()
+        # Late interaction embeddings can be deferred until a rerank needs them
+        late_vector = self.embed_late(query) if late else None
 
         # Combine all embeddings into a single object
         return QueryEmbeddings(
             dense=dense_vector,
-            sparse_bm25=SparseVector(**sparse_vector.as_object()),
+            sparse_bm25=sparse_vector,
             late=late_vector,
         )
@@ -0,0 +1,97 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+from app.config.settings import Settings
+from app.services.metrics import metrics, percentile
+import threading
+import time
+
+# Retrieval tiers, from best ranking quality to cheapest
+TIERS = ("hybrid_colbert", "hybrid_rrf", "dense")
+
+MIN_SAMPLES = 20  # Latencies needed before p95 is trusted
+RECOVERY_RATIO = 0.7  # Step back up once p95 is below this fraction of the target
+
+
+class LoadPolicy:
+    """
+    Pick the retrieval tier from the current load.
+
+    Under pressure (too many in-flight retrievals or recent p95 above target)
+    the tier steps down one level at a time: hybrid + ColBERT rerank, then
+    hybrid with RRF fusion, then dense only. It steps back up when both
+    signals relax. Changes are at least cooldown seconds apart.
+    """
+
+    def __init__(self, settings: Settings):
+        self.enabled = settings.load_policy_enabled
+        self.max_inflight = settings.load_max_inflight
+        self.target_p95 = settings.load_target_p95_ms / 1000
+        self.cooldown = settings.load_cooldown_seconds
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self._changed_at = 0.0
+        self.level = 0
+        self.inflight = 0
+
+    @property
+    def tier(self) -> str:
+        return TIERS[self.level]
+
+    def _update(self, now: float):
+        # Called with the lock held
+        if not self.enabled or now - self._changed_at < self.cooldown:
+            return
+
+        trusted = len(self._latencies) >= MIN_SAMPLES
+        p95 = percentile(self._latencies, 95) if trusted else 0.0
+        overloaded = self.inflight > self.max_inflight or p95 > self.target_p95
+        relaxed = (
+            trusted
+            and self.inflight <= self.max_inflight // 2
+            and p95 < self.target_p95 * RECOVERY_RATIO
+        )
+
+        if overloaded and self.level < len(TIERS) - 1:
+            self.level += 1
+            metrics.increment("tier.downgrades")
+        elif relaxed and self.level > 0:
+            self.level -= 1
+            metrics.increment("tier.upgrades")
+        else:
+            return
+
+        # Judge the new tier on its own latencies
+        self._changed_at = now
+        self._latencies.clear()
+
+    @contextmanager
+    def track(self):
+        """
+        Wrap one retrieval: yields the tier to use and records its latency.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self.inflight += 1
+            self._update(start)
+            tier = self.tier
+
+        try:
+            yield tier
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.inflight -= 1
+                self._latencies.append(elapsed)
+            metrics.increment(f"tier.{tier}")
+            metrics.observe("retrieval.seconds", elapsed)
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "tier": self.tier,
+                "inflight": self.inflight,
+                "recent_p95_ms": percentile(self._latencies, 95) * 1000,
+            }
@@ -0,0 +1,397 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models.embeddings import Document, QueryEmbeddings
+from app.models.api import SearchFilters
+from app.services.colbert_store import ColbertStore, maxsim_scores
+from app.services.docstore import DocumentStore
+from app.services.metrics import metrics
+from app.services.retriever import RRF_K
+from app.config.settings import Settings
+import faiss
+import json
+import logging
+import os
+import time
+import numpy as np
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Small corpora are searched exactly, like Qdrant's full scan below its
+# indexing threshold; larger ones use an HNSW graph with the collection's m
+# and ef_construct.
+HNSW_MIN_POINTS = 10000
+HNSW_EF_SEARCH = 128
+
+
+def as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def stored_vectors(index) -> np.ndarray:
+    """
+    Zero-copy view of the vectors held by an IndexFlat or IndexHNSWFlat.
+    Valid as long as nothing more is added to the index.
+    """
+    flat = faiss.downcast_index(index.storage) if hasattr(index, "hnsw") else index
+    return faiss.rev_swig_ptr(flat.get_xb(), flat.ntotal * flat.d).reshape(
+        flat.ntotal, flat.d
+    )
+
+
+def bm25_idf(document_frequency: np.ndarray, n_points: int) -> np.ndarray:
+    # Same IDF as Qdrant's sparse vector modifier
+    return np.log(
+        1.0 + (n_points - document_frequency + 0.5) / (document_frequency + 0.5)
+    )
+
+
+def top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> List[int]:
+    order = np.argsort(-scores, kind="stable")[:k]
+    return rows[order].tolist()
+
+
+class LocalHybridRetriever:
+    """
+    In-process replacement for QdrantRetriever, loaded from an Arrow export
+    (create-collection.py --export or ingestion.py --output).
+
+    Dense search runs on FAISS, BM25 on an inverted index weighted like
+    Qdrant's IDF modifier and the ColBERT rerank on numpy MaxSim, with the
+    same tiers, filters and rerank modes as QdrantRetriever.
+    """
+
+    def __init__(self, settings: Settings):
+        if not settings.local_index_path:
+            raise ValueError("retriever_backend 'local' requires local_index_path")
+
+        self.collection_name = settings.local_index_path
+        self.prefetch_limit = settings.prefetch_limit
+        self.adaptive_rerank = settings.rerank_mode == "adaptive"
+        self.rerank_skip_overlap = settings.rerank_skip_overlap
+        self.docstore = (
+            DocumentStore(settings.docstore_path) if settings.docstore_path else None
+        )
+        # Searches never leave the process, so there is nothing to cache
+        self.result_cache = None
+
+        self.load(settings.local_index_path)
+
+        # Exports of collections without ColBERT vectors rerank from the store
+        self.colbert_store = None
+        if self.late_vectors is None and settings.colbert_store_path:
+            self.colbert_store = ColbertStore(settings.colbert_store_path)
+        if not self.can_rerank:
+            logger.warning(
+                "No ColBERT vectors in the export or a local store: "
+                "hybrid searches fall back to RRF fusion",
+                extra={"path": settings.local_index_path},
+            )
+
+    def load(self, path: str):
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        config = json.loads(reader.schema.metadata[b"collection_config"])
+        names = reader.schema.names
+
+        self.ids: List[str] = []
+        self.payloads: List[Dict] = []
+        dense, sparse_rows, sparse_terms, sparse_values = [], [], [], []
+        late_vectors: List[Optional[np.ndarray]] = []
+
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            first_row = len(self.ids)
+            self.ids.extend(batch.column("id").to_pylist())
+            self.payloads.extend(
+                json.loads(p) for p in batch.column("payload").to_pylist()
+            )
+
+            column = batch.column("dense")
+            dense.append(column.values.to_numpy().reshape(-1, column.type.list_size))
+
+            if "sparse" in names:
+                column = batch.column("sparse")
+                offsets = column.field("indices").offsets.to_numpy()
+                sparse_rows.append(
+                    np.repeat(np.arange(len(batch)) + first_row, np.diff(offsets))
+                )
+                sparse_terms.append(column.field("indices").values.to_numpy())
+                sparse_values.append(column.field("values").values.to_numpy())
+
+            if "colbertv2.0" in names:
+                # Views into the memory-mapped file, not copies
+                column = batch.column("colbertv2.0")
+                size = column.type.value_type.list_size
+                tokens = column.values.values.to_numpy().reshape(-1, size)
+                offsets = column.offsets.to_numpy()
+                valid = column.is_valid().to_numpy(zero_copy_only=False)
+                late_vectors.extend(
+                    tokens[offsets[row] : offsets[row + 1]] if valid[row] else None
+                    for row in range(len(batch))
+                )
+
+        self.row_of = {point_id: row for row, point_id in enumerate(self.ids)}
+        self.filter_index = self.build_filter_index(
+            payload.get("metadata") or {} for payload in self.payloads
+        )
+        self.late_vectors = late_vectors if "colbertv2.0" in names else None
+
+        # Cosine distance: Qdrant normalizes vectors on insert
+        vectors = np.ascontiguousarray(np.concatenate(dense), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        if len(vectors) >= HNSW_MIN_POINTS:
+            hnsw = config["hnsw_config"]
+            self.dense_index = faiss.IndexHNSWFlat(
+                vectors.shape[1], hnsw["m"], faiss.METRIC_INNER_PRODUCT
+            )
+            self.dense_index.hnsw.efConstruction = hnsw["ef_construct"]
+            self.dense_index.hnsw.efSearch = max(HNSW_EF_SEARCH, self.prefetch_limit)
+        else:
+            self.dense_index = faiss.IndexFlatIP(vectors.shape[1])
+        self.dense_index.add(vectors)
+        del vectors
+        # Filtered searches read the index's own copy of the vectors
+        self.dense = stored_vectors(self.dense_index)
+
+        # Inverted index: postings of each term are contiguous, sorted by term
+        rows = np.concatenate(sparse_rows) if sparse_rows else np.empty(0, np.int64)
+        terms = np.concatenate(sparse_terms) if sparse_terms else np.empty(0)
+        values = np.concatenate(sparse_values) if sparse_values else np.empty(0)
+        order = np.argsort(terms, kind="stable")
+        self.posting_rows = rows[order]
+        self.posting_values = values[order].astype(np.float32)
+        self.terms, self.posting_starts, document_frequency = np.unique(
+            terms[order], return_index=True, return_counts=True
+        )
+        self.posting_ends = self.posting_starts + document_frequency
+        self.idf = bm25_idf(document_frequency, len(self.ids)).astype(np.float32)
+
+        logger.info(
+            "Local index loaded",
+            extra={"path": path, "points": len(self.ids), "terms": len(self.terms)},
+        )
+
+    @staticmethod
+    def build_filter_index(metadata) -> Dict[str, Dict[Any, np.ndarray]]:
+        """
+        Rows holding each value of the filterable metadata fields, so filters
+        are resolved with set lookups instead of a scan of every payload.
+        """
+        index: Dict[str, Dict[Any, List[int]]] = defaultdict(lambda: defaultdict(list))
+
+        def add(field, values, row):
+            for value in as_list(values):
+                # Filters only match scalar values
+                if isinstance(value, (str, int, float)):
+                    index[field][value].append(row)
+
+        for row, m in enumerate(metadata):
+            for group, values in (m.get("entities") or {}).items():
+                add(f"entities.{group}", values, row)
+            for key in ("headings", "page_numbers", "chunk_id"):
+                add(key, m.get(key), row)
+            # Deduplicated chunks list every source document in locations
+            add("source", m.get("source"), row)
+            for location in m.get("locations") or []:
+                add("source", location.get("source"), row)
+
+        return {
+            field: {
+                value: np.array(rows, dtype=np.int64)
+                for value, rows in postings.items()
+            }
+            for field, postings in index.items()
+        }
+
+    def rows_matching(self, field: str, values) -> np.ndarray:
+        mask = np.zeros(len(self.ids), dtype=bool)
+        postings = self.filter_index.get(field, {})
+        for value in values:
+            rows = postings.get(value)
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    def filter_mask(self, filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+        # Same semantics as QdrantRetriever.build_filter: every condition
+        # must hold, each matching any of its values
+        if filters is None:
+            return None
+
+        conditions = [
+            (f"entities.{group}", values)
+            for group, values in (filters.entities or {}).items()
+            if values
+        ]
+        for key, values in (
+            ("headings", filters.headings),
+            ("page_numbers", filters.page_numbers),
+            ("chunk_id", filters.chunk_ids),
+            ("source", filters.sources),
+        ):
+            if values:
+                conditions.append((key, values))
+
+        if not conditions:
+            return None
+        mask = self.rows_matching(*conditions[0])
+        for field, values in conditions[1:]:
+            mask &= self.rows_matching(field, values)
+        return mask
+
+    def dense_search(
+        self, embeddings: QueryEmbeddings, limit: int, mask: Optional[np.ndarray]
+    ) -> List[int]:
+        query = np.asarray([embeddings.dense], dtype=np.float32)
+        faiss.normalize_L2(query)
+
+        if mask is None:
+            _, rows = self.dense_index.search(query, limit)
+            return [row for row in rows[0].tolist() if row >= 0]
+
+        # Filtered searches score the matching points exactly
+        rows = np.flatnonzero(mask)
+        return top_k(rows, self.dense[rows] @ query[0], limit)
+
+    def sparse_search(
+        self, embeddings: QueryEmbeddings, limit: int, mask: Optional[np.ndarray]
+    ) -> List[int]:
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        matched = np.zeros(len(self.ids), dtype=bool)
+
+        sparse = embeddings.sparse_bm25
+        positions = np.searchsorted(self.terms, sparse.indices)
+        for position, term, weight in zip(positions, sparse.indices, sparse.values):
+            if position == len(self.terms) or self.terms[position] != term:
+                continue
+            postings = slice(self.posting_starts[position], self.posting_ends[position])
+            rows = self.posting_rows[postings]
+            scores[rows] += weight * self.idf[position] * self.posting_values[postings]
+            matched[rows] = True
+
+        if mask is not None:
+            matched &= mask
+        rows = np.flatnonzero(matched)
+        return top_k(rows, scores[rows], limit)
+
+    def prefetch(self, embeddings: QueryEmbeddings, mask: Optional[np.ndarray]):
+        return (
+            self.dense_search(embeddings, self.prefetch_limit, mask),
+            self.sparse_search(embeddings, self.prefetch_limit, mask),
+        )
+
+    @staticmethod
+    def agreement(dense: List[int], sparse: List[int], limit: int) -> float:
+        dense_top, sparse_top = set(dense[:limit]), set(sparse[:limit])
+        return len(dense_top & sparse_top) / max(len(dense_top), len(sparse_top), 1)
+
+    @staticmethod
+    def fuse(rankings, limit: int) -> List[int]:
+        # Reciprocal rank fusion, as in QdrantRetriever.fuse
+        scores: Dict[int, float] = {}
+        for ranking in rankings:
+            for rank, row in enumerate(ranking, start=1):
+                scores[row] = scores.get(row, 0.0) + 1.0 / (RRF_K + rank)
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def rerank(self, candidates: List[int], late: List[List[float]], limit: int):
+        candidates = list(dict.fromkeys(candidates))
+
+        if self.colbert_store is not None:
+            ranked = self.colbert_store.rerank(
+                late, [self.ids[row] for row in candidates]
+            )
+            return [self.row_of[point_id] for point_id in ranked[:limit]]
+
+        # Candidates without ColBERT vectors go last
+        scored = [row for row in candidates if self.late_vectors[row] is not None]
+        missing = [row for row in candidates if self.late_vectors[row] is None]
+        if not scored:
+            return missing[:limit]
+        scores = maxsim_scores(
+            np.asarray(late, dtype=np.float32),
+            [np.asarray(self.late_vectors[row], dtype=np.float32) for row in scored],
+        )
+        return (top_k(np.array(scored), scores, len(scored)) + missing)[:limit]
+
+    @property
+    def can_rerank(self) -> bool:
+        return self.late_vectors is not None or self.colbert_store is not None
+
+    def adaptive_search(
+        self,
+        embeddings: QueryEmbeddings,
+        limit: int,
+        mask: Optional[np.ndarray],
+        embed_late: Optional[Callable[[], List[List[float]]]],
+    ) -> List[int]:
+        dense, sparse = self.prefetch(embeddings, mask)
+
+        if self.agreement(dense, sparse, limit) >= self.rerank_skip_overlap:
+            metrics.increment("rerank.skipped")
+            metrics.increment("rerank.saved_seconds", metrics.mean("rerank.seconds"))
+            return self.fuse([dense, sparse], limit)
+
+        start = time.perf_counter()
+        late = embeddings.late
+        if late is None:
+            if embed_late is None:
+                raise ValueError("Adaptive rerank needs late embeddings or embed_late")
+            late = embed_late()
+
+        rows = self.rerank(dense + sparse, late, limit)
+
+        metrics.increment("rerank.applied")
+        metrics.observe("rerank.seconds", time.perf_counter() - start)
+        return rows
+
+    def dense_projection_source(self) -> Tuple[Optional[str], Optional[int]]:
+        # Saved next to the export by create-collection.py --export
+        path = f"{os.path.splitext(self.collection_name)[0]}.projection.npz"
+        return path, self.dense_index.d
+
+    def to_documents(self, rows: List[int]) -> List[Document]:
+        if self.docstore is None:
+            return [
+                Document(
+                    page_content=self.payloads[row].get("text", ""),
+                    metadata=self.payloads[row].get("metadata", {}),
+                )
+                for row in rows
+            ]
+
+        return self.docstore.documents([self.ids[row] for row in rows])
+
+    def search_documents(
+        self,
+        embeddings: QueryEmbeddings,
+        limit: int = 5,
+        filters: Optional[SearchFilters] = None,
+        embed_late: Optional[Callable[[], List[List[float]]]] = None,
+        tier: str = "hybrid_colbert",
+    ) -> List[Document]:
+        """
+        Same contract as QdrantRetriever.search_documents, answered in process.
+
+        Without ColBERT vectors (in the export or a local store) the hybrid
+        tier falls back to RRF fusion.
+        """
+        start = time.perf_counter()
+        mask = self.filter_mask(filters)
+
+        if tier == "dense":
+            rows = self.dense_search(embeddings, limit, mask)
+        elif tier == "hybrid_rrf" or not self.can_rerank:
+            rows = self.fuse(self.prefetch(embeddings, mask), limit)
+        elif self.adaptive_rerank:
+            rows = self.adaptive_search(embeddings, limit, mask, embed_late)
+        else:
+            dense, sparse = self.prefetch(embeddings, mask)
+            late = embeddings.late if embeddings.late is not None else embed_late()
+            rows = self.rerank(dense + sparse, late, limit)
+
+        documents = self.to_documents(rows)
+        metrics.observe("search.seconds", time.perf_counter() - start)
+        return documents
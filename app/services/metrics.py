@@ -0,0 +1,70 @@
+from collections import defaultdict, deque
+from typing import Any, Dict
+import threading
+
+
+def percentile(values, p: float) -> float:
+    # Nearest-rank percentile, p in [0, 100]
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Metrics:
+    """
+    In-process counters and latency timings, exposed by the /metrics endpoint.
+
+    Timings keep a count, a total and a bounded window of recent samples
+    for percentiles.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def increment(self, name: str, value: float = 1.0):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timing = self.timings.setdefault(
+                name,
+                {"count": 0, "total": 0.0, "recent": deque(maxlen=self._window)},
+            )
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["recent"].append(seconds)
+
+    def mean(self, name: str) -> float:
+        with self._lock:
+            timing = self.timings.get(name)
+            return timing["total"] / timing["count"] if timing else 0.0
+
+    def recent_percentile(self, name: str, p: float) -> float:
+        with self._lock:
+            timing = self.timings.get(name)
+            return percentile(timing["recent"], p) if timing else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {
+                    name: {
+                        "count": timing["count"],
+                        "mean_ms": timing["total"] / timing["count"] * 1000,
+                        "p50_ms": percentile(timing["recent"], 50) * 1000,
+                        "p95_ms": percentile(timing["recent"], 95) * 1000,
+                    }
+                    for name, timing in self.timings.items()
+                },
+            }
+
+
+# Shared by all services of the process
+metrics = Metrics()
@@ -1,23 +1,42 @@
-from typing import List, AsyncGenerator
-from openai import OpenAI
+from typing import Any, Dict, List, AsyncGenerator, Optional
+from openai import AsyncOpenAI, NOT_GIVEN, OpenAI
 from app.models.embeddings import Document
 from app.config.settings import Settings
+from app.services.deadline import Deadline, DeadlineExceeded
 from langsmith.wrappers import wrap_openai
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
 
 class OpenAIService:
     def __init__(self, settings: Settings):
-        base_client = OpenAI(api_key=settings.openai_api_key)
+        base_client = OpenAI(
+            api_key=settings.openai_api_key, base_url=settings.openai_base_url
+        )
         self.client = wrap_openai(base_client)
+        # Streams are consumed on the event loop, so they need the async client
+        self.async_client = wrap_openai(
+            AsyncOpenAI(
+                api_key=settings.openai_api_key, base_url=settings.openai_base_url
+            )
+        )
         self.default_model = settings.openai_model
         self.default_temperature = settings.openai_temperature
         self.default_max_output_tokens = settings.openai_max_output_tokens
         self.system_prompt_template = settings.openai_system_prompt
 
+    def build_prompt(self, query: str, context_documents: List[Document]) -> str:
+        context = "\n\n".join([doc.page_content for doc in context_documents])
+        return self.system_prompt_template.format(context=context, query=query)
+
+    @staticmethod
+    def build_input(prompt: str, history: Optional[List[Dict[str, str]]]):
+        # Earlier turns of a session go before the prompt with the new context
+        if not history:
+            return prompt
+        return [*history, {"role": "user", "content": prompt}]
+
     def generate_response(
         self,
         query: str,
@@ -25,6 +44,8 @@ class OpenAIService:
         model: str = None,
         temperature: float = None,
         max_output_tokens: int = None,
+        timeout: Optional[float] = None,
+        history: Optional[List[Dict[str, str]]] = None,
     ) -> str:
         model = model or self.default_model
         temperature = (
@@ -32,18 +53,15 @@ class OpenAIService:
         )
         max_output_tokens = max_output_tokens or self.default_max_output_tokens
 
-        context = "\n\n".join([doc.page_content for doc in context_documents])
-
-        prompt = prompt = self.system_prompt_template.format(
-            context=context, query=query
-        )
+        prompt = self.build_prompt(query, context_documents)
 
         try:
             response = self.client.responses.create(
                 model=model,
-                input=prompt,
+                input=self.build_input(prompt, history),
                 temperature=temperature,
                 max_output_tokens=max_output_tokens,
+                timeout=timeout if timeout is not None else NOT_GIVEN,
             )
 
             return response.output_text
@@ -63,73 +81,85 @@ class OpenAIService:
         model: str = None,
         temperature: float = None,
         max_output_tokens: int = None,
-    ) -> AsyncGenerator[str, None]:
+        deadline: Optional[Deadline] = None,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield stream events as dicts; the caller encodes and frames them.
+        """
         model = model or self.default_model
         temperature = (
             temperature if temperature is not None else self.default_temperature
         )
         max_output_tokens = max_output_tokens or self.default_max_output_tokens
 
-        context = "\n\n".join([doc.page_content for doc in context_documents])
-
-        prompt = self.system_prompt_template.format(context=context, query=query)
+        prompt = self.build_prompt(query, context_documents)
 
+        stream = None
         try:
             # Create streaming response
-            stream = self.client.responses.create(
+            request = self.async_client.responses.create(
                 model=model,
-                input=prompt,
+                input=self.build_input(prompt, history),
                 temperature=temperature,
                 max_output_tokens=max_output_tokens,
                 stream=True,  # Enable streaming
+                timeout=deadline.remaining() if deadline is not None else NOT_GIVEN,
             )
+            if deadline is not None:
+                stream = await deadline.run(request, "llm_first_token")
+            else:
+                stream = await request
+
+            # Process stream events, each within the remaining budget
+            events = stream.__aiter__()
+            while True:
+                try:
+                    if deadline is not None:
+                        event = await deadline.run(events.__anext__())
+                    else:
+                        event = await events.__anext__()
+                except StopAsyncIteration:
+                    break
 
-            # Process stream events
-            for event in stream:
                 if hasattr(event, "type"):
                     event_type = event.type
 
                     # Handle different event types based on the documentation
                     if event_type == "response.created":
-                        yield json.dumps(
-                            {
-                                "type": "response.created",
-                                "response_id": event.response.id,
-                                "model": event.response.model,
-                            }
-                        )
+                        yield {
+                            "type": "response.created",
+                            "response_id": event.response.id,
+                            "model": event.response.model,
+                        }
 
                     elif event_type == "response.output_text.delta":
                         # This is the main event for text streaming
-                        yield json.dumps(
-                            {
-                                "type": "text_delta",
-                                "delta": event.delta,
-                                "output_index": event.output_index,
-                                "content_index": event.content_index,
-                            }
-                        )
+                        if deadline is not None:
+                            deadline.stage = "llm_completion"
+                        yield {
+                            "type": "text_delta",
+                            "delta": event.delta,
+                            "output_index": event.output_index,
+                            "content_index": event.content_index,
+                        }
 
                     elif event_type == "response.output_text.done":
-                        yield json.dumps(
-                            {
-                                "type": "text_done",
-                                "text": event.text,
-                                "output_index": event.output_index,
-                                "content_index": event.content_index,
-                            }
-                        )
+                        yield {
+                            "type": "text_done",
+                            "text": event.text,
+                            "output_index": event.output_index,
+                            "content_index": event.content_index,
+                        }
 
                     elif event_type == "response.completed":
-                        yield json.dumps(
-                            {
-                                "type": "response.completed",
-                                "response_id": event.response.id,
-                                "usage": event.response.usage.model_dump()
-                                if event.response.usage
-                                else None,
-                            }
-                        )
+                        yield {
+                            "type": "response.completed",
+                            "response_id": event.response.id,
+                            "usage": event.response.usage.model_dump()
+                            if event.response.usage
+                            else None,
+                        }
 
                     elif event_type == "response.failed":
                         error_msg = (
@@ -137,23 +167,32 @@ class OpenAIService:
                             if event.response.error
                             else "Unknown error"
                         )
-                        yield json.dumps(
-                            {"type": "response.failed", "error": error_msg}
-                        )
+                        yield {"type": "response.failed", "error": error_msg}
                         logger.error(
                             "OpenAI stream failed",
                             extra={"error": error_msg, "query": query},
                         )
                         break
 
+        except DeadlineExceeded as e:
+            logger.warning(
+                "OpenAI stream deadline exceeded",
+                extra={"stage": e.stage, "query": query},
+            )
+            yield {"type": "error", "stage": e.stage, "message": str(e)}
+
         except Exception as e:
             logger.error(
                 "OpenAI stream response generation failed",
                 extra={"error": str(e), "query": query},
             )
-            yield json.dumps(
-                {
-                    "type": "error",
-                    "message": f"Failed to generate stream response: {str(e)}",
-                }
-            )
+            yield {
+                "type": "error",
+                "message": f"Failed to generate stream response: {str(e)}",
+            }
+
+        finally:
+            # Stop the upstream request instead of reading it to the end when
+            # the stream ends early: deadline, cancellation or disconnect
+            if stream is not None:
+                await stream.close()
@@ -0,0 +1,43 @@
+from typing import List, Optional
+from app.models.api import SearchFilters
+from app.models.embeddings import Document
+from app.services.deadline import Deadline
+from app.services.embedder import QueryEmbedder
+from app.services.retriever import QdrantRetriever
+
+
+def retrieve(
+    embedder: QueryEmbedder,
+    retriever: QdrantRetriever,
+    query: str,
+    limit: int,
+    filters: Optional[SearchFilters],
+    tier: str = "hybrid_colbert",
+    deadline: Optional[Deadline] = None,
+    dense: Optional[List[float]] = None,
+) -> List[Document]:
+    """
+    Embed the query with only the encoders the tier needs, then search.
+
+    With a deadline, each stage is recorded on it and not started once the
+    budget is gone. A dense vector the caller already computed is reused.
+    """
+    if deadline is not None:
+        deadline.enter("embedding")
+
+    # The ColBERT query vectors are deferred when the rerank may be skipped
+    late = tier == "hybrid_colbert" and not retriever.adaptive_rerank
+    query_embeddings = embedder.embed_query(
+        query, late=late, sparse=tier != "dense", dense=dense
+    )
+
+    if deadline is not None:
+        deadline.enter("retrieval")
+
+    return retriever.search_documents(
+        embeddings=query_embeddings,
+        limit=limit,
+        filters=filters,
+        embed_late=lambda: embedder.embed_late(query),
+        tier=tier,
+    )
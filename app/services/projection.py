@@ -0,0 +1,98 @@
+from typing import Callable, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DenseProjection:
+    """
+    PCA projection fitted at ingestion time (ingestion/projection.py), applied
+    to query vectors so they match the reduced dense vectors in the collection.
+    """
+
+    def __init__(self, path: str, dense_size: Optional[int] = None):
+        with np.load(path) as data:
+            self.mean = data["mean"]
+            self.components = data["components"]
+        # A stale file from an earlier collection of the same name must not
+        # project queries to a size the collection no longer has
+        if dense_size is not None and self.dimensions != dense_size:
+            raise ValueError(
+                f"Projection in {path} has {self.dimensions} dimensions, "
+                f"the collection expects {dense_size}"
+            )
+
+    @property
+    def dimensions(self) -> int:
+        return self.components.shape[0]
+
+    def apply(self, vector: np.ndarray) -> List[float]:
+        projected = (
+            np.asarray(vector, dtype=np.float32) - self.mean
+        ) @ self.components.T
+        return (projected / max(np.linalg.norm(projected), 1e-12)).tolist()
+
+
+class CollectionProjection:
+    """
+    The projection of the collection being served. source_fn returns its file
+    (or None for collections without one) and the collection's dense size; it
+    is called again every check_interval seconds, so an alias swap to a
+    rebuilt collection, or a projection rewritten in place, is picked up.
+    """
+
+    def __init__(
+        self,
+        source_fn: Callable[[], Tuple[Optional[str], Optional[int]]],
+        check_interval: float = 5.0,
+    ):
+        self.source_fn = source_fn
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple] = None
+        self._projection: Optional[DenseProjection] = None
+        self._next_check = 0.0
+
+    def current(self) -> Optional[DenseProjection]:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check:
+                return self._projection
+            # Only one caller checks per interval, the others keep the current one
+            self._next_check = now + self.check_interval
+
+        try:
+            path, dense_size = self.source_fn()
+            mtime = os.stat(path).st_mtime_ns if path and os.path.exists(path) else None
+        except Exception as e:
+            logger.warning("Dense projection lookup failed", extra={"error": str(e)})
+            return self._projection
+
+        key = (path, mtime, dense_size)
+        with self._lock:
+            if key == self._key:
+                return self._projection
+            self._key = key
+            self._projection = None
+            if mtime is None:
+                return None
+            try:
+                self._projection = DenseProjection(path, dense_size)
+            except ValueError as e:
+                logger.error(
+                    "Dense projection rejected", extra={"path": path, "error": str(e)}
+                )
+                return None
+            logger.info("Dense projection loaded", extra={"path": path})
+            return self._projection
+
+    def apply(self, vector: np.ndarray) -> List[float]:
+        projection = self.current()
+        if projection is None:
+            # Full-width collection
+            return np.asarray(vector).tolist()
+        return projection.apply(vector)
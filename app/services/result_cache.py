@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+from app.models.api import SearchFilters
+from app.models.embeddings import Document, QueryEmbeddings
+from app.services.metrics import metrics
+import hashlib
+import logging
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(
+    embeddings: QueryEmbeddings,
+    limit: int,
+    filters: Optional[SearchFilters],
+    mode: str,
+) -> str:
+    """
+    Hash of everything that determines a search result.
+
+    The ColBERT vectors are left out: like the dense vector they are a
+    function of the query text, and they are not always computed up front.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(embeddings.dense, dtype=np.float32).tobytes())
+    if embeddings.sparse_bm25 is not None:
+        digest.update(np.asarray(embeddings.sparse_bm25.indices, np.int64).tobytes())
+        digest.update(np.asarray(embeddings.sparse_bm25.values, np.float32).tobytes())
+    digest.update(f"|{limit}|{mode}|".encode())
+    if filters is not None:
+        digest.update(filters.model_dump_json(exclude_none=True).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of search results, emptied when the collection changes.
+
+    version_fn returns a value that changes whenever the collection is
+    written to; it is called at most once every check_interval seconds, so
+    results may be served from the previous version for that long.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        version_fn: Callable[[], Hashable],
+        check_interval: float = 5.0,
+    ):
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, List[Document]]" = OrderedDict()
+        self._version: Any = None
+        self._next_check = 0.0
+
+    def refresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check:
+                return
+            # Only one caller checks per interval, the others keep serving
+            self._next_check = now + self.check_interval
+
+        try:
+            version = self.version_fn()
+        except Exception as e:
+            logger.warning("Collection version check failed", extra={"error": str(e)})
+            return
+
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    metrics.increment("cache.invalidations")
+                self._entries.clear()
+                self._version = version
+
+    def current_version(self) -> Any:
+        """
+        The collection version the cache currently serves.
+        """
+        self.refresh()
+        with self._lock:
+            return self._version
+
+    def get(self, key: str) -> Tuple[Optional[List[Document]], Any]:
+        """
+        Return (cached documents or None, current collection version).
+        """
+        self.refresh()
+        with self._lock:
+            documents = self._entries.get(key)
+            if documents is not None:
+                self._entries.move_to_end(key)
+            version = self._version
+
+        metrics.increment("cache.hits" if documents is not None else "cache.misses")
+        return (list(documents) if documents is not None else None), version
+
+    def put(self, key: str, documents: List[Document], version: Any):
+        with self._lock:
+            # Results computed before an invalidation are dropped
+            if version != self._version:
+                return
+            self._entries[key] = list(documents)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.increment("cache.evictions")
+
+    def state(self):
+        with self._lock:
+            return {"entries": len(self._entries), "version": self._version}
@@ -1,76 +1,406 @@
-from typing import List
-from qdrant_client import QdrantClient
+from collections import defaultdict
+from typing import Callable, List, Optional, Tuple, Union
+from qdrant_client import QdrantClient, models
 from app.models.embeddings import Document, QueryEmbeddings
+from app.models.api import SearchFilters
+from app.services.cluster import QdrantCluster
+from app.services.colbert_store import ColbertStore
+from app.services.deadline import qdrant_timeout
+from app.services.docstore import DocumentStore
+from app.services.metrics import metrics
+from app.services.result_cache import ResultCache, result_key
 from app.config.settings import Settings
-from qdrant_client.http.exceptions import UnexpectedResponse
-from fastapi import HTTPException
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+RRF_K = 60  # Rank smoothing constant for reciprocal rank fusion
+
+
+class SearchUnavailable(Exception):
+    """
+    Qdrant failed or could not be reached; the routers answer 503.
+    """
+
 
 class QdrantRetriever:
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        client: Optional[Union[QdrantClient, QdrantCluster]] = None,
+    ):
         # Basic client setup
-        client_params = {"url": settings.qdrant_url, "timeout": settings.qdrant_timeout}
+        client_params = {"timeout": settings.qdrant_timeout}
 
         # Add API key if provided
         if settings.qdrant_api_key:
             client_params["api_key"] = settings.qdrant_api_key
 
-        self.client = QdrantClient(**client_params)
+        # Several nodes: shards queried in parallel, replicas load-balanced
+        if client is None and settings.qdrant_shards:
+            client = QdrantCluster.from_urls(
+                settings.qdrant_shards,
+                settings.qdrant_hedge_percentile,
+                **client_params,
+            )
+        self.client = client or QdrantClient(url=settings.qdrant_url, **client_params)
+        self.sharded = (
+            isinstance(self.client, QdrantCluster) and len(self.client.shards) > 1
+        )
         self.collection_name = settings.collection_name
+        self.dense_projection_dir = settings.dense_projection_dir
         self.prefetch_limit = settings.prefetch_limit
+        self.adaptive_rerank = settings.rerank_mode == "adaptive"
+        self.rerank_skip_overlap = settings.rerank_skip_overlap
+        self.docstore = (
+            DocumentStore(settings.docstore_path) if settings.docstore_path else None
+        )
 
-    def search_documents(
-        self, embeddings: QueryEmbeddings, limit: int = 5
-    ) -> List[Document]:
-        try:
-            # Search using all vector types
-            search_result = self.client.query_points(
-                collection_name=self.collection_name,
-                # First stage: Get candidates using dense and sparse search
-                prefetch=[
-                    {
-                        "query": embeddings.dense,
-                        "using": "dense",
-                        "limit": self.prefetch_limit,
-                    },
-                    {
-                        "query": embeddings.sparse_bm25.model_dump(),
-                        "using": "sparse",
-                        "limit": self.prefetch_limit,
-                    },
-                ],
-                # Second stage: Rerank using late interaction
-                query=embeddings.late,
-                using="colbertv2.0",
-                with_payload=True,
-                limit=limit,
+        # Local rerank: ColBERT matrices from a memory-mapped store, not Qdrant
+        self.colbert_store = None
+        if settings.rerank_backend == "local":
+            if not settings.colbert_store_path:
+                raise ValueError("rerank_backend 'local' requires colbert_store_path")
+            self.colbert_store = ColbertStore(settings.colbert_store_path)
+
+        # Results only change when ingestion writes to the collection
+        self.result_cache = (
+            ResultCache(
+                settings.result_cache_size,
+                self.collection_version,
+                settings.result_cache_check_seconds,
             )
+            if settings.result_cache_size > 0
+            else None
+        )
+
+    def collection_version(self):
+        if isinstance(self.client, QdrantCluster):
+            version = tuple(self.client.map(self.node_version))
+        else:
+            version = self.node_version(self.client)
+        # Texts and ColBERT vectors kept outside Qdrant change on their own
+        stores = tuple(
+            store.version()
+            for store in (self.docstore, self.colbert_store)
+            if store is not None
+        )
+        return version, stores
+
+    def target_collection(self, client: QdrantClient) -> str:
+        # The collection the alias points to, or the configured name itself
+        aliases = client.get_aliases().aliases
+        return next(
+            (
+                a.collection_name
+                for a in aliases
+                if a.alias_name == self.collection_name
+            ),
+            self.collection_name,
+        )
+
+    def node_version(self, client: QdrantClient):
+        # Rebuilds swap the alias to a new collection; ingestion into the same
+        # collection adds points (IDs are random UUIDs, so never overwrites)
+        target = self.target_collection(client)
+        return target, client.get_collection(target).points_count
+
+    def collection_projection(
+        self, client: QdrantClient
+    ) -> Tuple[Optional[str], Optional[int]]:
+        # Ingestion saves one projection per physical collection
+        target = self.target_collection(client)
+        size = client.get_collection(target).config.params.vectors["dense"].size
+        return os.path.join(self.dense_projection_dir, f"{target}.npz"), size
+
+    def dense_projection_source(self) -> Tuple[Optional[str], Optional[int]]:
+        if self.dense_projection_dir is None:
+            return None, None
+        if isinstance(self.client, QdrantCluster):
+            return self.client.map(self.collection_projection)[0]
+        return self.collection_projection(self.client)
+
+    @staticmethod
+    def build_filter(filters: Optional[SearchFilters]) -> Optional[models.Filter]:
+        if filters is None:
+            return None
 
-            # Convert results to Document objects
+        conditions = []
+
+        # Each entity group must match at least one of its values
+        for group, values in (filters.entities or {}).items():
+            if values:
+                conditions.append(
+                    models.FieldCondition(
+                        key=f"metadata.entities.{group}",
+                        match=models.MatchAny(any=values),
+                    )
+                )
+
+        for key, values in (
+            ("metadata.headings", filters.headings),
+            ("metadata.page_numbers", filters.page_numbers),
+            ("metadata.chunk_id", filters.chunk_ids),
+        ):
+            if values:
+                conditions.append(
+                    models.FieldCondition(key=key, match=models.MatchAny(any=values))
+                )
+
+        # Deduplicated chunks list every source document in metadata.locations
+        if filters.sources:
+            conditions.append(
+                models.Filter(
+                    should=[
+                        models.FieldCondition(
+                            key=key, match=models.MatchAny(any=filters.sources)
+                        )
+                        for key in ("metadata.source", "metadata.locations[].source")
+                    ]
+                )
+            )
+
+        return models.Filter(must=conditions) if conditions else None
+
+    def to_documents(self, points) -> List[Document]:
+        # Convert results to Document objects
+        if self.docstore is None:
             return [
                 Document(
                     page_content=point.payload.get("text", ""),
                     metadata=point.payload.get("metadata", {}),
                 )
-                for point in search_result.points
+                for point in points
             ]
 
-        except UnexpectedResponse as e:
-            # Handle Qdrant-specific errors
+        # Fetch all texts in one bulk read, keeping Qdrant's ranking
+        return self.docstore.documents([str(point.id) for point in points])
+
+    def with_payloads(self, points):
+        """
+        Load the payloads of the final results, which were ranked without them.
+        """
+        if self.docstore is not None or not points:
+            return points
+
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=[point.id for point in points],
+            with_payload=True,
+            with_vectors=False,
+            timeout=qdrant_timeout(),
+        )
+        by_id = {record.id: record for record in records}
+        return [by_id[point.id] for point in points if point.id in by_id]
+
+    def hybrid_search(
+        self,
+        embeddings: QueryEmbeddings,
+        limit: int,
+        query_filter: Optional[models.Filter],
+    ):
+        # Search using all vector types
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            # First stage: Get candidates using dense and sparse search
+            prefetch=[
+                models.Prefetch(
+                    query=embeddings.dense,
+                    using="dense",
+                    filter=query_filter,
+                    limit=self.prefetch_limit,
+                ),
+                models.Prefetch(
+                    query=models.SparseVector(**embeddings.sparse_bm25.model_dump()),
+                    using="sparse",
+                    filter=query_filter,
+                    limit=self.prefetch_limit,
+                ),
+            ],
+            # Second stage: Rerank using late interaction
+            query=embeddings.late,
+            using="colbertv2.0",
+            query_filter=query_filter,
+            # Texts come from the document store when one is configured
+            with_payload=self.docstore is None,
+            limit=limit,
+            timeout=qdrant_timeout(),
+        ).points
+
+    def prefetch(
+        self, embeddings: QueryEmbeddings, query_filter: Optional[models.Filter]
+    ):
+        # Both first-stage searches in a single request. Payloads are left out:
+        # only the final top results are loaded, by with_payloads or the rerank
+        dense, sparse = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(
+                    query=embeddings.dense,
+                    using="dense",
+                    filter=query_filter,
+                    with_payload=False,
+                    limit=self.prefetch_limit,
+                ),
+                models.QueryRequest(
+                    query=models.SparseVector(**embeddings.sparse_bm25.model_dump()),
+                    using="sparse",
+                    filter=query_filter,
+                    with_payload=False,
+                    limit=self.prefetch_limit,
+                ),
+            ],
+            timeout=qdrant_timeout(),
+        )
+        return dense.points, sparse.points
+
+    @staticmethod
+    def agreement(dense, sparse, limit: int) -> float:
+        # Share of the top results both prefetches agree on
+        dense_top = {point.id for point in dense[:limit]}
+        sparse_top = {point.id for point in sparse[:limit]}
+        return len(dense_top & sparse_top) / max(len(dense_top), len(sparse_top), 1)
+
+    @staticmethod
+    def fuse(rankings, limit: int):
+        # Reciprocal rank fusion of the prefetch rankings
+        scores, points = defaultdict(float), {}
+        for ranking in rankings:
+            for rank, point in enumerate(ranking, start=1):
+                scores[point.id] += 1.0 / (RRF_K + rank)
+                points.setdefault(point.id, point)
+        return [
+            points[point_id]
+            for point_id in sorted(scores, key=scores.get, reverse=True)[:limit]
+        ]
+
+    def adaptive_search(
+        self,
+        embeddings: QueryEmbeddings,
+        limit: int,
+        query_filter: Optional[models.Filter],
+        embed_late: Optional[Callable[[], List[List[float]]]],
+    ):
+        dense, sparse = self.prefetch(embeddings, query_filter)
+
+        if self.agreement(dense, sparse, limit) >= self.rerank_skip_overlap:
+            # Skipped reranks are credited with the average rerank cost
+            metrics.increment("rerank.skipped")
+            metrics.increment("rerank.saved_seconds", metrics.mean("rerank.seconds"))
+            return self.with_payloads(self.fuse([dense, sparse], limit))
+
+        start = time.perf_counter()
+        late = embeddings.late
+        if late is None:
+            if embed_late is None:
+                raise ValueError("Adaptive rerank needs late embeddings or embed_late")
+            late = embed_late()
+
+        points = self.rerank(dense + sparse, late, limit)
+
+        metrics.increment("rerank.applied")
+        metrics.observe("rerank.seconds", time.perf_counter() - start)
+        return points
+
+    def rerank(self, candidates, late: List[List[float]], limit: int):
+        # Rerank only the prefetched candidates, already filtered
+        candidates = list({point.id: point for point in candidates}.values())
+
+        if self.colbert_store is not None:
+            # One batched MaxSim over all candidates, in process
+            points = {str(point.id): point for point in candidates}
+            ranked = self.colbert_store.rerank(late, list(points))
+            return self.with_payloads([points[point_id] for point_id in ranked[:limit]])
+
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            query=late,
+            using="colbertv2.0",
+            query_filter=models.Filter(
+                must=[models.HasIdCondition(has_id=[point.id for point in candidates])]
+            ),
+            with_payload=self.docstore is None,
+            limit=limit,
+            timeout=qdrant_timeout(),
+        ).points
+
+    def dense_search(
+        self,
+        embeddings: QueryEmbeddings,
+        limit: int,
+        query_filter: Optional[models.Filter],
+    ):
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            query=embeddings.dense,
+            using="dense",
+            query_filter=query_filter,
+            with_payload=self.docstore is None,
+            limit=limit,
+            timeout=qdrant_timeout(),
+        ).points
+
+    def search_documents(
+        self,
+        embeddings: QueryEmbeddings,
+        limit: int = 5,
+        filters: Optional[SearchFilters] = None,
+        embed_late: Optional[Callable[[], List[List[float]]]] = None,
+        tier: str = "hybrid_colbert",
+    ) -> List[Document]:
+        """
+        Hybrid search: dense and BM25 prefetch, then a ColBERT rerank.
+
+        In adaptive mode the rerank is skipped when the prefetches agree;
+        embed_late computes the ColBERT query vectors only when it runs.
+        Lower tiers (see load_policy.TIERS) fuse the prefetches with RRF
+        ("hybrid_rrf") or search the dense vectors only ("dense").
+        Results are cached until the collection changes (see ResultCache).
+        """
+        try:
+            start = time.perf_counter()
+
+            key = version = None
+            if self.result_cache is not None:
+                mode = "adaptive" if self.adaptive_rerank else "always"
+                key = result_key(embeddings, limit, filters, f"{tier}/{mode}")
+                documents, version = self.result_cache.get(key)
+                if documents is not None:
+                    return documents
+
+            # The same filter restricts both prefetches and the rerank
+            query_filter = self.build_filter(filters)
+
+            if tier == "dense":
+                points = self.dense_search(embeddings, limit, query_filter)
+            elif tier == "hybrid_rrf":
+                points = self.with_payloads(
+                    self.fuse(self.prefetch(embeddings, query_filter), limit)
+                )
+            elif self.adaptive_rerank:
+                points = self.adaptive_search(
+                    embeddings, limit, query_filter, embed_late
+                )
+            elif self.colbert_store is not None or self.sharded:
+                # Across shards, rerank the global prefetch top, not each shard's
+                dense, sparse = self.prefetch(embeddings, query_filter)
+                points = self.rerank(dense + sparse, embeddings.late, limit)
+            else:
+                points = self.hybrid_search(embeddings, limit, query_filter)
+
+            documents = self.to_documents(points)
+            if key is not None:
+                self.result_cache.put(key, documents, version)
+            metrics.observe("search.seconds", time.perf_counter() - start)
+            return documents
+
+        except (UnexpectedResponse, ResponseHandlingException) as e:
+            # Handle Qdrant-specific errors; other errors reach the router as is
             logger.error(
                 "Qdrant search failed",
                 extra={"error": str(e), "collection": self.collection_name},
             )
-            raise HTTPException(
-                status_code=503, detail="Search service temporarily unavailable"
-            )
-        except Exception as e:
-            # Handle any other errors
-            logger.error(
-                "Unexpected error during search",
-                extra={"error": str(e), "collection": self.collection_name},
-            )
-            raise HTTPException(status_code=500, detail="Internal server error")
+            raise SearchUnavailable("Search service temporarily unavailable") from e
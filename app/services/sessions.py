@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+from app.models.api import SearchFilters
+from app.models.embeddings import Document
+from app.services.metrics import metrics
+import threading
+import time
+import uuid
+import numpy as np
+import tiktoken
+
+
+@lru_cache
+def _encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """
+    Token count of a text with the model's tiktoken encoding, loaded on first use.
+    """
+    return lambda text: len(_encoding(model).encode(text, disallowed_special=()))
+
+
+class Turn:
+    def __init__(self, query: str, answer: str, tokens: int):
+        self.query = query
+        self.answer = answer
+        self.tokens = tokens  # Counted once, when the turn is added
+
+
+class Retrieval:
+    def __init__(
+        self,
+        dense: np.ndarray,
+        limit: int,
+        filters: Optional[str],
+        tier: str,
+        documents: List[Document],
+        version: Any = None,
+    ):
+        # Dense vector of the query that retrieved the documents: the topic anchor
+        self.dense = dense
+        self.limit = limit
+        self.filters = filters
+        self.tier = tier
+        self.documents = documents
+        # Result cache version at retrieval time; a newer ingestion invalidates it
+        self.version = version
+
+
+class Session:
+    def __init__(self, id: str, expires_at: float):
+        self.id = id
+        self.turns: List[Turn] = []
+        self.retrieval: Optional[Retrieval] = None
+        self.expires_at = expires_at
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _filters_key(filters: Optional[SearchFilters]) -> Optional[str]:
+    return filters.model_dump_json(exclude_none=True) if filters is not None else None
+
+
+class SessionStore:
+    """
+    Conversations kept in process memory, so follow-up turns send only the
+    new query.
+
+    A session keeps its turns and the documents of its last retrieval.
+    Follow-ups reuse those documents while their dense embedding stays within
+    topic_similarity (cosine) of the query that retrieved them, with the same
+    limit and filters. Only the newest turns that fit in history_tokens are
+    kept and sent to the model, so each turn costs about the same however
+    long the conversation is. Sessions expire ttl_seconds after their last
+    use; past max_sessions the least recently used is dropped.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_sessions: int,
+        topic_similarity: float,
+        history_tokens: int,
+        count_tokens: Callable[[str], int],
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.topic_similarity = topic_similarity
+        self.history_tokens = history_tokens
+        self.count_tokens = count_tokens
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def _expire(self, now: float):
+        # Least recently used first, so expired sessions are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.expires_at > now and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            metrics.increment("sessions.expired")
+
+    def create(self) -> Session:
+        now = time.monotonic()
+        session = Session(uuid.uuid4().hex, now + self.ttl_seconds)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._expire(now)
+        metrics.increment("sessions.created")
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.expires_at = now + self.ttl_seconds
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def cached_documents(
+        self,
+        session: Session,
+        dense: List[float],
+        limit: int,
+        filters: Optional[SearchFilters],
+        version: Any = None,
+    ) -> Optional[Retrieval]:
+        """
+        The session's last retrieval, if it still answers this query.
+
+        A different collection version or dense size (the embedding model or
+        its projection changed) is a miss, not an error.
+        """
+        retrieval = session.retrieval
+        query = _unit(dense)
+        if (
+            retrieval is None
+            or retrieval.limit != limit
+            or retrieval.filters != _filters_key(filters)
+            or retrieval.version != version
+            or retrieval.dense.shape != query.shape
+            or float(retrieval.dense @ query) < self.topic_similarity
+        ):
+            metrics.increment("sessions.retrieval_missed")
+            return None
+        metrics.increment("sessions.retrieval_reused")
+        return retrieval
+
+    def remember_retrieval(
+        self,
+        session: Session,
+        dense: List[float],
+        limit: int,
+        filters: Optional[SearchFilters],
+        tier: str,
+        documents: List[Document],
+        version: Any = None,
+    ):
+        session.retrieval = Retrieval(
+            _unit(dense), limit, _filters_key(filters), tier, list(documents), version
+        )
+
+    def history(self, session: Session) -> List[Dict[str, str]]:
+        """
+        The kept turns as input messages for the model.
+        """
+        messages = []
+        for turn in list(session.turns):
+            messages.append({"role": "user", "content": turn.query})
+            messages.append({"role": "assistant", "content": turn.answer})
+        return messages
+
+    def add_turn(self, session: Session, query: str, answer: str):
+        turn = Turn(query, answer, self.count_tokens(query) + self.count_tokens(answer))
+        with self._lock:
+            turns = session.turns + [turn]
+            # Drop the oldest turns beyond the budget; they would never be sent
+            total = 0
+            for start in range(len(turns) - 1, -1, -1):
+                total += turns[start].tokens
+                if total > self.history_tokens:
+                    turns = turns[start + 1 :]
+                    break
+            session.turns = turns
+
+    def state(self):
+        with self._lock:
+            return {"sessions": len(self._sessions)}
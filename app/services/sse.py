@@ -0,0 +1,127 @@
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, List, Optional
+from pydantic import TypeAdapter
+from app.models.embeddings import Document
+from app.services.metrics import metrics
+import asyncio
+import orjson
+
+DOCUMENTS = TypeAdapter(List[Document])
+
+
+def frame(event: Dict[str, Any]) -> bytes:
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+def documents_event(tier: str, documents: List[Document], **fields) -> bytes:
+    """
+    The source_documents event as JSON, with the documents serialized in one
+    pass by pydantic instead of model_dump() per document and json.dumps.
+    """
+    head = orjson.dumps({"type": "source_documents", **fields, "tier": tier})
+    return head[:-1] + b',"documents":' + DOCUMENTS.dump_json(documents) + b"}"
+
+
+def documents_frame(tier: str, documents: List[Document]) -> bytes:
+    return b"data: " + documents_event(tier, documents) + b"\n\n"
+
+
+def _same_text(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    return (
+        a["output_index"] == b["output_index"]
+        and a["content_index"] == b["content_index"]
+    )
+
+
+async def coalesce_events(
+    events: AsyncIterable[Dict[str, Any]], flush_ms: float, flush_chars: int
+) -> AsyncGenerator[List[Dict[str, Any]], None]:
+    """
+    Yield stream events in batches to be written at once, merging
+    consecutive text_delta events.
+
+    Buffered text is sent once it reaches flush_chars characters or is
+    flush_ms old, whichever comes first, and before any other event.
+    flush_ms=0 sends every delta on its own.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending: Optional[Dict[str, Any]] = None
+    parts: List[str] = []
+    size = 0
+    flush_at = 0.0
+    next_event: Optional[asyncio.Future] = None
+    deltas = frames = 0
+
+    def flush() -> List[Dict[str, Any]]:
+        nonlocal pending, size, frames
+        if pending is None:
+            return []
+        event = {**pending, "delta": "".join(parts)}
+        pending, size, frames = None, 0, frames + 1
+        parts.clear()
+        return [event]
+
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(iterator.__anext__())
+            if pending is not None:
+                # Wait for the next event only until the buffer is due
+                done, _ = await asyncio.wait(
+                    {next_event}, timeout=max(0.0, flush_at - loop.time())
+                )
+                if not done:
+                    yield flush()
+                    continue
+
+            try:
+                event = await next_event
+            except StopAsyncIteration:
+                break
+            finally:
+                next_event = None
+
+            if event.get("type") != "text_delta" or flush_ms <= 0:
+                if event.get("type") == "text_delta":
+                    deltas += 1
+                frames += 1
+                # The buffered text goes out in the same write as the event
+                yield flush() + [event]
+                continue
+
+            deltas += 1
+            if pending is not None and not _same_text(pending, event):
+                yield flush()
+            if pending is None:
+                pending = event
+                flush_at = loop.time() + flush_ms / 1000
+            parts.append(event["delta"])
+            size += len(event["delta"])
+            if size >= flush_chars:
+                yield flush()
+
+        if pending is not None:
+            yield flush()
+    finally:
+        if next_event is not None:
+            # The consumer went away while an event was being awaited
+            next_event.cancel()
+            await asyncio.gather(next_event, return_exceptions=True)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+        metrics.increment("stream.deltas", deltas)
+        metrics.increment("stream.frames", frames)
+
+
+async def coalesce_deltas(
+    events: AsyncIterable[Dict[str, Any]], flush_ms: float, flush_chars: int
+) -> AsyncGenerator[bytes, None]:
+    """
+    Encode stream events as SSE frames, one write per batch of coalesce_events.
+    """
+    batches = coalesce_events(events, flush_ms, flush_chars)
+    try:
+        async for batch in batches:
+            yield b"".join(frame(event) for event in batch)
+    finally:
+        await batches.aclose()
@@ -0,0 +1,150 @@
+"""
+Compare compressed ColBERT passage vectors against uncompressed ones.
+
+Chunk texts are sampled from a collection and embedded with the ColBERT model,
+then compressed with each method. Every held-out query is reranked over the
+same sample with MaxSim, and the ranking is compared with the uncompressed one.
+
+Usage (from the repository root):
+    python -m benchmarks.colbert_compression --source documents --max-docs 500
+"""
+
+import argparse
+import time
+import numpy as np
+from fastembed.late_interaction import LateInteractionTextEmbedding
+from qdrant_client import QdrantClient
+from app.config.settings import Settings
+from app.services.colbert_store import maxsim_scores
+from ingestion.colbert_compression import compress_colbert_embedding
+from benchmarks.common import (
+    DEFAULT_QUERIES_PATH,
+    load_queries,
+    overlap_at_k,
+    print_table,
+    summarize_latencies,
+    timed,
+)
+
+VARIANTS = [
+    ("prune", 1),
+    ("pool", 2),
+    ("pool", 3),
+    ("pool", 4),
+    ("prune_pool", 2),
+]
+
+
+def sample_texts(client, collection_name, max_docs):
+    """
+    Read up to max_docs chunk texts from a collection.
+    """
+    texts, offset = [], None
+    while len(texts) < max_docs:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(256, max_docs - len(texts)),
+            offset=offset,
+            with_payload=["text"],
+        )
+        texts.extend(r.payload["text"] for r in records if r.payload.get("text"))
+        if offset is None:
+            break
+    return texts
+
+
+def evaluate(query_vectors, documents, reference_rankings, k):
+    """
+    Rerank every query over documents; return latencies, overlap@k and the
+    reciprocal rank of each reference top-1 document.
+    """
+    latencies, overlaps, reciprocal_ranks = [], [], []
+    for query, reference in zip(query_vectors, reference_rankings):
+        scores, elapsed = timed(maxsim_scores, query, documents)
+        ranking = list(np.argsort(-scores))
+        latencies.append(elapsed)
+        overlaps.append(overlap_at_k(ranking, reference, k))
+        reciprocal_ranks.append(1.0 / (ranking.index(reference[0]) + 1))
+    return latencies, overlaps, reciprocal_ranks
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=settings.collection_name)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--max-docs", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    client = QdrantClient(
+        url=settings.qdrant_url,
+        api_key=settings.qdrant_api_key,
+        timeout=settings.qdrant_timeout,
+    )
+    model = LateInteractionTextEmbedding(settings.late_interaction_model_name)
+
+    texts = sample_texts(client, args.source, args.max_docs)
+    print(f"Embedding {len(texts)} chunks...")
+    documents = [np.asarray(v, dtype=np.float32) for v in model.passage_embed(texts)]
+    query_vectors = [
+        next(model.query_embed(q["query"])) for q in load_queries(args.queries)
+    ]
+
+    reference_rankings = [
+        list(np.argsort(-maxsim_scores(q, documents))) for q in query_vectors
+    ]
+    base_tokens = sum(len(d) for d in documents)
+    latencies, _, _ = evaluate(query_vectors, documents, reference_rankings, args.k)
+    rows = [
+        {
+            "variant": "uncompressed",
+            "vectors_per_doc": base_tokens / len(documents),
+            "storage_ratio": 1.0,
+            **summarize_latencies(latencies),
+            f"overlap@{args.k}": 1.0,
+            "mrr_top1": 1.0,
+        }
+    ]
+
+    for method, factor in VARIANTS:
+        start = time.perf_counter()
+        compressed = [
+            compress_colbert_embedding(d, t, method, factor)
+            for d, t in zip(documents, texts)
+        ]
+        compress_ms = (time.perf_counter() - start) / len(documents) * 1000
+
+        latencies, overlaps, reciprocal_ranks = evaluate(
+            query_vectors, compressed, reference_rankings, args.k
+        )
+        tokens = sum(len(d) for d in compressed)
+        rows.append(
+            {
+                "variant": method if method == "prune" else f"{method}/{factor}",
+                "vectors_per_doc": tokens / len(compressed),
+                "storage_ratio": tokens / base_tokens,
+                "compress_ms_per_doc": compress_ms,
+                **summarize_latencies(latencies),
+                f"overlap@{args.k}": sum(overlaps) / len(overlaps),
+                "mrr_top1": sum(reciprocal_ranks) / len(reciprocal_ranks),
+            }
+        )
+
+    print_table(
+        rows,
+        [
+            "variant",
+            "vectors_per_doc",
+            "storage_ratio",
+            "compress_ms_per_doc",
+            "p50_ms",
+            "p95_ms",
+            f"overlap@{args.k}",
+            "mrr_top1",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Compare collection storage configurations on a copy of an existing collection.
+
+For each configuration the source points are copied into a temporary
+collection, then the held-out query set is run through the API's hybrid query.
+Reports estimated RAM/disk footprint, query latency and overlap@k against the
+source collection (full float32, default HNSW).
+
+Usage (from the repository root):
+    python -m benchmarks.collection_configs --source documents --k 5
+"""
+
+import argparse
+from qdrant_client import QdrantClient
+from app.config.settings import Settings
+from app.services.embedder import QueryEmbedder
+from app.services.projection import CollectionProjection
+from app.services.retriever import QdrantRetriever
+from ingestion.collection import create_hybrid_collection
+from benchmarks.common import (
+    DEFAULT_QUERIES_PATH,
+    copy_points,
+    hybrid_query_ids,
+    load_queries,
+    overlap_at_k,
+    print_table,
+    summarize_latencies,
+    timed,
+    wait_until_indexed,
+)
+
+CONFIGURATIONS = {
+    "float32": {},
+    "scalar": {"quantization": "scalar"},
+    "scalar_on_disk": {"quantization": "scalar", "on_disk": True},
+    "binary_on_disk": {"quantization": "binary", "on_disk": True},
+    "no_colbert_index": {"colbert_index": False},
+    "scalar_on_disk_no_colbert_index": {
+        "quantization": "scalar",
+        "on_disk": True,
+        "colbert_index": False,
+    },
+    "hnsw_m8": {"hnsw_m": 8, "hnsw_ef_construct": 64},
+}
+
+DENSE_DIM = 768
+COLBERT_DIM = 128
+DEFAULT_HNSW_M = 16
+
+
+def estimate_memory(n_points, n_tokens, options, dense_dim=DENSE_DIM):
+    """
+    Estimate RAM and disk usage in MB for a configuration.
+
+    Original float32 vectors go to RAM or disk depending on on_disk;
+    quantized copies are always in RAM (1 byte/dim for int8, 1 bit/dim for
+    binary); HNSW level-0 links take about 2*m 4-byte IDs per point.
+    """
+    ram = disk = 0.0
+    quantization = options.get("quantization")
+    for n_vectors, dim in ((n_points, dense_dim), (n_tokens, COLBERT_DIM)):
+        raw = n_vectors * dim * 4
+        if options.get("on_disk"):
+            disk += raw
+        else:
+            ram += raw
+        if quantization == "scalar":
+            ram += n_vectors * dim
+        elif quantization == "binary":
+            ram += n_vectors * dim / 8
+
+    links = n_points * 2 * (options.get("hnsw_m") or DEFAULT_HNSW_M) * 4
+    ram += links
+    if options.get("colbert_index", True):
+        ram += links
+
+    return ram / 2**20, disk / 2**20
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=settings.collection_name)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--configs", nargs="+", default=list(CONFIGURATIONS), choices=CONFIGURATIONS
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the temporary collections"
+    )
+    args = parser.parse_args()
+
+    client = QdrantClient(
+        url=settings.qdrant_url,
+        api_key=settings.qdrant_api_key,
+        timeout=settings.qdrant_timeout,
+    )
+    embedder = QueryEmbedder(
+        dense_model_name=settings.dense_model_name,
+        bm25_model_name=settings.bm25_model_name,
+        late_interaction_model_name=settings.late_interaction_model_name,
+        dense_projection=CollectionProjection(
+            QdrantRetriever(
+                settings.model_copy(update={"collection_name": args.source}),
+                client=client,
+            ).dense_projection_source
+        ),
+    )
+
+    queries = load_queries(args.queries)
+    embeddings = [embedder.embed_query(q["query"]) for q in queries]
+    reference = [
+        hybrid_query_ids(client, args.source, e, args.k, settings.prefetch_limit)
+        for e in embeddings
+    ]
+
+    # Keep the source dense size (reduced when a PCA projection is used)
+    dense_size = client.get_collection(args.source).config.params.vectors["dense"].size
+
+    rows = []
+    for name in args.configs:
+        options = CONFIGURATIONS[name]
+        target = f"{args.source}_bench_{name}"
+        if client.collection_exists(target):
+            client.delete_collection(target)
+        create_hybrid_collection(client, target, dense_size=dense_size, **options)
+
+        n_tokens = 0
+
+        def count_tokens(point):
+            nonlocal n_tokens
+            n_tokens += len(point.vector["colbertv2.0"])
+            return point
+
+        n_points = copy_points(client, args.source, target, transform=count_tokens)
+        wait_until_indexed(client, target)
+
+        latencies, overlaps = [], []
+        for e, ref in zip(embeddings, reference):
+            for _ in range(args.repeats):
+                ids, elapsed = timed(
+                    hybrid_query_ids,
+                    client,
+                    target,
+                    e,
+                    args.k,
+                    settings.prefetch_limit,
+                )
+                latencies.append(elapsed)
+            overlaps.append(overlap_at_k(ids, ref, args.k))
+
+        ram_mb, disk_mb = estimate_memory(n_points, n_tokens, options, dense_size)
+        rows.append(
+            {
+                "config": name,
+                "points": n_points,
+                "est_ram_mb": ram_mb,
+                "est_disk_mb": disk_mb,
+                **summarize_latencies(latencies),
+                f"overlap@{args.k}": sum(overlaps) / len(overlaps),
+            }
+        )
+
+        if not args.keep:
+            client.delete_collection(target)
+
+    print_table(
+        rows,
+        [
+            "config",
+            "points",
+            "est_ram_mb",
+            "est_disk_mb",
+            "p50_ms",
+            "p95_ms",
+            f"overlap@{args.k}",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
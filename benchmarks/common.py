@@ -0,0 +1,185 @@
+import json
+import time
+from typing import Dict, List, Sequence
+from qdrant_client import QdrantClient, models
+from app.models.embeddings import QueryEmbeddings
+from app.services.embedder import QueryEmbedder
+from app.services.metrics import percentile
+from ingestion.collection import create_hybrid_collection
+
+DEFAULT_QUERIES_PATH = "benchmarks/data/queries.jsonl"
+DEFAULT_FIXTURE_PATH = "benchmarks/data/fixture.jsonl"
+
+
+def load_queries(path: str = DEFAULT_QUERIES_PATH) -> List[Dict]:
+    """
+    Load a JSONL query set, one {"query": ..., "limit": ...} object per line.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_latencies(seconds: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize latencies given in seconds as milliseconds.
+    """
+    return {
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p95_ms": percentile(seconds, 95) * 1000,
+        "mean_ms": (sum(seconds) / len(seconds) * 1000) if seconds else 0.0,
+    }
+
+
+def overlap_at_k(results: Sequence, reference: Sequence, k: int) -> float:
+    """
+    Fraction of the reference top-k that also appears in the results top-k.
+    """
+    reference_top = set(reference[:k])
+    if not reference_top:
+        return 1.0
+    return len(set(results[:k]) & reference_top) / len(reference_top)
+
+
+def timed(fn, *args, **kwargs):
+    """
+    Call fn and return (result, elapsed seconds).
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def print_table(rows: List[Dict], columns: List[str]):
+    """
+    Print rows as an aligned plain-text table.
+    """
+
+    def fmt(value):
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+    widths = {
+        c: max(len(c), *(len(fmt(row.get(c, ""))) for row in rows)) for c in columns
+    }
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(fmt(row.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+def hybrid_query_ids(
+    client: QdrantClient,
+    collection_name: str,
+    embeddings: QueryEmbeddings,
+    limit: int,
+    prefetch_limit: int = 25,
+) -> List:
+    """
+    Run the API's hybrid query (dense + BM25 prefetch, ColBERT rerank) and
+    return the ranked point IDs.
+    """
+    result = client.query_points(
+        collection_name=collection_name,
+        prefetch=[
+            models.Prefetch(
+                query=embeddings.dense, using="dense", limit=prefetch_limit
+            ),
+            models.Prefetch(
+                query=models.SparseVector(**embeddings.sparse_bm25.model_dump()),
+                using="sparse",
+                limit=prefetch_limit,
+            ),
+        ],
+        query=embeddings.late,
+        using="colbertv2.0",
+        with_payload=False,
+        limit=limit,
+    )
+    return [point.id for point in result.points]
+
+
+def copy_points(
+    client: QdrantClient,
+    source: str,
+    target: str,
+    batch_size: int = 64,
+    transform=None,
+) -> int:
+    """
+    Copy every point (vectors and payload) from one collection to another.
+
+    transform, if given, maps each PointStruct before it is written.
+    """
+    copied, offset = 0, None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = [
+            models.PointStruct(id=r.id, vector=r.vector, payload=r.payload)
+            for r in records
+        ]
+        if transform is not None:
+            points = [transform(point) for point in points]
+        if points:
+            client.upsert(collection_name=target, points=points, wait=True)
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def wait_until_indexed(client: QdrantClient, collection_name: str, timeout=600.0):
+    """
+    Wait for Qdrant's optimizers to finish building indexes (status green).
+    """
+    deadline = time.monotonic() + timeout
+    while (
+        client.get_collection(collection_name).status != models.CollectionStatus.GREEN
+    ):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Collection '{collection_name}' is still optimizing")
+        time.sleep(1.0)
+
+
+def seed_from_fixture(
+    client: QdrantClient,
+    collection_name: str,
+    embedder: QueryEmbedder,
+    path: str = DEFAULT_FIXTURE_PATH,
+) -> int:
+    """
+    Embed the fixture's chunks with the embedder's models into a new collection.
+    """
+    with open(path, encoding="utf-8") as f:
+        chunks = [json.loads(line) for line in f if line.strip()]
+    texts = [chunk["text"] for chunk in chunks]
+
+    dense = list(embedder.dense_embedding_model.passage_embed(texts))
+    if embedder.dense_projection is not None:
+        dense = [embedder.dense_projection.apply(vector) for vector in dense]
+    else:
+        dense = [vector.tolist() for vector in dense]
+    sparse = list(embedder.bm25_embedding_model.passage_embed(texts))
+    late = list(embedder.late_interaction_model.passage_embed(texts))
+
+    create_hybrid_collection(
+        client, collection_name, payload_indexes=False, dense_size=len(dense[0])
+    )
+    client.upsert(
+        collection_name=collection_name,
+        points=[
+            models.PointStruct(
+                id=i,
+                vector={
+                    "dense": dense[i],
+                    "sparse": models.SparseVector(**sparse[i].as_object()),
+                    "colbertv2.0": late[i].tolist(),
+                },
+                payload={"text": chunk["text"], "metadata": chunk["metadata"]},
+            )
+            for i, chunk in enumerate(chunks)
+        ],
+    )
+    return len(chunks)
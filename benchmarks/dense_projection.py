@@ -0,0 +1,180 @@
+"""
+Compare dense-prefetch latency and memory across PCA target dimensions.
+
+The full-width dense vectors of an existing collection are projected with a
+PCA fitted on the same corpus and copied into temporary dense-only
+collections. Every held-out query runs the dense prefetch against each of
+them; results are compared with the full-width (768) prefetch.
+
+Usage (from the repository root):
+    python -m benchmarks.dense_projection --source documents --dimensions 512 384 256
+"""
+
+import argparse
+import numpy as np
+from fastembed import TextEmbedding
+from qdrant_client import QdrantClient, models
+from app.config.settings import Settings
+from ingestion.projection import explained_variance, fit_pca, project
+from benchmarks.common import (
+    DEFAULT_QUERIES_PATH,
+    load_queries,
+    overlap_at_k,
+    print_table,
+    summarize_latencies,
+    timed,
+    wait_until_indexed,
+)
+
+DEFAULT_DIMENSIONS = [512, 384, 256, 128]
+DEFAULT_HNSW_M = 16
+
+
+def read_dense_vectors(client, collection_name):
+    """
+    Read every point ID and dense vector of a collection.
+    """
+    ids, vectors, offset = [], [], None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=512,
+            offset=offset,
+            with_vectors=["dense"],
+        )
+        ids.extend(r.id for r in records)
+        vectors.extend(r.vector["dense"] for r in records)
+        if offset is None:
+            return ids, np.asarray(vectors, dtype=np.float32)
+
+
+def create_dense_collection(client, collection_name, ids, vectors, batch_size=256):
+    """
+    Create a dense-only collection holding the given vectors.
+    """
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={
+            "dense": models.VectorParams(
+                size=vectors.shape[1], distance=models.Distance.COSINE
+            )
+        },
+    )
+    for start in range(0, len(ids), batch_size):
+        client.upsert(
+            collection_name=collection_name,
+            points=models.Batch(
+                ids=ids[start : start + batch_size],
+                vectors={"dense": vectors[start : start + batch_size].tolist()},
+            ),
+            wait=True,
+        )
+    wait_until_indexed(client, collection_name)
+
+
+def dense_prefetch_ids(client, collection_name, vector, limit):
+    """
+    Run the dense prefetch stage alone and return the ranked point IDs.
+    """
+    result = client.query_points(
+        collection_name=collection_name,
+        query=vector,
+        using="dense",
+        with_payload=False,
+        limit=limit,
+    )
+    return [point.id for point in result.points]
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=settings.collection_name)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=DEFAULT_DIMENSIONS)
+    parser.add_argument(
+        "--k",
+        type=int,
+        default=settings.prefetch_limit,
+        help="Candidates compared per query (default: the API prefetch limit)",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the temporary collections"
+    )
+    args = parser.parse_args()
+
+    client = QdrantClient(
+        url=settings.qdrant_url,
+        api_key=settings.qdrant_api_key,
+        timeout=settings.qdrant_timeout,
+    )
+    model = TextEmbedding(settings.dense_model_name)
+
+    ids, vectors = read_dense_vectors(client, args.source)
+    if vectors.shape[1] != model.embedding_size:
+        raise SystemExit(
+            f"'{args.source}' already stores {vectors.shape[1]}-d dense vectors; "
+            "use a full-width collection as source"
+        )
+    queries = np.stack(
+        [next(model.query_embed(q["query"])) for q in load_queries(args.queries)]
+    )
+    print(f"{len(ids)} points, {len(queries)} queries")
+
+    rows, reference = [], None
+    for dimensions in [vectors.shape[1]] + sorted(args.dimensions, reverse=True):
+        if dimensions < vectors.shape[1]:
+            mean, components = fit_pca(vectors, dimensions)
+            corpus = project(vectors, mean, components)
+            query_vectors = project(queries, mean, components)
+            variance = explained_variance(vectors, mean, components)
+        else:
+            corpus, query_vectors, variance = vectors, queries, 1.0
+
+        target = f"{args.source}_bench_dense_{dimensions}"
+        create_dense_collection(client, target, ids, corpus)
+
+        latencies, results = [], []
+        for vector in query_vectors.tolist():
+            for _ in range(args.repeats):
+                hits, elapsed = timed(
+                    dense_prefetch_ids, client, target, vector, args.k
+                )
+                latencies.append(elapsed)
+            results.append(hits)
+        reference = reference or results
+
+        overlaps = [overlap_at_k(r, ref, args.k) for r, ref in zip(results, reference)]
+        # Raw float32 vectors plus HNSW level-0 links (2*m 4-byte IDs per point)
+        ram_mb = len(ids) * (dimensions * 4 + 2 * DEFAULT_HNSW_M * 4) / 2**20
+        rows.append(
+            {
+                "dimensions": dimensions,
+                "explained_var": variance,
+                "est_ram_mb": ram_mb,
+                **summarize_latencies(latencies),
+                f"overlap@{args.k}": sum(overlaps) / len(overlaps),
+            }
+        )
+
+        if not args.keep:
+            client.delete_collection(target)
+
+    print_table(
+        rows,
+        [
+            "dimensions",
+            "explained_var",
+            "est_ram_mb",
+            "p50_ms",
+            "p95_ms",
+            f"overlap@{args.k}",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
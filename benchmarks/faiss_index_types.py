@@ -0,0 +1,125 @@
+"""
+Compare FAISS index types by build time, size, query latency and recall.
+
+Synthetic clustered, normalized vectors (like sentence embeddings) are
+indexed with each factory string through exemplos/faiss_index.py, saved and
+reloaded memory-mapped. Queries are held-out vectors from the same clusters;
+recall@k is measured against the exact "Flat" results.
+
+Usage (from the repository root):
+    python -m benchmarks.faiss_index_types --sizes 10000 100000 1000000 --dim 384
+"""
+
+import argparse
+import math
+import os
+import shutil
+import tempfile
+import numpy as np
+from exemplos.faiss_index import FaissIndex, INDEX_FILE
+from benchmarks.common import print_table, summarize_latencies, timed
+
+# {nlist} and {pq} are filled in from the corpus size and dimension
+FACTORIES = ["Flat", "HNSW32", "IVF{nlist},Flat", "IVF{nlist},PQ{pq}"]
+
+
+def clustered_vectors(n, dim, clusters, rng, centers=None):
+    """
+    Normalized points around random cluster centers; returns (vectors, centers).
+    """
+    if centers is None:
+        centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors += 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors, centers
+
+
+def recall_at_k(ids, reference, k):
+    return float(
+        np.mean([len(set(r[:k]) & set(t[:k])) / k for r, t in zip(ids, reference)])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--factories", nargs="+", default=FACTORIES)
+    parser.add_argument("--nprobe", type=int, default=16, help="IVF lists visited")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW search list")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    rows = []
+    for size in args.sizes:
+        clusters = max(16, int(math.sqrt(size)))
+        vectors, centers = clustered_vectors(size, args.dim, clusters, rng)
+        queries, _ = clustered_vectors(args.queries, args.dim, clusters, rng, centers)
+        print(f"{size} vectors of {args.dim} dimensions...")
+
+        reference = None
+        for template in args.factories:
+            factory = template.format(
+                nlist=int(4 * math.sqrt(size)), pq=max(1, args.dim // 8)
+            )
+            built, build_seconds = timed(FaissIndex.build, vectors, None, factory, "ip")
+
+            path = tempfile.mkdtemp(prefix="faiss_index_")
+            try:
+                built.save(path)
+                index_mb = os.path.getsize(os.path.join(path, INDEX_FILE)) / 2**20
+                index, load_seconds = timed(FaissIndex.load, path)
+                index.set_search_params(
+                    nprobe=args.nprobe if "IVF" in factory else None,
+                    ef_search=args.ef_search if "HNSW" in factory else None,
+                )
+
+                latencies = [
+                    timed(index.search_ids, query, args.k)[1] for query in queries
+                ]
+                (_, ids), batch_seconds = timed(index.search_ids, queries, args.k)
+            finally:
+                del built
+                shutil.rmtree(path)
+
+            # The first exact index is the ground truth
+            if reference is None and factory == "Flat":
+                reference = ids
+            rows.append(
+                {
+                    "size": size,
+                    "factory": factory,
+                    "build_s": build_seconds,
+                    "index_mb": index_mb,
+                    "load_ms": load_seconds * 1000,
+                    **summarize_latencies(latencies),
+                    "batch_qps": len(queries) / batch_seconds,
+                    f"recall@{args.k}": (
+                        recall_at_k(ids, reference, args.k)
+                        if reference is not None
+                        else None
+                    ),
+                }
+            )
+
+    print_table(
+        rows,
+        [
+            "size",
+            "factory",
+            "build_s",
+            "index_mb",
+            "load_ms",
+            "p50_ms",
+            "p95_ms",
+            "batch_qps",
+            f"recall@{args.k}",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
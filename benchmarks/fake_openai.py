@@ -0,0 +1,168 @@
+"""
+Serve a fake OpenAI Responses API for load tests.
+
+POST /v1/responses answers every prompt with filler text after a fixed time
+to first token, then at a fixed rate of tokens per second, streamed or not,
+in the event format the openai client parses. Point the API at it with
+OPENAI_BASE_URL=http://localhost:8100/v1 (load_stack.py does this itself).
+
+Usage (from the repository root):
+    python -m benchmarks.fake_openai --port 8100 --ttft-ms 300 --tokens-per-second 60
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+import orjson
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+FILLER = (
+    "De acordo com o contexto fornecido, o exercício da profissão depende do "
+    "registro no Conselho Regional e das atribuições definidas no regulamento."
+).split()
+
+
+def create_app(
+    ttft_ms: float = 300.0, tokens_per_second: float = 60.0, output_tokens: int = 150
+) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI Responses API")
+
+    def response_object(response_id, model, status, text=None, usage=None):
+        output = []
+        if text is not None:
+            output = [
+                {
+                    "type": "message",
+                    "id": f"msg_{response_id}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [
+                        {"type": "output_text", "text": text, "annotations": []}
+                    ],
+                }
+            ]
+        return {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": model,
+            "status": status,
+            "output": output,
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": usage,
+        }
+
+    def usage_object(prompt, tokens):
+        # About four characters per token is close enough for a stand-in
+        input_tokens = len(orjson.dumps(prompt)) // 4
+        return {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + tokens,
+        }
+
+    @app.post("/v1/responses")
+    async def create_response(request: Request):
+        body = orjson.loads(await request.body())
+        model = body.get("model", "fake")
+        tokens = min(output_tokens, body.get("max_output_tokens") or output_tokens)
+        words = [FILLER[i % len(FILLER)] + " " for i in range(tokens)]
+        response_id = f"resp_{uuid.uuid4().hex}"
+        usage = usage_object(body.get("input"), tokens)
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft_ms / 1000 + tokens / tokens_per_second)
+            return Response(
+                orjson.dumps(
+                    response_object(
+                        response_id, model, "completed", "".join(words), usage
+                    )
+                ),
+                media_type="application/json",
+            )
+
+        async def events():
+            sequence = 0
+
+            def event(data):
+                nonlocal sequence
+                data["sequence_number"] = sequence
+                sequence += 1
+                return (
+                    b"event: "
+                    + data["type"].encode()
+                    + b"\ndata: "
+                    + orjson.dumps(data)
+                    + b"\n\n"
+                )
+
+            yield event(
+                {
+                    "type": "response.created",
+                    "response": response_object(response_id, model, "in_progress"),
+                }
+            )
+            await asyncio.sleep(ttft_ms / 1000)
+
+            # Sleep on a schedule, not per token, so the rate holds under load
+            start = time.perf_counter()
+            for i, word in enumerate(words):
+                delay = start + i / tokens_per_second - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield event(
+                    {
+                        "type": "response.output_text.delta",
+                        "item_id": f"msg_{response_id}",
+                        "output_index": 0,
+                        "content_index": 0,
+                        "delta": word,
+                    }
+                )
+
+            text = "".join(words)
+            yield event(
+                {
+                    "type": "response.output_text.done",
+                    "item_id": f"msg_{response_id}",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "text": text,
+                }
+            )
+            yield event(
+                {
+                    "type": "response.completed",
+                    "response": response_object(
+                        response_id, model, "completed", text, usage
+                    ),
+                }
+            )
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--output-tokens", type=int, default=150)
+    args = parser.parse_args()
+
+    app = create_app(args.ttft_ms, args.tokens_per_second, args.output_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Time the API's per-request hot paths and compare the results with a baseline.
+
+Runs offline. The embedding models are replaced by fixture models that hash
+tokens into vectors of the real models' shapes (768 dense dimensions, BM25
+term weights, 128 per ColBERT token), so the cases time the code around the
+models; --real-models uses the configured models instead. The retriever
+searches an in-memory Qdrant collection seeded from benchmarks/data/fixture.jsonl,
+with the result cache disabled. Cases:
+
+    embed_query         QueryEmbedder.embed_query with all three encoders
+    query_embeddings    QueryEmbeddings validation of the raw query vectors
+    search/<tier>       QdrantRetriever.search_documents in each retrieval tier
+    to_documents        mapping the Qdrant points of a search to Documents
+    build_prompt        OpenAIService prompt and input assembly
+
+Each case is timed per call over the query set, cycling. --output saves the
+results as JSON; with --baseline (or --compare on two saved files) every case
+whose p50 grew by more than --threshold percent is flagged as a regression,
+and the exit status is 1 if there is any.
+
+Usage (from the repository root):
+    python -m benchmarks.hot_paths --output before.json
+    python -m benchmarks.hot_paths --output after.json --baseline before.json
+    python -m benchmarks.hot_paths --compare before.json after.json --threshold 10
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import platform
+import re
+import sys
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache
+import numpy as np
+from fastembed.sparse.sparse_embedding_base import SparseEmbedding
+from qdrant_client import QdrantClient
+from app.config.settings import Settings
+from app.models.embeddings import QueryEmbeddings, SparseVector
+from app.services.embedder import QueryEmbedder
+from app.services.load_policy import TIERS
+from app.services.openai_service import OpenAIService
+from app.services.retriever import QdrantRetriever
+from benchmarks.common import (
+    DEFAULT_FIXTURE_PATH,
+    DEFAULT_QUERIES_PATH,
+    load_queries,
+    print_table,
+    seed_from_fixture,
+    summarize_latencies,
+    timed,
+)
+
+COLLECTION_NAME = "hot_paths"
+
+
+def tokenize(text: str):
+    return re.findall(r"\w+", text.lower())
+
+
+@lru_cache(maxsize=None)
+def token_vector(token: str, dim: int) -> np.ndarray:
+    # crc32, unlike hash(), gives the same vectors in every process
+    rng = np.random.default_rng(zlib.crc32(f"{dim}:{token}".encode()))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FixtureDenseModel:
+    """
+    Stand-in for TextEmbedding: the normalized sum of hashed token vectors.
+    """
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+
+    def embed(self, documents):
+        for text in [documents] if isinstance(documents, str) else documents:
+            vector = sum(token_vector(t, self.dim) for t in tokenize(text))
+            yield vector / max(np.linalg.norm(vector), 1e-9)
+
+    passage_embed = embed
+
+
+class FixtureBm25Model:
+    """
+    Stand-in for Bm25: one weight per distinct token, by term frequency.
+    """
+
+    def embed(self, documents):
+        for text in [documents] if isinstance(documents, str) else documents:
+            counts = {}
+            for token in tokenize(text):
+                index = zlib.crc32(token.encode()) & 0x7FFFFFFF
+                counts[index] = counts.get(index, 0) + 1
+            yield SparseEmbedding.from_dict(
+                {index: count / (count + 1.2) for index, count in counts.items()}
+            )
+
+    passage_embed = embed
+
+
+class FixtureLateInteractionModel:
+    """
+    Stand-in for LateInteractionTextEmbedding: one hashed vector per token.
+    """
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+
+    def embed(self, documents):
+        for text in [documents] if isinstance(documents, str) else documents:
+            yield np.stack([token_vector(t, self.dim) for t in tokenize(text)])
+
+    passage_embed = embed
+
+
+class FixtureEmbedder(QueryEmbedder):
+    """
+    QueryEmbedder over the fixture models, so no model is downloaded or run.
+    """
+
+    def __init__(self):
+        self.dense_embedding_model = FixtureDenseModel()
+        self.bm25_embedding_model = FixtureBm25Model()
+        self.late_interaction_model = FixtureLateInteractionModel()
+        self.dense_projection = None
+
+
+def measure(fn, inputs, repeat: int, warmup: int):
+    """
+    Time fn once per input, cycling through inputs; returns the seconds.
+    """
+    calls = itertools.cycle(inputs)
+    for _ in range(warmup):
+        fn(next(calls))
+
+    # As timeit does, keep collections from landing in random samples
+    gc.collect()
+    gc.disable()
+    try:
+        return [timed(fn, next(calls))[1] for _ in range(repeat)]
+    finally:
+        gc.enable()
+
+
+def build_cases(embedder: QueryEmbedder, retriever, openai_service, queries):
+    """
+    The cases as (name, fn, inputs), inputs precomputed so only fn is timed.
+    """
+    raw = [
+        {
+            "dense": embedder.embed_dense(q["query"]),
+            "sparse": next(embedder.bm25_embedding_model.embed(q["query"])),
+            "late": embedder.embed_late(q["query"]),
+        }
+        for q in queries
+    ]
+    embedded = [(embedder.embed_query(q["query"]), q.get("limit", 5)) for q in queries]
+    searched = [
+        (retriever.hybrid_search(embeddings, limit, None), query["query"])
+        for (embeddings, limit), query in zip(embedded, queries)
+    ]
+    prompted = [(query, retriever.to_documents(points)) for points, query in searched]
+
+    cases = [
+        ("embed_query", lambda q: embedder.embed_query(q["query"]), queries),
+        (
+            "query_embeddings",
+            lambda r: QueryEmbeddings(
+                dense=r["dense"],
+                sparse_bm25=SparseVector(**r["sparse"].as_object()),
+                late=r["late"],
+            ),
+            raw,
+        ),
+    ]
+    for tier in TIERS:
+        cases.append(
+            (
+                f"search/{tier}",
+                lambda e, tier=tier: retriever.search_documents(
+                    embeddings=e[0], limit=e[1], tier=tier
+                ),
+                embedded,
+            )
+        )
+    cases += [
+        ("to_documents", lambda s: retriever.to_documents(s[0]), searched),
+        (
+            "build_prompt",
+            lambda p: openai_service.build_input(
+                openai_service.build_prompt(p[0], p[1]), None
+            ),
+            prompted,
+        ),
+    ]
+    return cases
+
+
+def compare(baseline, current, threshold: float):
+    """
+    Print the p50 change of every case; returns the names of regressions.
+    """
+    for key in ("models", "platform", "python"):
+        if baseline.get(key) != current.get(key):
+            print(
+                f"Note: {key} differs ({baseline.get(key)} vs {current.get(key)}), "
+                "so the runs may not be comparable"
+            )
+
+    rows, regressions = [], []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            rows.append(
+                {"case": name, "after_p50_ms": result["p50_ms"], "status": "new"}
+            )
+            continue
+        change = (
+            (result["p50_ms"] / before["p50_ms"] - 1) * 100
+            if before["p50_ms"] > 0
+            else 0.0
+        )
+        status = "ok"
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "faster"
+        rows.append(
+            {
+                "case": name,
+                "before_p50_ms": before["p50_ms"],
+                "after_p50_ms": result["p50_ms"],
+                "change_pct": change,
+                "status": status,
+            }
+        )
+    for name in sorted(baseline["results"].keys() - current["results"].keys()):
+        rows.append({"case": name, "status": "missing"})
+
+    print_table(rows, ["case", "before_p50_ms", "after_p50_ms", "change_pct", "status"])
+    return regressions
+
+
+def run(args):
+    settings = Settings().model_copy(
+        update={
+            "collection_name": COLLECTION_NAME,
+            # The OpenAI client is built but never called
+            "openai_api_key": "unused",
+            "qdrant_shards": [],
+            "rerank_mode": "always",
+            "rerank_backend": "qdrant",
+            "docstore_path": None,
+            "result_cache_size": 0,
+        }
+    )
+    if args.real_models:
+        embedder = QueryEmbedder(
+            settings.dense_model_name,
+            settings.bm25_model_name,
+            settings.late_interaction_model_name,
+        )
+    else:
+        embedder = FixtureEmbedder()
+
+    client = QdrantClient(":memory:")
+    seed_from_fixture(client, COLLECTION_NAME, embedder, args.fixture)
+    retriever = QdrantRetriever(settings, client=client)
+    openai_service = OpenAIService(settings)
+
+    queries = load_queries(args.queries)
+    results = {}
+    for name, fn, inputs in build_cases(embedder, retriever, openai_service, queries):
+        if args.cases and not any(name.startswith(c) for c in args.cases):
+            continue
+        seconds = measure(fn, inputs, args.repeat, args.warmup)
+        results[name] = {**summarize_latencies(seconds), "runs": len(seconds)}
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "models": "real" if args.real_models else "fixture",
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE_PATH)
+    parser.add_argument(
+        "--cases", nargs="+", default=None, help="Only cases starting with these"
+    )
+    parser.add_argument("--repeat", type=int, default=1000, help="Timed calls per case")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument(
+        "--real-models",
+        action="store_true",
+        help="Use the configured embedding models instead of the fixture models",
+    )
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    parser.add_argument("--baseline", default=None, help="Results JSON to compare with")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        default=None,
+        help="Compare two saved results instead of running",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="Allowed p50 increase, percent"
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        current = run(args)
+        print_table(
+            [{"case": name, **result} for name, result in current["results"].items()],
+            ["case", "runs", "p50_ms", "p95_ms", "mean_ms"],
+        )
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+
+    if baseline is not None:
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} case(s) slower than the baseline by more "
+                f"than {args.threshold:g}% at p50: {', '.join(regressions)}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Serve the API against local stand-ins for OpenAI and Qdrant, for load tests.
+
+The API runs with its real embedding models, but searches an in-memory Qdrant
+collection seeded from a small fixture (or from an Arrow export) and calls the
+fake Responses API of fake_openai.py, started in this process unless
+--llm-url points to one running elsewhere. Load tests then cost nothing and
+need no Qdrant server; drive them with load_test.py.
+
+In-memory Qdrant searches in Python, so absolute search latencies are higher
+than a Qdrant server's; compare runs with each other, not with production.
+
+Usage (from the repository root):
+    python -m benchmarks.load_stack --port 8000 --ttft-ms 300 --tokens-per-second 60
+"""
+
+import argparse
+import asyncio
+import uvicorn
+from qdrant_client import QdrantClient
+from app.dependencies import (
+    get_embedder,
+    get_openai_service,
+    get_retriever,
+    get_settings,
+)
+from app.main import app
+from app.services.openai_service import OpenAIService
+from app.services.retriever import QdrantRetriever
+from ingestion.corpus_export import (
+    create_collection_from_export,
+    export_config,
+    iter_points,
+    open_export,
+)
+from benchmarks.common import DEFAULT_FIXTURE_PATH, seed_from_fixture
+from benchmarks.fake_openai import create_app
+
+COLLECTION_NAME = "load_test"
+
+
+def seed_from_export(client: QdrantClient, path: str, batch_size: int = 256):
+    """
+    Load an Arrow export (create-collection.py --export) into a new collection.
+    """
+    reader = open_export(path)
+    create_collection_from_export(client, COLLECTION_NAME, export_config(reader))
+    batch, count = [], 0
+    for point in iter_points(reader):
+        batch.append(point)
+        if len(batch) == batch_size:
+            client.upsert(collection_name=COLLECTION_NAME, points=batch)
+            count, batch = count + len(batch), []
+    if batch:
+        client.upsert(collection_name=COLLECTION_NAME, points=batch)
+        count += len(batch)
+    return count
+
+
+async def serve(servers):
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE_PATH)
+    parser.add_argument(
+        "--index", default=None, help="Arrow export to load instead of the fixture"
+    )
+    parser.add_argument(
+        "--llm-url",
+        default=None,
+        help="Base URL of a fake_openai.py server run separately (e.g. "
+        "http://localhost:8100/v1), to keep it off the API's event loop",
+    )
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument(
+        "--result-cache-size",
+        type=int,
+        default=0,
+        help="Search result cache entries (0, the default, disables it)",
+    )
+    args = parser.parse_args()
+
+    llm_url = args.llm_url or f"http://{args.host}:{args.llm_port}/v1"
+    settings = get_settings().model_copy(
+        update={
+            "collection_name": COLLECTION_NAME,
+            "openai_api_key": "fake",
+            "openai_base_url": llm_url,
+            "qdrant_shards": [],
+            "retriever_backend": "qdrant",
+            "docstore_path": None,
+            # Off by default: the query log is replayed in a loop, so after one
+            # pass every search would be a cache hit and never reach Qdrant
+            "result_cache_size": args.result_cache_size,
+        }
+    )
+
+    # The in-memory client lives in this process and replaces the Qdrant server
+    embedder = get_embedder()
+    client = QdrantClient(":memory:")
+    if args.index:
+        count = seed_from_export(client, args.index)
+    else:
+        count = seed_from_fixture(client, COLLECTION_NAME, embedder, args.fixture)
+    print(f"Seeded '{COLLECTION_NAME}' with {count} points")
+
+    retriever = QdrantRetriever(settings, client=client)
+    openai_service = OpenAIService(settings)
+    app.dependency_overrides.update(
+        {
+            get_settings: lambda: settings,
+            get_embedder: lambda: embedder,
+            get_retriever: lambda: retriever,
+            get_openai_service: lambda: openai_service,
+        }
+    )
+
+    servers = [
+        uvicorn.Server(
+            uvicorn.Config(app, host=args.host, port=args.port, log_level="warning")
+        )
+    ]
+    if args.llm_url is None:
+        fake = create_app(args.ttft_ms, args.tokens_per_second, args.output_tokens)
+        servers.append(
+            uvicorn.Server(
+                uvicorn.Config(
+                    fake, host=args.host, port=args.llm_port, log_level="warning"
+                )
+            )
+        )
+    print(
+        f"API on http://{args.host}:{args.port}, LLM at {llm_url}, "
+        f"result cache size {args.result_cache_size}"
+    )
+    asyncio.run(serve(servers))
+
+
+if __name__ == "__main__":
+    main()
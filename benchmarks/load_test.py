@@ -0,0 +1,152 @@
+"""
+Replay a query log against the running API and report throughput and latency.
+
+Each line of the JSONL log ({"query": ..., "limit": ..., "filters": ...}) is
+sent in turn, cycling, to /search, /openai or /openai/stream. With --rate,
+requests start on a fixed schedule whatever the server's speed (open loop),
+and latency counts from the scheduled start, so queueing is not hidden.
+Otherwise --concurrency clients send requests back to back (closed loop).
+Reports requests/s, latency percentiles, errors and, for the stream, the
+time to first token (first text_delta event).
+
+Start the API with local stand-ins for OpenAI and Qdrant first:
+    python -m benchmarks.load_stack --port 8000
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --endpoint openai/stream --concurrency 32 --duration 30
+    python -m benchmarks.load_test --endpoint search openai --rate 50 --duration 30
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+import httpx
+import orjson
+from app.services.metrics import percentile
+from benchmarks.common import (
+    DEFAULT_QUERIES_PATH,
+    load_queries,
+    print_table,
+    summarize_latencies,
+)
+
+ENDPOINTS = ["search", "openai", "openai/stream"]
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, body: dict):
+    """
+    Send one request; returns (ok, time to first token or None).
+    """
+    start = time.perf_counter()
+    if endpoint != "openai/stream":
+        response = await client.post(f"/{endpoint}", json=body)
+        return response.status_code == 200, None
+
+    ttft, ok = None, False
+    async with client.stream("POST", "/openai/stream", json=body) as response:
+        if response.status_code != 200:
+            return False, None
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = orjson.loads(line[6:])
+            if event["type"] == "text_delta" and ttft is None:
+                ttft = time.perf_counter() - start
+            elif event["type"] == "error":
+                return False, ttft
+            elif event["type"] == "stream_completed":
+                ok = True
+    return ok, ttft
+
+
+async def run(args, endpoint: str, queries):
+    results = []  # (ok, latency, ttft)
+    bodies = itertools.cycle(queries)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(
+        base_url=args.url, timeout=args.timeout, limits=limits
+    ) as client:
+        for body in itertools.islice(bodies, args.warmup):
+            await send(client, endpoint, body)
+
+        async def timed_send(body, start):
+            try:
+                ok, ttft = await send(client, endpoint, body)
+            except httpx.HTTPError:
+                ok, ttft = False, None
+            results.append((ok, time.perf_counter() - start, ttft))
+
+        begin = time.perf_counter()
+        end = begin + args.duration
+        if args.rate:
+            # Open loop: request i starts at begin + i / rate
+            tasks = []
+            for i in itertools.count():
+                scheduled = begin + i / args.rate
+                if scheduled >= end:
+                    break
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                tasks.append(asyncio.create_task(timed_send(next(bodies), scheduled)))
+            await asyncio.gather(*tasks)
+        else:
+
+            async def worker():
+                while time.perf_counter() < end:
+                    await timed_send(next(bodies), time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - begin
+
+    latencies = [latency for ok, latency, _ in results if ok]
+    ttfts = [ttft for ok, _, ttft in results if ok and ttft is not None]
+    row = {
+        "endpoint": endpoint,
+        "load": f"{args.rate}/s" if args.rate else f"{args.concurrency} clients",
+        "requests": len(results),
+        "errors": sum(1 for ok, _, _ in results if not ok),
+        "rps": len(latencies) / elapsed,
+        **summarize_latencies(latencies),
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+    if endpoint == "openai/stream":
+        row["ttft_p50_ms"] = percentile(ttfts, 50) * 1000
+        row["ttft_p95_ms"] = percentile(ttfts, 95) * 1000
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--endpoint", nargs="+", default=["search"], choices=ENDPOINTS)
+    parser.add_argument(
+        "--rate", type=float, default=None, help="Requests per second (open loop)"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    rows = [asyncio.run(run(args, endpoint, queries)) for endpoint in args.endpoint]
+    print_table(
+        rows,
+        [
+            "endpoint",
+            "load",
+            "requests",
+            "errors",
+            "rps",
+            "p50_ms",
+            "p95_ms",
+            "p99_ms",
+            "ttft_p50_ms",
+            "ttft_p95_ms",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare the in-process LocalHybridRetriever with QdrantRetriever.
+
+The source collection is exported to an Arrow file (or an existing export is
+used) and loaded by the local retriever. Every held-out query is searched in
+each retrieval tier by both retrievers; reports latency and overlap@k of the
+local results against Qdrant's.
+
+Usage (from the repository root):
+    python -m benchmarks.local_retriever --source documents --k 5
+"""
+
+import argparse
+import os
+import tempfile
+from app.config.settings import Settings
+from app.services.embedder import QueryEmbedder
+from app.services.projection import CollectionProjection
+from app.services.load_policy import TIERS
+from app.services.local_retriever import LocalHybridRetriever
+from app.services.retriever import QdrantRetriever
+from ingestion.corpus_export import export_collection
+from benchmarks.common import (
+    DEFAULT_QUERIES_PATH,
+    load_queries,
+    overlap_at_k,
+    print_table,
+    summarize_latencies,
+    timed,
+)
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=settings.collection_name)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--index",
+        default=None,
+        help="Existing Arrow export to load instead of exporting the source",
+    )
+    args = parser.parse_args()
+
+    settings = settings.model_copy(
+        update={"collection_name": args.source, "result_cache_size": 0}
+    )
+    qdrant = QdrantRetriever(settings)
+
+    path = args.index
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="local_index_"), "corpus.arrow")
+        print(f"Exporting '{args.source}' to {path}...")
+        export_collection(qdrant.client, args.source, path)
+
+    local, load_seconds = timed(
+        LocalHybridRetriever,
+        settings.model_copy(
+            update={"retriever_backend": "local", "local_index_path": path}
+        ),
+    )
+    print(f"Local index loaded in {load_seconds:.1f}s ({len(local.ids)} points)")
+
+    embedder = QueryEmbedder(
+        dense_model_name=settings.dense_model_name,
+        bm25_model_name=settings.bm25_model_name,
+        late_interaction_model_name=settings.late_interaction_model_name,
+        dense_projection=CollectionProjection(qdrant.dense_projection_source),
+    )
+    embeddings = [embedder.embed_query(q["query"]) for q in load_queries(args.queries)]
+
+    rows = []
+    for tier in TIERS:
+        results = {}
+        for name, retriever in (("qdrant", qdrant), ("local", local)):
+            latencies, ranked = [], []
+            for e in embeddings:
+                for _ in range(args.repeats):
+                    documents, elapsed = timed(
+                        retriever.search_documents, e, args.k, tier=tier
+                    )
+                    latencies.append(elapsed)
+                ranked.append([d.page_content for d in documents])
+            results[name] = (latencies, ranked)
+
+        reference = results["qdrant"][1]
+        for name, (latencies, ranked) in results.items():
+            overlaps = [
+                overlap_at_k(r, ref, args.k) for r, ref in zip(ranked, reference)
+            ]
+            rows.append(
+                {
+                    "tier": tier,
+                    "retriever": name,
+                    **summarize_latencies(latencies),
+                    f"overlap@{args.k}": sum(overlaps) / len(overlaps),
+                }
+            )
+
+    print_table(rows, ["tier", "retriever", "p50_ms", "p95_ms", f"overlap@{args.k}"])
+
+
+if __name__ == "__main__":
+    main()
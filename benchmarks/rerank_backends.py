@@ -0,0 +1,156 @@
+"""
+Compare the Qdrant-side ColBERT rerank with the local numpy MaxSim rerank.
+
+The ColBERT matrices of an existing collection are copied into a local store
+(the same format ingestion writes with --colbert-store). Every held-out query
+then goes through both rerank backends of QdrantRetriever. Reports latency,
+overlap@k against the Qdrant backend and the memory each one needs for the
+ColBERT vectors.
+
+Usage (from the repository root):
+    python -m benchmarks.rerank_backends --source documents --k 5
+"""
+
+import argparse
+import os
+import tempfile
+from app.config.settings import Settings
+from app.services.embedder import QueryEmbedder
+from app.services.projection import CollectionProjection
+from app.services.retriever import QdrantRetriever
+from ingestion.colbert_store import COLBERT_STORE_DTYPE, write_colbert_vectors
+from benchmarks.common import (
+    DEFAULT_QUERIES_PATH,
+    load_queries,
+    overlap_at_k,
+    print_table,
+    summarize_latencies,
+    timed,
+)
+
+COLBERT_DIM = 128
+
+
+def build_store(client, collection_name, path, dtype, batch_size=256):
+    """
+    Copy every ColBERT matrix of a collection into a local store.
+
+    Returns the number of token vectors.
+    """
+    n_tokens, offset = 0, None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_vectors=["colbertv2.0"],
+        )
+        write_colbert_vectors(
+            path, ((r.id, r.vector["colbertv2.0"]) for r in records), dtype
+        )
+        n_tokens += sum(len(r.vector["colbertv2.0"]) for r in records)
+        if offset is None:
+            return n_tokens
+
+
+def directory_size_mb(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 2**20
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=settings.collection_name)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--dtype", choices=["float16", "float32"], default=COLBERT_STORE_DTYPE
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help="Existing ColBERT store to use instead of building a temporary one",
+    )
+    args = parser.parse_args()
+
+    settings = settings.model_copy(update={"collection_name": args.source})
+    qdrant_backend = QdrantRetriever(settings)
+
+    store_path = args.store or tempfile.mkdtemp(prefix="colbert_store_")
+    n_tokens = None
+    if args.store is None:
+        print(f"Building a local ColBERT store in {store_path}...")
+        n_tokens = build_store(
+            qdrant_backend.client, args.source, store_path, args.dtype
+        )
+
+    local_backend = QdrantRetriever(
+        settings.model_copy(
+            update={"rerank_backend": "local", "colbert_store_path": store_path}
+        )
+    )
+    embedder = QueryEmbedder(
+        dense_model_name=settings.dense_model_name,
+        bm25_model_name=settings.bm25_model_name,
+        late_interaction_model_name=settings.late_interaction_model_name,
+        dense_projection=CollectionProjection(qdrant_backend.dense_projection_source),
+    )
+    embeddings = [embedder.embed_query(q["query"]) for q in load_queries(args.queries)]
+
+    def qdrant_rerank(e):
+        return [p.id for p in qdrant_backend.hybrid_search(e, args.k, None)]
+
+    def local_rerank(e):
+        dense, sparse = local_backend.prefetch(e, None)
+        return [p.id for p in local_backend.rerank(dense + sparse, e.late, args.k)]
+
+    results = {}
+    for name, search in (("qdrant", qdrant_rerank), ("local", local_rerank)):
+        latencies, ranked = [], []
+        for e in embeddings:
+            for _ in range(args.repeats):
+                ids, elapsed = timed(search, e)
+                latencies.append(elapsed)
+            ranked.append([str(i) for i in ids])
+        results[name] = (latencies, ranked)
+
+    # Qdrant keeps float32 multivectors (in RAM unless on_disk); the local
+    # store is a memory-mapped file, paged in by the OS as candidates are read
+    if n_tokens is None:
+        n_tokens = os.path.getsize(os.path.join(store_path, "vectors.bin")) // (
+            COLBERT_DIM * (2 if args.dtype == "float16" else 4)
+        )
+    qdrant_mb = n_tokens * COLBERT_DIM * 4 / 2**20
+    reference = results["qdrant"][1]
+
+    rows = []
+    for name, (latencies, ranked) in results.items():
+        overlaps = [overlap_at_k(r, ref, args.k) for r, ref in zip(ranked, reference)]
+        rows.append(
+            {
+                "backend": name,
+                **summarize_latencies(latencies),
+                f"overlap@{args.k}": sum(overlaps) / len(overlaps),
+                "qdrant_colbert_mb": qdrant_mb if name == "qdrant" else 0.0,
+                "local_store_mb": directory_size_mb(store_path)
+                if name == "local"
+                else 0.0,
+            }
+        )
+
+    print_table(
+        rows,
+        [
+            "backend",
+            "p50_ms",
+            "p95_ms",
+            f"overlap@{args.k}",
+            "qdrant_colbert_mb",
+            "local_store_mb",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
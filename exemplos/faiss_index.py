@@ -0,0 +1,120 @@
+import json
+import os
+import time
+import faiss
+import numpy as np
+
+# Files of a saved index directory
+INDEX_FILE = "index.faiss"
+TEXTS_FILE = "texts.jsonl"
+META_FILE = "meta.json"
+
+METRICS = {"l2": faiss.METRIC_L2, "ip": faiss.METRIC_INNER_PRODUCT}
+TRAIN_SIZE = 100_000  # Vectors sampled to train IVF / PQ indexes
+
+
+class FaissIndex:
+    """
+    A FAISS index and the texts of its vectors, saved together in a directory.
+
+    The index type is a faiss.index_factory string, e.g. "Flat" (exact),
+    "HNSW32" (graph) or "IVF1024,PQ32" (inverted lists of compressed codes).
+    Loading memory-maps the index file instead of reading it into RAM.
+
+    Usage:
+        index = FaissIndex.build(vectors, texts, "HNSW32")
+        index.save("./faiss_index")
+        index = FaissIndex.load("./faiss_index")
+        results = index.search(query_vectors, k=3)
+    """
+
+    def __init__(self, index, texts=None, metadata=None):
+        self.index = index
+        self.texts = texts
+        self.metadata = metadata or {}
+
+    @classmethod
+    def build(cls, vectors, texts=None, factory="Flat", metric="l2", metadata=None):
+        """
+        Train (when the index type needs it) and fill an index.
+
+        With metric="ip" and normalized vectors the scores are cosine similarities.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        index = faiss.index_factory(vectors.shape[1], factory, METRICS[metric])
+
+        start = time.perf_counter()
+        if not index.is_trained:
+            rng = np.random.default_rng(0)
+            sample = vectors
+            if len(vectors) > TRAIN_SIZE:
+                sample = vectors[rng.choice(len(vectors), TRAIN_SIZE, replace=False)]
+            index.train(sample)
+        index.add(vectors)
+
+        metadata = {
+            **(metadata or {}),
+            "factory": factory,
+            "metric": metric,
+            "dimensions": vectors.shape[1],
+            "count": index.ntotal,
+            "build_seconds": time.perf_counter() - start,
+        }
+        return cls(index, list(texts) if texts is not None else None, metadata)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(path, INDEX_FILE))
+        if self.texts is not None:
+            with open(os.path.join(path, TEXTS_FILE), "w", encoding="utf-8") as f:
+                for text in self.texts:
+                    f.write(json.dumps(text, ensure_ascii=False) + "\n")
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump(self.metadata, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open a saved index. With mmap=True the OS pages the index in on demand.
+        """
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(os.path.join(path, INDEX_FILE), flags)
+
+        texts = None
+        if os.path.exists(os.path.join(path, TEXTS_FILE)):
+            with open(os.path.join(path, TEXTS_FILE), encoding="utf-8") as f:
+                texts = [json.loads(line) for line in f]
+        with open(os.path.join(path, META_FILE)) as f:
+            metadata = json.load(f)
+        return cls(index, texts, metadata)
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """
+        Trade speed for recall: IVF lists visited and HNSW candidate list size.
+        """
+        params = faiss.ParameterSpace()
+        if nprobe is not None:
+            params.set_index_parameter(self.index, "nprobe", nprobe)
+        if ef_search is not None:
+            params.set_index_parameter(self.index, "efSearch", ef_search)
+
+    def search_ids(self, queries, k=3):
+        """
+        Search a batch of query vectors in one call; returns (scores, ids).
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        return self.index.search(queries, k)
+
+    def search(self, queries, k=3):
+        """
+        Return, per query, a list of {"document", "distance"} results.
+        """
+        scores, ids = self.search_ids(queries, k)
+        return [
+            [
+                {"document": self.texts[i], "distance": float(score)}
+                for score, i in zip(row_scores, row_ids)
+                if i >= 0
+            ]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
@@ -1,4 +1,5 @@
-import faiss
+import os
+from faiss_index import FaissIndex
 from sentence_transformers import SentenceTransformer
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -18,27 +19,44 @@ documents = [
     "Retrieval-Augmented Generation combina sistemas de recuperação com modelos generativos para produzir respostas mais precisas e factuais.",
 ]
 
-model = SentenceTransformer(
-    "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
-)
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+INDEX_PATH = "./faiss_index"
+# Tipo do índice (faiss.index_factory): "Flat" é exato; para coleções maiores
+# use "HNSW32" ou "IVF1024,PQ32" (ver benchmarks/faiss_index_types.py)
+INDEX_FACTORY = "Flat"
 
-document_embeddings = model.encode(documents)
-print(f"Embedding dimension: {document_embeddings.shape[1]}")
+model = SentenceTransformer(MODEL_NAME)
 
-index = faiss.IndexFlatL2(document_embeddings.shape[1])
-index.add(document_embeddings.astype("float32"))
-print(f"Index contém {index.ntotal} vectors")
 
+def load_or_build_index():
+    # Reutiliza o índice salvo se foi criado com o mesmo modelo e documentos
+    if os.path.exists(INDEX_PATH):
+        index = FaissIndex.load(INDEX_PATH)
+        if index.metadata.get("model") == MODEL_NAME and index.texts == documents:
+            print(f"Índice carregado de {INDEX_PATH} ({index.index.ntotal} vetores)")
+            return index
 
-def retrieve(query, top_k=3):
-    query_vector = model.encode([query]).astype("float32")
-    distances, indices = index.search(query_vector, top_k)
+    document_embeddings = model.encode(documents)
+    print(f"Embedding dimension: {document_embeddings.shape[1]}")
+
+    index = FaissIndex.build(
+        document_embeddings, documents, INDEX_FACTORY, metadata={"model": MODEL_NAME}
+    )
+    index.save(INDEX_PATH)
+    print(f"Index contém {index.index.ntotal} vectors, salvo em {INDEX_PATH}")
+    return index
+
+
+index = load_or_build_index()
 
-    results = []
-    for i, idx in enumerate(indices[0]):
-        results.append({"document": documents[idx], "distance": distances[0][i]})
 
-    return results
+def retrieve_batch(queries, top_k=3):
+    # Todas as consultas são codificadas e buscadas em uma única chamada
+    return index.search(model.encode(queries), top_k)
+
+
+def retrieve(query, top_k=3):
+    return retrieve_batch([query], top_k)[0]
 
 
 def rag_query(query, top_k=3):
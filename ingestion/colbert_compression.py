@@ -0,0 +1,109 @@
+import string
+from functools import lru_cache
+import numpy as np
+from scipy.cluster.hierarchy import fcluster, linkage
+from transformers import AutoTokenizer
+
+COMPRESSION_METHODS = ("prune", "pool", "prune_pool")
+
+# Tokens that carry no signal for MaxSim: punctuation plus common Portuguese
+# function words (ColBERT's WordPiece vocabulary keeps most of them whole).
+PUNCTUATION_TOKENS = set(string.punctuation)
+STOPWORD_TOKENS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na",
+    "nos", "nas", "um", "uma", "uns", "umas", "que", "se", "por", "para", "com",
+    "ao", "aos", "à", "às", "pelo", "pela", "pelos", "pelas", "ou", "seu", "sua",
+    "seus", "suas", "como", "mais", "mas", "não", "nao", "é", "foi", "ser", "ter",
+    "the", "of", "and", "to", "in",
+}  # fmt: skip
+SPECIAL_TOKENS = {"[CLS]", "[SEP]", "[D]", "[unused1]"}
+
+
+@lru_cache(maxsize=2)
+def load_colbert_tokenizer(model_name: str = "colbert-ir/colbertv2.0"):
+    """
+    Load the WordPiece tokenizer used by the ColBERT model.
+    """
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def align_tokens(vectors: np.ndarray, text: str, tokenizer):
+    """
+    Return the token string behind each ColBERT vector, or None if the
+    tokenization cannot be aligned with the vectors.
+
+    Passage embeddings are [CLS] [D] tokens... [SEP]; depending on the fastembed
+    version punctuation is either dropped or kept as zero vectors.
+    """
+    # fastembed truncates to 511 tokens before inserting the [D] marker
+    ids = tokenizer(text, truncation=True, max_length=511)["input_ids"]
+    tokens = tokenizer.convert_ids_to_tokens(ids)
+    tokens = tokens[:1] + ["[D]"] + tokens[1:]
+
+    for candidate in (tokens, [t for t in tokens if t not in PUNCTUATION_TOKENS]):
+        if len(candidate) == len(vectors):
+            return candidate
+    return None
+
+
+def prune_tokens(vectors: np.ndarray, text: str, tokenizer) -> np.ndarray:
+    """
+    Drop punctuation, stopword and zeroed (masked) token vectors.
+    """
+    keep = np.linalg.norm(vectors, axis=1) > 0
+    tokens = align_tokens(vectors, text, tokenizer)
+    if tokens is not None:
+        keep &= np.array(
+            [
+                t in SPECIAL_TOKENS
+                or (t not in PUNCTUATION_TOKENS and t.lower() not in STOPWORD_TOKENS)
+                for t in tokens
+            ]
+        )
+    return vectors[keep] if keep.any() else vectors
+
+
+def pool_tokens(vectors: np.ndarray, pool_factor: float) -> np.ndarray:
+    """
+    Reduce token vectors by roughly pool_factor with Ward hierarchical clustering,
+    mean-pooling each cluster and re-normalizing.
+    """
+    n_clusters = max(1, int(np.ceil(len(vectors) / pool_factor)))
+    if n_clusters >= len(vectors):
+        return vectors
+
+    labels = fcluster(
+        linkage(vectors, method="ward"), t=n_clusters, criterion="maxclust"
+    )
+    pooled = np.stack(
+        [vectors[labels == label].mean(axis=0) for label in np.unique(labels)]
+    )
+    norms = np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return (pooled / norms).astype(vectors.dtype)
+
+
+def compress_colbert_embedding(
+    vectors: np.ndarray,
+    text: str,
+    method: str,
+    pool_factor: float = 2.0,
+    model_name: str = "colbert-ir/colbertv2.0",
+) -> np.ndarray:
+    """
+    Reduce the number of per-token ColBERT vectors for a passage.
+
+    Args:
+        vectors: (n_tokens, dim) passage embedding
+        text: The passage text, used to align tokens for pruning
+        method: "prune", "pool" or "prune_pool"
+        pool_factor: Target reduction factor for pooling (2 keeps ~half)
+    """
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"Unknown ColBERT compression method: {method}")
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if method in ("prune", "prune_pool"):
+        vectors = prune_tokens(vectors, text, load_colbert_tokenizer(model_name))
+    if method in ("pool", "prune_pool"):
+        vectors = pool_tokens(vectors, pool_factor)
+    return vectors
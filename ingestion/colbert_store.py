@@ -0,0 +1,69 @@
+import json
+import os
+import sqlite3
+import numpy as np
+
+# Local store of ColBERT passage matrices for client-side MaxSim reranking:
+#   vectors.bin  token vectors of every point, appended back to back
+#   index.db     point ID -> (row offset, token count)
+#   meta.json    vector dimension and dtype
+COLBERT_STORE_DTYPE = "float16"  # Half the size; MaxSim is computed in float32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    id TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+)
+"""
+
+
+def write_colbert_vectors(path, records, dtype=COLBERT_STORE_DTYPE):
+    """
+    Append (point_id, token_vectors) records to the store at path (a directory).
+    """
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, "meta.json")
+    records = [(str(i), np.asarray(v, dtype=np.float32)) for i, v in records]
+    if not records:
+        return 0
+
+    dim = records[0][1].shape[1]
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["dim"] != dim:
+            raise ValueError(f"Store has {meta['dim']}-d vectors, got {dim}-d")
+        dtype = meta["dtype"]
+    else:
+        with open(meta_path, "w") as f:
+            json.dump({"dim": dim, "dtype": dtype}, f)
+
+    vectors_path = os.path.join(path, "vectors.bin")
+    row_bytes = dim * np.dtype(dtype).itemsize
+    offset = (
+        os.path.getsize(vectors_path) // row_bytes
+        if os.path.exists(vectors_path)
+        else 0
+    )
+
+    index = []
+    with open(vectors_path, "ab") as f:
+        for point_id, vectors in records:
+            f.write(vectors.astype(dtype).tobytes())
+            index.append((point_id, offset, len(vectors)))
+            offset += len(vectors)
+
+    # The index is written last, so readers never see rows that are not on disk
+    connection = sqlite3.connect(os.path.join(path, "index.db"))
+    try:
+        connection.execute(SCHEMA)
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO vectors (id, offset, length) VALUES (?, ?, ?)",
+                index,
+            )
+    finally:
+        connection.close()
+
+    return len(index)
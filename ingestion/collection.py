@@ -0,0 +1,210 @@
+import re
+from datetime import datetime, timezone
+from typing import List, Optional
+from qdrant_client import QdrantClient, models
+from qdrant_client.http.models import VectorParams, Distance, PayloadSchemaType
+
+# LeNER-Br entity groups produced by the NER step
+ENTITY_GROUPS = (
+    "PESSOA",
+    "ORGANIZACAO",
+    "LOCAL",
+    "TEMPO",
+    "LEGISLACAO",
+    "JURISPRUDENCIA",
+)
+
+# Payload fields the API can filter on
+PAYLOAD_INDEXES = {
+    "metadata.chunk_id": PayloadSchemaType.INTEGER,
+    "metadata.page_numbers": PayloadSchemaType.INTEGER,
+    "metadata.headings": PayloadSchemaType.KEYWORD,
+    "metadata.source": PayloadSchemaType.KEYWORD,
+    "metadata.locations[].source": PayloadSchemaType.KEYWORD,
+    **{
+        f"metadata.entities.{group}": PayloadSchemaType.KEYWORD
+        for group in ENTITY_GROUPS
+    },
+}
+
+
+def build_quantization_config(quantization: Optional[str]):
+    """
+    Map a quantization name ("scalar", "binary" or None) to a Qdrant config.
+
+    Quantized copies are kept in RAM while the original vectors can live on
+    disk and are only read for rescoring.
+    """
+    if quantization in (None, "none"):
+        return None
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+def create_hybrid_collection(
+    client: QdrantClient,
+    collection_name: str,
+    quantization: Optional[str] = None,
+    on_disk: bool = False,
+    hnsw_m: Optional[int] = None,
+    hnsw_ef_construct: Optional[int] = None,
+    colbert_index: bool = True,
+    payload_indexes: bool = True,
+    dense_size: int = 768,
+    colbert_vectors: bool = True,
+):
+    """
+    Create a collection configured for hybrid search (dense, BM25 and ColBERT).
+
+    Args:
+        quantization: None, "scalar" (int8) or "binary"
+        on_disk: Keep original dense and ColBERT vectors on disk (memmap)
+        hnsw_m / hnsw_ef_construct: HNSW graph parameters, Qdrant defaults if None
+        colbert_index: Build an HNSW graph for the ColBERT vectors. They are only
+            used to rerank prefetched candidates, so the graph can be skipped.
+        payload_indexes: Index the metadata fields used by search filters
+        dense_size: Dense vector dimension, below 768 when a PCA projection is used
+        colbert_vectors: Store ColBERT multivectors in Qdrant. Without them the
+            API reranks from the local ColBERT store (rerank_backend="local").
+    """
+    hnsw_config = None
+    if hnsw_m is not None or hnsw_ef_construct is not None:
+        hnsw_config = models.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct)
+
+    vectors_config = {
+        # Dense (semantic) vector
+        "dense": VectorParams(
+            size=dense_size, distance=Distance.COSINE, on_disk=on_disk
+        ),
+    }
+    if colbert_vectors:
+        # Late interaction (ColBERT) vector
+        vectors_config["colbertv2.0"] = VectorParams(
+            size=128,
+            distance=Distance.COSINE,
+            on_disk=on_disk,
+            multivector_config=models.MultiVectorConfig(
+                comparator=models.MultiVectorComparator.MAX_SIM,
+            ),
+            # m=0 disables the HNSW graph for this vector
+            hnsw_config=None if colbert_index else models.HnswConfigDiff(m=0),
+        )
+
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=vectors_config,
+        sparse_vectors_config={
+            # Sparse (BM25) vector
+            "sparse": models.SparseVectorParams(modifier=models.Modifier.IDF),
+        },
+        hnsw_config=hnsw_config,
+        quantization_config=build_quantization_config(quantization),
+    )
+
+    if payload_indexes:
+        create_payload_indexes(client, collection_name)
+
+
+def create_payload_indexes(client: QdrantClient, collection_name: str):
+    """
+    Index the chunk metadata fields so filtered searches only visit matching points.
+    """
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+        )
+
+
+def collection_exists(client: QdrantClient, collection_name: str) -> bool:
+    """
+    Check whether a physical collection (not an alias) with this name exists.
+    """
+    collections = client.get_collections().collections
+    return collection_name in [collection.name for collection in collections]
+
+
+def resolve_alias(client: QdrantClient, alias: str) -> Optional[str]:
+    """
+    Return the collection an alias points to, or None if the alias does not exist.
+    """
+    for entry in client.get_aliases().aliases:
+        if entry.alias_name == alias:
+            return entry.collection_name
+    return None
+
+
+def new_version_name(alias: str) -> str:
+    """
+    Build a versioned collection name, e.g. documents_v20250101120000.
+    """
+    return f"{alias}_v{datetime.now(timezone.utc):%Y%m%d%H%M%S}"
+
+
+def list_versions(client: QdrantClient, alias: str) -> List[str]:
+    """
+    List the versioned collections behind an alias, oldest first.
+    """
+    pattern = re.compile(rf"^{re.escape(alias)}_v\d{{14}}$")
+    names = [c.name for c in client.get_collections().collections]
+    return sorted(name for name in names if pattern.match(name))
+
+
+def validate_collection(
+    client: QdrantClient, collection_name: str, expected_count: int
+):
+    """
+    Make sure a freshly ingested collection holds the expected number of points.
+    """
+    count = client.count(collection_name=collection_name, exact=True).count
+    if count != expected_count:
+        raise ValueError(
+            f"Collection '{collection_name}' has {count} points, expected {expected_count}"
+        )
+    return count
+
+
+def swap_alias(client: QdrantClient, alias: str, collection_name: str):
+    """
+    Atomically point an alias at a collection.
+
+    Deleting and re-creating the alias happens in a single request, so
+    readers always see either the old or the new collection.
+    """
+    operations = []
+    if resolve_alias(client, alias) is not None:
+        operations.append(
+            models.DeleteAliasOperation(
+                delete_alias=models.DeleteAlias(alias_name=alias)
+            )
+        )
+    operations.append(
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(
+                collection_name=collection_name, alias_name=alias
+            )
+        )
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def prune_versions(client: QdrantClient, alias: str, keep: int) -> List[str]:
+    """
+    Delete old versions, keeping the active one plus the `keep` most recent others.
+    """
+    active = resolve_alias(client, alias)
+    inactive = [name for name in list_versions(client, alias) if name != active]
+    to_delete = inactive[: max(len(inactive) - keep, 0)]
+    for name in to_delete:
+        client.delete_collection(name)
+    return to_delete
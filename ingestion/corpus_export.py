@@ -0,0 +1,222 @@
+import json
+import numpy as np
+import pyarrow as pa
+from qdrant_client import QdrantClient, models
+
+# Arrow IPC file layout: one row per point with its ID, payload (JSON) and
+# one column per named vector. The collection config is kept in the schema
+# metadata so the import can recreate the collection without the models.
+EXPORT_BATCH_SIZE = 256  # Points per Arrow record batch
+MULTIVECTOR_DTYPES = {"float32": pa.float32(), "float16": pa.float16()}
+SPARSE_TYPE = pa.struct(
+    [("indices", pa.list_(pa.uint32())), ("values", pa.list_(pa.float32()))]
+)
+
+
+def vector_schema(config: models.CollectionConfig, multivector_dtype="float32"):
+    """
+    Arrow fields for every named vector of a collection.
+    """
+    fields = []
+    for name, params in (config.params.vectors or {}).items():
+        if params.multivector_config is not None:
+            item = pa.list_(MULTIVECTOR_DTYPES[multivector_dtype], params.size)
+            fields.append(pa.field(name, pa.list_(item)))
+        else:
+            fields.append(pa.field(name, pa.list_(pa.float32(), params.size)))
+    for name in (config.params.sparse_vectors or {}).keys():
+        fields.append(pa.field(name, SPARSE_TYPE))
+    return fields
+
+
+def to_record_batch(records, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Convert scrolled Qdrant records into one Arrow record batch.
+    """
+    columns = [
+        pa.array([str(r.id) for r in records], pa.string()),
+        pa.array(
+            [json.dumps(r.payload or {}, ensure_ascii=False) for r in records],
+            pa.string(),
+        ),
+    ]
+
+    for field in list(schema)[2:]:
+        vectors = [(r.vector or {}).get(field.name) for r in records]
+        mask = np.array([v is None for v in vectors])
+
+        if field.type == SPARSE_TYPE:
+            vectors = [v or models.SparseVector(indices=[], values=[]) for v in vectors]
+            offsets = pa.array(
+                np.concatenate(([0], np.cumsum([len(v.indices) for v in vectors]))),
+                pa.int32(),
+            )
+            indices = np.concatenate([v.indices for v in vectors] + [[]])
+            values = np.concatenate([v.values for v in vectors] + [[]])
+            columns.append(
+                pa.StructArray.from_arrays(
+                    [
+                        pa.ListArray.from_arrays(
+                            offsets, pa.array(indices, pa.uint32())
+                        ),
+                        pa.ListArray.from_arrays(
+                            offsets, pa.array(values, pa.float32())
+                        ),
+                    ],
+                    fields=list(SPARSE_TYPE),
+                    mask=pa.array(mask),
+                )
+            )
+        elif pa.types.is_list(field.type):
+            # Multivector: list of fixed-size token vectors
+            item = field.type.value_type
+            vectors = [v or [] for v in vectors]
+            offsets = pa.array(
+                np.concatenate(([0], np.cumsum([len(v) for v in vectors]))), pa.int32()
+            )
+            flat = np.concatenate(
+                [
+                    np.asarray(v, dtype=np.float32).reshape(-1, item.list_size)
+                    for v in vectors
+                ]
+            ).astype(item.value_type.to_pandas_dtype())
+            tokens = pa.FixedSizeListArray.from_arrays(
+                pa.array(flat.ravel(), item.value_type), item.list_size
+            )
+            columns.append(
+                pa.ListArray.from_arrays(offsets, tokens, mask=pa.array(mask))
+            )
+        else:
+            size = field.type.list_size
+            flat = np.stack(
+                [np.zeros(size, np.float32) if v is None else v for v in vectors]
+            ).astype(np.float32)
+            columns.append(
+                pa.FixedSizeListArray.from_arrays(
+                    pa.array(flat.ravel(), pa.float32()), size, mask=pa.array(mask)
+                )
+            )
+
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def export_collection(
+    client: QdrantClient,
+    collection_name: str,
+    path: str,
+    multivector_dtype: str = "float32",
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """
+    Write every point of a collection (vectors and payload) to an Arrow IPC file.
+
+    multivector_dtype="float16" halves the size of the ColBERT vectors.
+    Returns the number of exported points.
+    """
+    if multivector_dtype not in MULTIVECTOR_DTYPES:
+        raise ValueError(f"Unsupported multivector dtype: {multivector_dtype}")
+
+    info = client.get_collection(collection_name)
+    schema = pa.schema(
+        [pa.field("id", pa.string()), pa.field("payload", pa.string())]
+        + vector_schema(info.config, multivector_dtype),
+        metadata={
+            "collection_config": info.config.model_dump_json(),
+            "source_collection": collection_name,
+        },
+    )
+
+    exported, offset = 0, None
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if records:
+                writer.write_batch(to_record_batch(records, schema))
+                exported += len(records)
+            if offset is None:
+                return exported
+
+
+def open_export(path: str) -> pa.ipc.RecordBatchFileReader:
+    """
+    Memory-map an exported file; record batches are read without copying.
+    """
+    return pa.ipc.open_file(pa.memory_map(path, "r"))
+
+
+def export_config(reader: pa.ipc.RecordBatchFileReader) -> models.CollectionConfig:
+    """
+    The config of the collection the file was exported from.
+    """
+    return models.CollectionConfig.model_validate_json(
+        reader.schema.metadata[b"collection_config"]
+    )
+
+
+def create_collection_from_export(
+    client: QdrantClient, collection_name: str, config: models.CollectionConfig
+):
+    """
+    Create an empty collection with the exported vector, HNSW and quantization config.
+    """
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=config.params.vectors,
+        sparse_vectors_config=config.params.sparse_vectors,
+        on_disk_payload=config.params.on_disk_payload,
+        hnsw_config=models.HnswConfigDiff(**config.hnsw_config.model_dump()),
+        quantization_config=config.quantization_config,
+    )
+
+
+def point_id(value: str):
+    # Qdrant IDs are unsigned integers or UUIDs
+    return int(value) if value.isdigit() else value
+
+
+def iter_points(reader: pa.ipc.RecordBatchFileReader):
+    """
+    Yield the exported points as PointStructs, one record batch at a time.
+    """
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        ids = batch.column("id").to_pylist()
+        payloads = batch.column("payload").to_pylist()
+        vectors = [{} for _ in ids]
+
+        for field in list(batch.schema)[2:]:
+            column = batch.column(field.name)
+            valid = column.is_valid().to_numpy(zero_copy_only=False)
+
+            if field.type == SPARSE_TYPE:
+                indices = column.field("indices").to_pylist()
+                values = column.field("values").to_pylist()
+                for row in np.flatnonzero(valid):
+                    vectors[row][field.name] = models.SparseVector(
+                        indices=indices[row], values=values[row]
+                    )
+            elif pa.types.is_list(field.type):
+                size = field.type.value_type.list_size
+                offsets = column.offsets.to_numpy()
+                # Offsets index into the token vectors of the whole batch
+                tokens = column.values.values.to_numpy().reshape(-1, size)
+                tokens = tokens.astype(np.float32)
+                for row in np.flatnonzero(valid):
+                    start, end = offsets[row], offsets[row + 1]
+                    vectors[row][field.name] = tokens[start:end].tolist()
+            else:
+                size = field.type.list_size
+                dense = column.values.to_numpy().reshape(-1, size)
+                for row in np.flatnonzero(valid):
+                    vectors[row][field.name] = dense[row].tolist()
+
+        for id_, payload, vector in zip(ids, payloads, vectors):
+            yield models.PointStruct(
+                id=point_id(id_), vector=vector, payload=json.loads(payload)
+            )
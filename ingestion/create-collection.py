@@ -1,57 +1,332 @@
 import os
+import shutil
+import argparse
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient, models
-from qdrant_client.http.models import VectorParams, Distance
+from qdrant_client import QdrantClient
+from collection import (
+    create_hybrid_collection,
+    create_payload_indexes,
+    collection_exists,
+    resolve_alias,
+    new_version_name,
+    list_versions,
+    validate_collection,
+    swap_alias,
+    prune_versions,
+)
+from dedup import DEDUP_THRESHOLD
+from docstore import missing_documents
+from corpus_export import (
+    create_collection_from_export,
+    export_collection,
+    export_config,
+    iter_points,
+    open_export,
+)
+from projection import DENSE_PROJECTION_DIR, export_projection_path, projection_path
+from upload import upload_in_batches
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
-os.getenv("COLLECTION_NAME")
-
 # Configurações da collection
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "mentoria")
+SMOKE_QUERY = "exercício da profissão de engenheiro"  # Consulta de validação
+KEEP_VERSIONS = 2  # Versões antigas mantidas para rollback
 
-# Inicializa o cliente Qdrant
-client = QdrantClient(
-    url=os.getenv("QDRANT_URL"),
-    api_key=os.getenv("QDRANT_API_KEY"),
-)
 
-# Verifica se a collection já existe e remove se necessário
-collections = client.get_collections().collections
-collection_names = [collection.name for collection in collections]
-if COLLECTION_NAME in collection_names:
-    print(f"Collection '{COLLECTION_NAME}' já existe. Removendo...")
-    client.delete_collection(COLLECTION_NAME)
-
-# Cria a collection com configuração para busca híbrida
-client.create_collection(
-    collection_name=COLLECTION_NAME,
-    vectors_config={
-        # Vetor denso (semântico)
-        "dense": VectorParams(size=768, distance=Distance.COSINE),
-        # Vetor de interação tardia (ColBERT)
-        "colbertv2.0": VectorParams(
-            size=128,
-            distance=Distance.COSINE,
-            multivector_config=models.MultiVectorConfig(
-                comparator=models.MultiVectorComparator.MAX_SIM,
-            ),
-        ),
-    },
-    sparse_vectors_config={
-        # Vetor esparso (BM25)
-        "sparse": models.SparseVectorParams(modifier=models.Modifier.IDF),
-    },
-)
+def print_collection_info(client, collection_name):
+    # Exibe informações da collection
+    collection_info = client.get_collection(collection_name)
+    print(f"Status: {collection_info.status}")
+    print(f"Vetores configurados: {list(collection_info.config.params.vectors.keys())}")
+    print(
+        f"Vetores esparsos: {list(collection_info.config.params.sparse_vectors.keys() if collection_info.config.params.sparse_vectors else [])}"
+    )
+    print(f"Pontos: {collection_info.points_count}")
 
-print(f"Collection '{COLLECTION_NAME}' criada com sucesso!")
 
-# Exibe informações da collection
-collection_info = client.get_collection(COLLECTION_NAME)
-print(f"Status: {collection_info.status}")
-print(f"Vetores configurados: {list(collection_info.config.params.vectors.keys())}")
-print(
-    f"Vetores esparsos: {list(collection_info.config.params.sparse_vectors.keys() if collection_info.config.params.sparse_vectors else [])}"
-)
-print(f"Pontos: {collection_info.points_count}")
+def remove_projection(version):
+    # A projeção PCA é de uma única versão e sai junto com ela
+    path = projection_path(DENSE_PROJECTION_DIR, version)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def recreate_in_place(client, collection_options):
+    # Verifica se a collection já existe e remove se necessário
+    if resolve_alias(client, COLLECTION_NAME) is not None:
+        raise SystemExit(
+            f"'{COLLECTION_NAME}' é um alias gerenciado por --rebuild. "
+            "Use --rebuild para recriar sem indisponibilidade."
+        )
+    if collection_exists(client, COLLECTION_NAME):
+        print(f"Collection '{COLLECTION_NAME}' já existe. Removendo...")
+        client.delete_collection(COLLECTION_NAME)
+    # A projeção da collection anterior não vale para a nova, mesmo com o mesmo nome
+    remove_projection(COLLECTION_NAME)
+
+    # Cria a collection com configuração para busca híbrida
+    create_hybrid_collection(client, COLLECTION_NAME, **collection_options)
+    print(f"Collection '{COLLECTION_NAME}' criada com sucesso!")
+    print_collection_info(client, COLLECTION_NAME)
+
+
+def rebuild(client, pdf_paths, smoke_query, keep, collection_options, ingest_options):
+    # Import tardio: o pipeline de ingestão carrega Docling e modelos de NER
+    from ingestion import (
+        ingest_pdfs,
+        initialize_embedding_models,
+        resolve_pdf_paths,
+        run_smoke_query,
+    )
+
+    version = new_version_name(COLLECTION_NAME)
+    print(f"Criando nova versão '{version}'...")
+    create_hybrid_collection(client, version, **collection_options)
+
+    try:
+        # Ingestão na nova versão, enquanto o alias continua servindo a anterior
+        embedding_models = initialize_embedding_models()
+        uploaded = ingest_pdfs(
+            resolve_pdf_paths(pdf_paths),
+            version,
+            client,
+            embedding_models,
+            **ingest_options,
+        )
+
+        # Validação: contagem de pontos e consulta de teste
+        validate_collection(client, version, uploaded)
+        hits = run_smoke_query(client, version, embedding_models, smoke_query)
+        if not hits:
+            raise ValueError(
+                f"Consulta de teste '{smoke_query}' não retornou resultados"
+            )
+        # Com docstore, a API só devolve os pontos que têm texto gravado nele
+        docstore_path = ingest_options.get("docstore_path")
+        if docstore_path:
+            missing = missing_documents(docstore_path, [hit.id for hit in hits])
+            if missing:
+                raise ValueError(
+                    f"Pontos da consulta de teste sem documento em "
+                    f"'{docstore_path}': {missing}"
+                )
+    except Exception:
+        print(f"Validação falhou. Removendo '{version}', o alias não foi alterado.")
+        client.delete_collection(version)
+        remove_projection(version)
+        raise
+
+    activate_version(client, version, keep)
+
+
+def activate_version(client, version, keep):
+    # Migração única: uma collection física com o nome do alias precisa sair
+    if collection_exists(client, COLLECTION_NAME):
+        print(
+            f"Removendo collection física '{COLLECTION_NAME}' para dar lugar ao alias..."
+        )
+        client.delete_collection(COLLECTION_NAME)
+
+    previous = resolve_alias(client, COLLECTION_NAME)
+    swap_alias(client, COLLECTION_NAME, version)
+    print(f"Alias '{COLLECTION_NAME}': {previous} -> {version}")
+
+    removed = prune_versions(client, COLLECTION_NAME, keep)
+    for name in removed:
+        remove_projection(name)
+        print(f"Versão antiga removida: {name}")
+
+    print_collection_info(client, COLLECTION_NAME)
+
+
+def export_corpus(client, path, float16):
+    # Exporta vetores e payloads, sem nenhum modelo envolvido
+    dtype = "float16" if float16 else "float32"
+    print(f"Exportando '{COLLECTION_NAME}' para '{path}' (ColBERT em {dtype})...")
+    exported = export_collection(client, COLLECTION_NAME, path, dtype)
+    print(f"{exported} pontos exportados ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    # Vetores densos reduzidos só servem com a projeção da versão exportada
+    target = resolve_alias(client, COLLECTION_NAME) or COLLECTION_NAME
+    projection = projection_path(DENSE_PROJECTION_DIR, target)
+    if os.path.exists(projection):
+        shutil.copyfile(projection, export_projection_path(path))
+        print(f"Projeção PCA copiada para '{export_projection_path(path)}'")
+
+
+def import_corpus(client, path, keep):
+    reader = open_export(path)
+    version = new_version_name(COLLECTION_NAME)
+    print(f"Importando '{path}' para a nova versão '{version}'...")
+    create_collection_from_export(client, version, export_config(reader))
+    create_payload_indexes(client, version)
+
+    try:
+        # O arquivo é lido via memmap e enviado em lotes paralelos
+        uploaded = upload_in_batches(
+            client, version, iter_points(reader), total=reader.count_rows()
+        )
+        validate_collection(client, version, reader.count_rows())
+    except Exception:
+        print(f"Importação falhou. Removendo '{version}', o alias não foi alterado.")
+        client.delete_collection(version)
+        raise
+
+    print(f"{uploaded} pontos importados")
+    if os.path.exists(export_projection_path(path)):
+        os.makedirs(DENSE_PROJECTION_DIR, exist_ok=True)
+        shutil.copyfile(
+            export_projection_path(path), projection_path(DENSE_PROJECTION_DIR, version)
+        )
+    activate_version(client, version, keep)
+
+
+def rollback(client):
+    active = resolve_alias(client, COLLECTION_NAME)
+    versions = list_versions(client, COLLECTION_NAME)
+    if active not in versions or versions.index(active) == 0:
+        raise SystemExit(f"Nenhuma versão anterior a '{active}' disponível")
+
+    previous = versions[versions.index(active) - 1]
+    swap_alias(client, COLLECTION_NAME, previous)
+    print(f"Alias '{COLLECTION_NAME}': {active} -> {previous}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cria a collection do Qdrant para busca híbrida"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Cria uma nova versão, faz a ingestão, valida e troca o alias (sem indisponibilidade)",
+    )
+    mode.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Aponta o alias para a versão anterior",
+    )
+    mode.add_argument(
+        "--export",
+        metavar="ARQUIVO",
+        help="Exporta todos os pontos (vetores e payload) para um arquivo Arrow",
+    )
+    mode.add_argument(
+        "--import",
+        dest="import_path",
+        metavar="ARQUIVO",
+        help="Cria uma nova versão a partir de um arquivo exportado e troca o alias",
+    )
+    parser.add_argument(
+        "--float16",
+        action="store_true",
+        help="Exporta os vetores ColBERT em float16 (metade do tamanho)",
+    )
+    parser.add_argument(
+        "--pdf",
+        nargs="+",
+        default=["./D23569.pdf"],
+        help="PDFs, diretórios ou padrões glob usados no --rebuild",
+    )
+    parser.add_argument("--smoke-query", default=SMOKE_QUERY)
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help="Limiar de quase-duplicatas no --rebuild (0 desativa)",
+    )
+    parser.add_argument(
+        "--colbert-compression",
+        choices=["none", "prune", "pool", "prune_pool"],
+        default="none",
+        help="Compressão dos vetores ColBERT no --rebuild",
+    )
+    parser.add_argument(
+        "--docstore",
+        default=None,
+        help="Arquivo SQLite dos textos no --rebuild; o Qdrant guarda só os campos filtráveis",
+    )
+    parser.add_argument(
+        "--colbert-store",
+        default=None,
+        help="Diretório das matrizes ColBERT no --rebuild (rerank local pela API)",
+    )
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS)
+
+    # Opções de armazenamento e indexação
+    parser.add_argument(
+        "--quantization", choices=["none", "scalar", "binary"], default="none"
+    )
+    parser.add_argument(
+        "--on-disk", action="store_true", help="Vetores originais em disco (memmap)"
+    )
+    parser.add_argument("--hnsw-m", type=int, default=None)
+    parser.add_argument("--hnsw-ef-construct", type=int, default=None)
+    parser.add_argument(
+        "--no-colbert-index",
+        action="store_true",
+        help="Não cria grafo HNSW para os vetores ColBERT (usados só no reranking)",
+    )
+    parser.add_argument(
+        "--no-colbert-vectors",
+        action="store_true",
+        help="Não armazena vetores ColBERT no Qdrant (rerank local pela API)",
+    )
+    parser.add_argument(
+        "--dense-dimensions",
+        type=int,
+        default=768,
+        help="Dimensão dos vetores densos; abaixo de 768 a ingestão aplica PCA",
+    )
+    args = parser.parse_args()
+    if args.rebuild and args.no_colbert_vectors and not args.colbert_store:
+        parser.error("--rebuild com --no-colbert-vectors requer --colbert-store")
+
+    collection_options = {
+        "quantization": args.quantization,
+        "on_disk": args.on_disk,
+        "hnsw_m": args.hnsw_m,
+        "hnsw_ef_construct": args.hnsw_ef_construct,
+        "colbert_index": not args.no_colbert_index,
+        "dense_size": args.dense_dimensions,
+        "colbert_vectors": not args.no_colbert_vectors,
+    }
+
+    # Inicializa o cliente Qdrant
+    client = QdrantClient(
+        url=os.getenv("QDRANT_URL"),
+        api_key=os.getenv("QDRANT_API_KEY"),
+    )
+
+    if args.rebuild:
+        ingest_options = {
+            "dedup_threshold": args.dedup_threshold,
+            "docstore_path": args.docstore,
+            "colbert_store_path": args.colbert_store,
+            "colbert_compression": None
+            if args.colbert_compression == "none"
+            else args.colbert_compression,
+        }
+        rebuild(
+            client,
+            args.pdf,
+            args.smoke_query,
+            args.keep,
+            collection_options,
+            ingest_options,
+        )
+    elif args.rollback:
+        rollback(client)
+    elif args.export:
+        export_corpus(client, args.export, args.float16)
+    elif args.import_path:
+        import_corpus(client, args.import_path, args.keep)
+    else:
+        recreate_in_place(client, collection_options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import re
+import zlib
+import numpy as np
+
+# MinHash / LSH parameters. With 16 bands of 8 rows, pairs above ~0.7 Jaccard
+# similarity almost always share a bucket; candidates are then checked
+# against the actual threshold.
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+SHINGLE_SIZE = 5  # Words per shingle
+MERSENNE_PRIME = np.uint64(4294967311)  # Smallest prime above 2**32
+
+# Near-duplicate chunks (estimated Jaccard similarity of word 5-gram shingles
+# above this threshold) are collapsed into a single point. None disables it.
+DEDUP_THRESHOLD = 0.85
+
+
+def shingle_hashes(text, shingle_size=SHINGLE_SIZE):
+    """
+    Hash the word n-grams of a normalized text to 32-bit integers.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [
+            " ".join(words[i : i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        ]
+    return np.array(
+        sorted({zlib.crc32(s.encode("utf-8")) for s in shingles}), dtype=np.uint64
+    )
+
+
+def minhash_signatures(texts, num_permutations=NUM_PERMUTATIONS, seed=42):
+    """
+    Compute a MinHash signature per text with universal hashing (a*x + b) mod p.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**32 - 1, size=num_permutations, dtype=np.uint64)
+    b = rng.integers(0, 2**32 - 1, size=num_permutations, dtype=np.uint64)
+
+    signatures = np.empty((len(texts), num_permutations), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        hashes = shingle_hashes(text)
+        signatures[i] = ((np.outer(hashes, a) + b) % MERSENNE_PRIME).min(axis=0)
+    return signatures
+
+
+def chunk_location(metadata):
+    """
+    The fields that identify where a chunk came from, as listed in
+    metadata["locations"] of a chunk that absorbed near-duplicates.
+    """
+    return {
+        key: metadata.get(key)
+        for key in ("source", "chunk_id", "page_numbers", "headings")
+        if metadata.get(key) is not None
+    }
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index, for deduplicating chunks as they stream in.
+
+    Only the signatures and LSH buckets of the texts seen so far are kept, not
+    the texts. A text is compared with the first text of every bucket it
+    lands in; two kept texts are never merged afterwards, since the first may
+    already be uploaded.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, bands=LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.signatures = []
+        self.representatives = []  # Position of the kept text each text maps to
+        self.buckets = [{} for _ in range(bands)]  # Band key -> first position
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, texts):
+        """
+        Index texts in order. Returns, per text, the position of the earlier
+        kept text it duplicates, or None if it is kept. Positions count every
+        text added, starting at 0.
+        """
+        originals = []
+        for signature in minhash_signatures(texts):
+            position = len(self.signatures)
+            rows_per_band = len(signature) // self.bands
+            matches = set()
+            for band, buckets in enumerate(self.buckets):
+                key = bytes(
+                    signature[band * rows_per_band : (band + 1) * rows_per_band]
+                )
+                first = buckets.setdefault(key, position)
+                if (
+                    first != position
+                    and np.mean(self.signatures[first] == signature) >= self.threshold
+                ):
+                    matches.add(self.representatives[first])
+
+            representative = min(matches, default=position)
+            self.signatures.append(signature)
+            self.representatives.append(representative)
+            originals.append(None if representative == position else representative)
+        return originals
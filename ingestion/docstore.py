@@ -0,0 +1,89 @@
+import json
+import sqlite3
+
+# Metadata kept in the Qdrant payload when texts live in the document store:
+# only what the API filters on.
+FILTERABLE_METADATA = ("chunk_id", "page_numbers", "headings", "source", "entities")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+)
+"""
+
+
+def filterable_payload(metadata):
+    """
+    Reduce chunk metadata to the small fields indexed for filtering.
+    """
+    payload = {key: metadata[key] for key in FILTERABLE_METADATA if key in metadata}
+    if "locations" in metadata:
+        payload["locations"] = [
+            {"source": location["source"]}
+            for location in metadata["locations"]
+            if "source" in location
+        ]
+    return payload
+
+
+def write_documents(path, records):
+    """
+    Store (point_id, text, metadata) records in a SQLite document store.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(SCHEMA)
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO chunks (id, text, metadata) VALUES (?, ?, ?)",
+                (
+                    (str(point_id), text, json.dumps(metadata, ensure_ascii=False))
+                    for point_id, text, metadata in records
+                ),
+            )
+    finally:
+        connection.close()
+
+
+def set_locations(path, locations):
+    """
+    Set metadata["locations"] of stored chunks from {point_id: locations}.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            for point_id, point_locations in locations.items():
+                row = connection.execute(
+                    "SELECT metadata FROM chunks WHERE id = ?", (str(point_id),)
+                ).fetchone()
+                if row is None:
+                    continue
+                metadata = {**json.loads(row[0]), "locations": point_locations}
+                connection.execute(
+                    "UPDATE chunks SET metadata = ? WHERE id = ?",
+                    (json.dumps(metadata, ensure_ascii=False), str(point_id)),
+                )
+    finally:
+        connection.close()
+
+
+def missing_documents(path, point_ids):
+    """
+    The IDs among point_ids that have no row in the document store.
+    """
+    point_ids = [str(point_id) for point_id in point_ids]
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        placeholders = ",".join("?" * len(point_ids))
+        found = {
+            row[0]
+            for row in connection.execute(
+                f"SELECT id FROM chunks WHERE id IN ({placeholders})", point_ids
+            )
+        }
+    finally:
+        connection.close()
+    return [point_id for point_id in point_ids if point_id not in found]
@@ -1,10 +1,21 @@
 import os
+import glob
+import gzip
+import json
 import uuid
+import math
+import hashlib
+import argparse
+import itertools
+import numpy as np
+from collections import deque
+from importlib.metadata import version, PackageNotFoundError
+from concurrent.futures import ProcessPoolExecutor
 from tqdm.auto import tqdm
-from typing import List
+import pypdfium2 as pdfium
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct
+from qdrant_client.http.models import Fusion, FusionQuery, PointStruct
 from fastembed.sparse.bm25 import Bm25
 from fastembed.late_interaction import LateInteractionTextEmbedding
 from fastembed import TextEmbedding
@@ -12,10 +23,29 @@ from fastembed import TextEmbedding
 from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
 from docling.chunking import HybridChunker
 from docling.document_converter import DocumentConverter
+from docling_core.types.doc import DoclingDocument
+from colbert_compression import COMPRESSION_METHODS, compress_colbert_embedding
+from colbert_store import write_colbert_vectors
+from collection import create_hybrid_collection, resolve_alias
+from corpus_export import export_collection
+from dedup import DEDUP_THRESHOLD, NearDuplicateIndex, chunk_location
+from docstore import filterable_payload, set_locations, write_documents
+from profiling import StageProfiler
+from projection import (
+    DENSE_PROJECTION_DIR,
+    explained_variance,
+    fit_pca,
+    load_projection,
+    project,
+    projection_path,
+    save_projection,
+)
+from upload import UPLOAD_PARALLEL, UPLOAD_WAIT, upload_in_batches, wait_for_points
 
 
 # Constants
-PDF_PATH = "./D23569.pdf"
+PDF_PATH = "./D23569.pdf"  # Default input when no paths are given
+CONVERSION_WORKERS = 4  # Processes converting PDFs in parallel
 EMBED_MODEL_ID = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
 MAX_TOKENS = 750
 # NER_MODEL_NAME = "dslim/bert-large-NER" # Generic NER model - example 1
@@ -23,28 +53,286 @@ MAX_TOKENS = 750
 NER_MODEL_NAME = "pierreguillou/ner-bert-base-cased-pt-lenerbr"  # Pt. Legal NER model
 MIN_ENTITY_CONFIDENCE = 0.80  # Minimum confidence threshold for entity extraction
 
+# Converted documents are cached here, keyed by PDF hash and converter version
+CONVERSION_CACHE_DIR = "./.conversion_cache"
+CONVERTER_PACKAGES = ("docling", "docling-core", "docling-ibm-models", "docling-parse")
+MIN_PAGES_PER_PART = 20  # Large PDFs are converted as page ranges of at least this size
+DOCUMENT_ITEM_LISTS = (
+    "groups",
+    "texts",
+    "pictures",
+    "tables",
+    "key_value_items",
+    "form_items",
+)
 
-def convert_pdf_to_document(pdf_path):
+# Optional SQLite document store for chunk texts and full metadata. When set,
+# Qdrant payloads keep only the filterable metadata fields.
+DOCSTORE_PATH = None
+
+# Optional local store of ColBERT matrices for the API's local rerank backend.
+# Collections created without ColBERT vectors (--no-colbert-vectors) need it.
+COLBERT_STORE_PATH = None
+
+# ingest_pdfs embeds and uploads the unique chunks in batches of this size, so
+# memory is bound by a batch rather than by the corpus
+INGEST_BATCH_CHUNKS = 256
+# A reduced collection without a saved projection gets one fitted on this many
+# chunks (or on the whole input, if smaller) before the first upload
+PROJECTION_FIT_CHUNKS = 4096
+
+# ColBERT multivector compression: None, "prune", "pool" or "prune_pool"
+COLBERT_COMPRESSION = None
+COLBERT_POOL_FACTOR = 2  # Keep ~1/factor of the token vectors when pooling
+
+
+def file_sha256(path):
+    """
+    Hash a file's contents in 1MB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def converter_version():
+    """
+    Versions of the packages that determine the conversion output.
+    """
+    versions = []
+    for package in CONVERTER_PACKAGES:
+        try:
+            versions.append(f"{package}={version(package)}")
+        except PackageNotFoundError:
+            versions.append(f"{package}=none")
+    return ",".join(versions)
+
+
+def conversion_cache_path(pdf_path, cache_dir):
+    """
+    Cache file for a PDF: a new PDF or converter release gets a new key.
+    """
+    version_hash = hashlib.sha256(converter_version().encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{file_sha256(pdf_path)}-{version_hash}.json.gz")
+
+
+def load_cached_document(pdf_path, cache_dir=CONVERSION_CACHE_DIR):
+    """
+    Return the cached conversion of a PDF, or None if there is none.
+    """
+    cache_path = conversion_cache_path(pdf_path, cache_dir)
+    if not os.path.exists(cache_path):
+        return None
+
+    print(f"Loading cached conversion for {pdf_path}")
+    with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+        return DoclingDocument.model_validate(json.load(f))
+
+
+def save_cached_document(document, pdf_path, cache_dir=CONVERSION_CACHE_DIR):
+    """
+    Store a converted document in the cache.
+    """
+    cache_path = conversion_cache_path(pdf_path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Write to a temporary file first so an interrupted run leaves no partial cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(document.export_to_dict(), f)
+    os.replace(tmp_path, cache_path)
+
+
+def count_pdf_pages(pdf_path):
+    """
+    Count the pages of a PDF without converting it.
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def split_page_ranges(page_count, workers, min_pages=MIN_PAGES_PER_PART):
+    """
+    Split a PDF into 1-based inclusive page ranges, one per worker but never
+    smaller than min_pages. Returns [None] when the PDF is not worth splitting.
+    """
+    if workers <= 1 or page_count < 2 * min_pages:
+        return [None]
+
+    size = max(min_pages, math.ceil(page_count / workers))
+    return [
+        (start, min(start + size - 1, page_count))
+        for start in range(1, page_count + 1, size)
+    ]
+
+
+def shift_refs(node, offsets):
+    """
+    Shift JSON pointer references such as "#/texts/3" by per-list offsets, in place.
+    """
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in ("$ref", "self_ref") and isinstance(value, str):
+                parts = value.split("/")
+                if len(parts) == 3 and parts[1] in offsets:
+                    node[key] = f"#/{parts[1]}/{int(parts[2]) + offsets[parts[1]]}"
+            else:
+                shift_refs(value, offsets)
+    elif isinstance(node, list):
+        for item in node:
+            shift_refs(item, offsets)
+
+
+def merge_documents(parts):
+    """
+    Merge documents converted from consecutive page ranges of the same PDF.
+
+    Docling keeps absolute page numbers when converting a page range, so
+    provenance (and chunk.meta.page_numbers) is already correct; only the
+    internal item references need to be renumbered.
+    """
+    merged = parts[0].export_to_dict()
+    for part in parts[1:]:
+        data = part.export_to_dict()
+        offsets = {key: len(merged.get(key, [])) for key in DOCUMENT_ITEM_LISTS}
+        shift_refs(data, offsets)
+
+        for key in DOCUMENT_ITEM_LISTS:
+            merged.setdefault(key, []).extend(data.get(key, []))
+        merged["body"]["children"].extend(data["body"]["children"])
+        merged["furniture"]["children"].extend(data["furniture"]["children"])
+        merged.setdefault("pages", {}).update(data.get("pages", {}))
+
+    return DoclingDocument.model_validate(merged)
+
+
+# Each conversion process keeps one DocumentConverter (and its layout models)
+# for all the PDFs and page ranges it handles
+_converter = None
+
+
+def convert_page_range(task):
+    """
+    Convert a (pdf_path, page_range) task; page_range None means the whole PDF.
+    Used directly and as the ProcessPoolExecutor entry point.
+    """
+    global _converter
+    if _converter is None:
+        _converter = DocumentConverter()
+
+    pdf_path, page_range = task
+    if page_range is None:
+        return _converter.convert(pdf_path).document
+    return _converter.convert(pdf_path, page_range=page_range).document
+
+
+def map_in_order(fn, tasks, workers):
+    """
+    Run fn over tasks in a process pool and yield the results in task order.
+
+    At most 2 * workers tasks are submitted ahead of the consumer, so results
+    do not pile up in memory while later pipeline stages are slower.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        yield from map(fn, tasks)
+        return
+
+    with (
+        ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor,
+        tqdm(total=len(tasks)) as progress,
+    ):
+        pending = deque()
+        for task in tasks:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+                progress.update()
+            pending.append(executor.submit(fn, task))
+        while pending:
+            yield pending.popleft().result()
+            progress.update()
+
+
+def iter_converted_pdfs(
+    pdf_paths, workers=CONVERSION_WORKERS, cache_dir=CONVERSION_CACHE_DIR
+):
+    """
+    Convert PDFs across a process pool, yielding (pdf_path, document) in input
+    order as each one is ready.
+
+    Large PDFs are split into page ranges so that even a single document
+    keeps every worker busy; the parts are merged back before caching.
+    Cached documents are loaded only when their turn comes.
+    """
+    plan = []
+    tasks = []
+    for path in pdf_paths:
+        if cache_dir and os.path.exists(conversion_cache_path(path, cache_dir)):
+            plan.append((path, 0))
+            continue
+        page_ranges = (
+            split_page_ranges(count_pdf_pages(path), workers) if workers > 1 else [None]
+        )
+        tasks.extend((path, page_range) for page_range in page_ranges)
+        plan.append((path, len(page_ranges)))
+
+    results = map_in_order(convert_page_range, tasks, workers)
+    for path, part_count in plan:
+        if not part_count:
+            yield path, load_cached_document(path, cache_dir)
+            continue
+
+        parts = [next(results) for _ in range(part_count)]
+        document = merge_documents(parts) if len(parts) > 1 else parts[0]
+        if cache_dir:
+            save_cached_document(document, path, cache_dir)
+        yield path, document
+
+
+def convert_pdfs(pdf_paths, workers=CONVERSION_WORKERS, cache_dir=CONVERSION_CACHE_DIR):
+    """
+    Convert PDFs across a process pool, returning documents in input order.
+    """
+    return [
+        document for _, document in iter_converted_pdfs(pdf_paths, workers, cache_dir)
+    ]
+
+
+def convert_pdf_to_document(pdf_path, cache_dir=CONVERSION_CACHE_DIR, workers=1):
     """
     Convert a PDF file to a structured document format.
+
+    The result is cached on disk, so runs that only change chunking, NER or
+    embedding parameters skip Docling's layout pipeline. Pass cache_dir=None
+    to always convert. With workers > 1 a large PDF is converted as page
+    ranges in parallel worker processes.
     """
-    converter = DocumentConverter()
-    result = converter.convert(pdf_path)
-    return result.document
+    return convert_pdfs([pdf_path], workers, cache_dir)[0]
 
 
-def create_document_chunks(document, embed_model_id, max_tokens):
+def create_chunker(embed_model_id, max_tokens):
     """
-    Split the document into manageable chunks for processing.
+    Create a chunker aligned with the embedding model's tokenizer.
     """
     tokenizer = AutoTokenizer.from_pretrained(embed_model_id)
 
-    chunker = HybridChunker(
+    return HybridChunker(
         tokenizer=tokenizer,
         max_tokens=max_tokens,
         merge_peers=True,
     )
 
+
+def create_document_chunks(document, embed_model_id, max_tokens, chunker=None):
+    """
+    Split the document into manageable chunks for processing.
+    """
+    chunker = chunker or create_chunker(embed_model_id, max_tokens)
+
     chunk_iter = chunker.chunk(dl_doc=document)
     return list(chunk_iter)
 
@@ -106,7 +394,7 @@ def extract_entities_from_chunk(chunk_text, ner_pipeline, min_confidence=0.75):
     return filtered_entities
 
 
-def enrich_chunks_with_metadata(chunks, ner_pipeline):
+def enrich_chunks_with_metadata(chunks, ner_pipeline, source=None):
     """
     Add metadata to each document chunk, including extracted entities.
     """
@@ -121,6 +409,10 @@ def enrich_chunks_with_metadata(chunks, ner_pipeline):
             else None,
         }
 
+        # Source file, to tell chunks from different documents apart
+        if source:
+            metadata["source"] = source
+
         # Add headings if available
         if hasattr(chunk, "meta") and hasattr(chunk.meta, "headings"):
             metadata["headings"] = chunk.meta.headings
@@ -154,25 +446,54 @@ def initialize_embedding_models():
     return dense_embedding_model, bm25_embedding_model, colbert_embedding_model
 
 
-def create_embeddings(chunk_text, dense_model, bm25_model, colbert_model):
+def create_embeddings(
+    chunk_text,
+    dense_model,
+    bm25_model,
+    colbert_model,
+    dense_projection=None,
+    colbert_compression=COLBERT_COMPRESSION,
+):
     """
     Create the three types of embeddings for a text chunk.
+
+    dense_projection is an optional (mean, components) PCA projection;
+    colbert_compression one of the methods of compress_colbert_embedding.
+    Without colbert_model the late embedding is skipped.
     """
     # Generate embeddings for each model
-    dense_embedding = list(dense_model.passage_embed([chunk_text]))[0].tolist()
+    dense_embedding = list(dense_model.passage_embed([chunk_text]))[0]
+    if dense_projection is not None:
+        dense_embedding = project(dense_embedding, *dense_projection)
+    dense_embedding = dense_embedding.tolist()
     sparse_embedding = list(bm25_model.passage_embed([chunk_text]))[0].as_object()
-    colbert_embedding = list(colbert_model.passage_embed([chunk_text]))[0].tolist()
+    embeddings = {"dense": dense_embedding, "sparse": sparse_embedding}
+    if colbert_model is None:
+        return embeddings
+    colbert_embedding = list(colbert_model.passage_embed([chunk_text]))[0]
 
-    return {
-        "dense": dense_embedding,
-        "sparse": sparse_embedding,
-        "colbertv2.0": colbert_embedding,
-    }
+    # Reduce the per-token vectors that dominate storage and rerank cost
+    if colbert_compression:
+        colbert_embedding = compress_colbert_embedding(
+            colbert_embedding, chunk_text, colbert_compression, COLBERT_POOL_FACTOR
+        )
+    embeddings["colbertv2.0"] = colbert_embedding.tolist()
+
+    return embeddings
 
 
-def prepare_point(chunk, embedding_models):
+def prepare_point(
+    chunk,
+    embedding_models,
+    text_in_payload=True,
+    dense_projection=None,
+    colbert_compression=COLBERT_COMPRESSION,
+):
     """
     Prepare a single data point for Qdrant ingestion.
+
+    With text_in_payload=False the text and full metadata are expected to be
+    stored in the document store, and the payload keeps only filterable fields.
     """
     dense_model, bm25_model, colbert_model = embedding_models
 
@@ -180,105 +501,645 @@ def prepare_point(chunk, embedding_models):
     text = chunk.get("text", "")
 
     # Create embeddings
-    embeddings = create_embeddings(text, dense_model, bm25_model, colbert_model)
+    embeddings = create_embeddings(
+        text,
+        dense_model,
+        bm25_model,
+        colbert_model,
+        dense_projection,
+        colbert_compression,
+    )
 
     # Prepare payload with metadata from chunk
-    payload = {"text": text, "metadata": chunk.get("metadata", {})}
+    if text_in_payload:
+        payload = {"text": text, "metadata": chunk.get("metadata", {})}
+    else:
+        payload = {"metadata": filterable_payload(chunk.get("metadata", {}))}
 
     # Create and return the point
-    return PointStruct(
-        id=str(uuid.uuid4()),
-        vector={
-            "dense": embeddings["dense"],
-            "sparse": embeddings["sparse"],
-            "colbertv2.0": embeddings["colbertv2.0"],
-        },
-        payload=payload,
-    )
+    return PointStruct(id=str(uuid.uuid4()), vector=embeddings, payload=payload)
 
 
-def upload_in_batches(
-    client: QdrantClient,
-    collection_name: str,
-    points: List[PointStruct],
-    batch_size: int = 10,
+def prepare_points(
+    chunks,
+    embedding_models,
+    text_in_payload=True,
+    dense_projection=None,
+    colbert_compression=COLBERT_COMPRESSION,
 ):
     """
-    Upload points to Qdrant in batches with progress tracking.
+    Embed every chunk and build the Qdrant points.
     """
-    # Calculate number of batches
-    n_batches = (len(points) + batch_size - 1) // batch_size
+    return [
+        prepare_point(
+            chunk,
+            embedding_models,
+            text_in_payload,
+            dense_projection,
+            colbert_compression,
+        )
+        for chunk in tqdm(chunks)
+    ]
 
-    print(
-        f"Uploading {len(points)} points to collection '{collection_name}' in {n_batches} batches..."
-    )
 
-    # Process each batch with progress bar
-    for i in tqdm(range(0, len(points), batch_size), total=n_batches):
-        batch = points[i : i + batch_size]
-        client.upload_points(collection_name=collection_name, points=batch)
+def collection_vectors(client, collection_name):
+    """
+    Named dense and multivector params of a collection.
+    """
+    return client.get_collection(collection_name).config.params.vectors
+
+
+def collection_projection_path(client, collection_name, directory=DENSE_PROJECTION_DIR):
+    """
+    Projection file of a collection, or of the collection an alias points to.
+    """
+    target = resolve_alias(client, collection_name) or collection_name
+    return projection_path(directory, target)
+
+
+def reduced_dense_size(client, collection_name, dense_model):
+    """
+    Dense size of a collection with reduced vectors, or None if full-width.
+    """
+    size = collection_vectors(client, collection_name)["dense"].size
+    return None if size == dense_model.embedding_size else size
+
+
+def resolve_dense_projection(
+    client, collection_name, chunks, dense_model, directory=DENSE_PROJECTION_DIR
+):
+    """
+    Load or fit the PCA projection matching the collection's dense size.
+
+    Returns None for full-width collections. The first ingestion into a
+    reduced collection fits the projection on its chunks and saves it under
+    directory, keyed by the physical collection: later ingestions into it
+    reuse the projection, while a rebuild into a new version fits its own.
+    """
+    size = reduced_dense_size(client, collection_name, dense_model)
+    if size is None:
+        return None
+
+    path = collection_projection_path(client, collection_name, directory)
 
+    if os.path.exists(path):
+        mean, components = load_projection(path)
+        if components.shape[0] != size:
+            raise ValueError(
+                f"Projection in {path} has {components.shape[0]} dimensions, "
+                f"collection '{collection_name}' expects {size}"
+            )
+        return mean, components
+
+    print(f"Fitting PCA projection to {size} dimensions on {len(chunks)} chunks...")
+    vectors = np.stack(list(dense_model.passage_embed([c["text"] for c in chunks])))
+    mean, components = fit_pca(vectors, size)
     print(
-        f"Successfully uploaded {len(points)} points to collection '{collection_name}'"
+        f"Projection keeps {explained_variance(vectors, mean, components):.1%} "
+        f"of the variance, saved to {path}"
     )
+    save_projection(path, mean, components)
+    return mean, components
 
 
-def process_and_upload_chunks(chunks, collection_name):
+def create_qdrant_client():
     """
-    Process document chunks and upload them to Qdrant.
+    Create a Qdrant client from environment variables.
     """
     # Load environment variables
     load_dotenv()
 
-    # Initialize client
-    client = QdrantClient(
+    return QdrantClient(
         url=os.getenv("QDRANT_URL"),
         api_key=os.getenv("QDRANT_API_KEY"),
     )
 
+
+def colbert_in_collection(client, collection_name, colbert_store_path, required=True):
+    """
+    Whether the collection keeps ColBERT vectors. Collections without them
+    rerank from the local store, so colbert_store_path is then required,
+    unless required=False (searches then fuse without a rerank).
+    """
+    colbert_in_qdrant = "colbertv2.0" in collection_vectors(client, collection_name)
+    if not colbert_in_qdrant and not colbert_store_path and required:
+        raise ValueError(
+            f"Collection '{collection_name}' has no ColBERT vectors; "
+            "a ColBERT store path is required"
+        )
+    return colbert_in_qdrant
+
+
+def upload_chunk_batch(
+    chunks,
+    collection_name,
+    client,
+    embedding_models,
+    profiler,
+    dense_projection=None,
+    colbert_in_qdrant=True,
+    docstore_path=DOCSTORE_PATH,
+    colbert_store_path=COLBERT_STORE_PATH,
+    upload_parallel=UPLOAD_PARALLEL,
+    barrier=True,
+    colbert_compression=COLBERT_COMPRESSION,
+):
+    """
+    Embed a batch of chunks and upload the points to Qdrant.
+
+    With docstore_path set, texts and metadata are written to the document
+    store before the points are uploaded, so every searchable point has them.
+    The same goes for ColBERT matrices and colbert_store_path. barrier=False
+    returns without waiting for Qdrant to apply the points (see
+    upload_in_batches). When neither Qdrant nor a ColBERT store keeps the
+    late vectors, they are not computed.
+
+    Returns the IDs of the uploaded points, in chunk order.
+    """
+    if not colbert_in_qdrant and not colbert_store_path:
+        dense_model, bm25_model, _ = embedding_models
+        embedding_models = (dense_model, bm25_model, None)
+
+    with profiler.stage("embedding") as stage:
+        points = prepare_points(
+            chunks,
+            embedding_models,
+            text_in_payload=docstore_path is None,
+            dense_projection=dense_projection,
+            colbert_compression=colbert_compression,
+        )
+        stage["items"] = len(points)
+
+    if docstore_path:
+        with profiler.stage("docstore") as stage:
+            write_documents(
+                docstore_path,
+                (
+                    (point.id, chunk["text"], chunk.get("metadata", {}))
+                    for point, chunk in zip(points, chunks)
+                ),
+            )
+            stage["items"] = len(points)
+
+    if colbert_store_path:
+        with profiler.stage("late_vectors") as stage:
+            stage["items"] = write_colbert_vectors(
+                colbert_store_path,
+                ((point.id, point.vector["colbertv2.0"]) for point in points),
+            )
+    if not colbert_in_qdrant:
+        for point in points:
+            point.vector.pop("colbertv2.0", None)
+
+    # Upload points in size-bounded parallel batches
+    with profiler.stage("upload") as stage:
+        upload_in_batches(
+            client=client,
+            collection_name=collection_name,
+            points=points,
+            parallel=upload_parallel,
+            barrier=barrier,
+        )
+        stage["items"] = len(points)
+
+    return [point.id for point in points]
+
+
+def add_duplicate_locations(client, collection_name, duplicates, docstore_path=None):
+    """
+    Record where the dropped duplicates of uploaded chunks came from.
+
+    duplicates maps point IDs to the locations of their duplicates.
+    metadata["locations"] lists the kept chunk's own location first, read
+    back from the point's payload, then those of its duplicates. Returns the
+    number of updated points.
+    """
+    records = client.retrieve(
+        collection_name,
+        ids=list(duplicates),
+        with_payload=["metadata"],
+        with_vectors=False,
+    )
+    locations = {
+        str(record.id): [
+            chunk_location(record.payload.get("metadata", {})),
+            *duplicates[str(record.id)],
+        ]
+        for record in records
+    }
+
+    if docstore_path:
+        set_locations(docstore_path, locations)
+    for point_id, point_locations in locations.items():
+        if docstore_path:
+            point_locations = filterable_payload({"locations": point_locations})[
+                "locations"
+            ]
+        client.set_payload(
+            collection_name,
+            payload={"locations": point_locations},
+            points=[point_id],
+            key="metadata",
+        )
+    return len(locations)
+
+
+def print_point_count(client, collection_name):
+    """
+    Print the collection's point count after an ingestion.
+    """
+    collection_info = client.get_collection(collection_name)
+    print(
+        f"Collection '{collection_name}' now has {collection_info.points_count} points"
+    )
+
+
+def process_and_upload_chunks(
+    chunks,
+    collection_name,
+    client=None,
+    embedding_models=None,
+    profiler=None,
+    docstore_path=DOCSTORE_PATH,
+    colbert_store_path=COLBERT_STORE_PATH,
+    upload_parallel=UPLOAD_PARALLEL,
+    colbert_compression=COLBERT_COMPRESSION,
+):
+    """
+    Process document chunks and upload them to Qdrant in a single batch.
+
+    See upload_chunk_batch for the document and ColBERT stores. Returns the
+    number of uploaded points.
+    """
+    profiler = profiler or StageProfiler()
+
+    # Initialize client
+    client = client or create_qdrant_client()
+    colbert_in_qdrant = colbert_in_collection(
+        client, collection_name, colbert_store_path
+    )
+
     # Initialize embedding models
-    embedding_models = initialize_embedding_models()
+    embedding_models = embedding_models or initialize_embedding_models()
 
     # Prepare points
     print("Preparing points with embeddings...")
-    points = []
-    for chunk in tqdm(chunks):
-        point = prepare_point(chunk, embedding_models)
-        points.append(point)
+    with profiler.stage("embedding"):
+        dense_projection = resolve_dense_projection(
+            client, collection_name, chunks, embedding_models[0]
+        )
+    point_ids = upload_chunk_batch(
+        chunks,
+        collection_name,
+        client,
+        embedding_models,
+        profiler,
+        dense_projection,
+        colbert_in_qdrant,
+        docstore_path,
+        colbert_store_path,
+        upload_parallel,
+        colbert_compression=colbert_compression,
+    )
 
-    # Upload points in batches
-    upload_in_batches(
-        client=client,
+    # Print confirmation with collection info
+    print_point_count(client, collection_name)
+
+    return len(point_ids)
+
+
+def run_smoke_query(client, collection_name, embedding_models, query, limit=3):
+    """
+    Run the same hybrid query the API uses and return the hits.
+    """
+    dense_model, bm25_model, colbert_model = embedding_models
+
+    vectors = collection_vectors(client, collection_name)
+
+    dense_vector = next(dense_model.query_embed(query))
+    if vectors["dense"].size != len(dense_vector):
+        dense_vector = project(
+            dense_vector,
+            *load_projection(collection_projection_path(client, collection_name)),
+        )
+    dense_vector = dense_vector.tolist()
+    sparse_vector = next(bm25_model.query_embed(query)).as_object()
+
+    # Without ColBERT vectors in Qdrant the candidates are fused with RRF
+    if "colbertv2.0" in vectors:
+        late_vector = next(colbert_model.query_embed(query)).tolist()
+        rerank = {"query": late_vector, "using": "colbertv2.0"}
+    else:
+        rerank = {"query": FusionQuery(fusion=Fusion.RRF)}
+
+    result = client.query_points(
         collection_name=collection_name,
-        points=points,
-        batch_size=4,  # Adjust based on your document size and memory constraints
+        prefetch=[
+            {"query": dense_vector, "using": "dense", "limit": 25},
+            {"query": sparse_vector, "using": "sparse", "limit": 25},
+        ],
+        with_payload=True,
+        limit=limit,
+        **rerank,
     )
+    return result.points
 
-    # Print confirmation with collection info
-    collection_info = client.get_collection(collection_name)
-    print(
-        f"Collection '{collection_name}' now has {collection_info.points_count} points"
+
+def resolve_pdf_paths(inputs):
+    """
+    Expand directories and glob patterns into a sorted list of PDF files.
+    """
+    paths = set()
+    for entry in inputs:
+        if os.path.isdir(entry):
+            paths.update(glob.glob(os.path.join(entry, "**", "*.pdf"), recursive=True))
+        elif glob.has_magic(entry):
+            paths.update(glob.glob(entry, recursive=True))
+        elif os.path.isfile(entry):
+            paths.add(entry)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {entry}")
+    return sorted(paths)
+
+
+def ingest_pdfs(
+    pdf_paths,
+    collection_name,
+    client=None,
+    embedding_models=None,
+    workers=CONVERSION_WORKERS,
+    profiler=None,
+    verbose=False,
+    dedup_threshold=DEDUP_THRESHOLD,
+    docstore_path=DOCSTORE_PATH,
+    colbert_store_path=COLBERT_STORE_PATH,
+    upload_parallel=UPLOAD_PARALLEL,
+    colbert_compression=COLBERT_COMPRESSION,
+    require_colbert=True,
+):
+    """
+    Run the full pipeline for several PDFs: convert, chunk, enrich, embed and upload.
+
+    Documents stream through the pipeline: conversion runs ahead in a process
+    pool, and unique chunks are embedded and uploaded in batches of
+    INGEST_BATCH_CHUNKS as they arrive, so memory is bound by one document and
+    one batch rather than by the corpus. Near-duplicates are found across
+    documents from the MinHash signatures of the chunks seen so far; the
+    locations of the dropped duplicates are added to the kept points at the
+    end. The chunker, NER pipeline and embedding models are loaded once and
+    shared across documents.
+
+    Returns the number of uploaded points.
+    """
+    profiler = profiler or StageProfiler()
+    client = client or create_qdrant_client()
+    colbert_in_qdrant = colbert_in_collection(
+        client, collection_name, colbert_store_path, require_colbert
+    )
+
+    # Load the shared models once
+    chunker = create_chunker(EMBED_MODEL_ID, MAX_TOKENS)
+    ner_pipeline = setup_ner_pipeline(NER_MODEL_NAME)
+    embedding_models = embedding_models or initialize_embedding_models()
+
+    # A reduced collection without a saved projection holds back the first
+    # PROJECTION_FIT_CHUNKS chunks to fit one
+    reduced = reduced_dense_size(client, collection_name, embedding_models[0])
+    fit_projection = reduced is not None and not os.path.exists(
+        collection_projection_path(client, collection_name)
+    )
+    dense_projection = (
+        None
+        if fit_projection
+        else resolve_dense_projection(client, collection_name, [], embedding_models[0])
+    )
+
+    index = NearDuplicateIndex(dedup_threshold) if dedup_threshold else None
+    pending = []  # (position, chunk) of the unique chunks not uploaded yet
+    point_ids = {}  # Position -> point ID of every uploaded chunk
+    duplicates = {}  # Position of a kept chunk -> locations of its duplicates
+    total_chunks = 0
+
+    # Batches are applied asynchronously; the barrier runs once at the end
+    initial_count = (
+        client.count(collection_name=collection_name, exact=True).count
+        if not UPLOAD_WAIT
+        else 0
+    )
+
+    def upload(batch):
+        ids = upload_chunk_batch(
+            [chunk for _, chunk in batch],
+            collection_name,
+            client,
+            embedding_models,
+            profiler,
+            dense_projection,
+            colbert_in_qdrant,
+            docstore_path,
+            colbert_store_path,
+            upload_parallel,
+            barrier=False,
+            colbert_compression=colbert_compression,
+        )
+        point_ids.update(zip((position for position, _ in batch), ids))
+
+    print(f"Converting {len(pdf_paths)} PDFs with {workers} workers...")
+    documents = profiler.iterate(
+        "conversion", iter_converted_pdfs(pdf_paths, workers), children=workers > 1
+    )
+    for pdf_path, document in documents:
+        # Create document chunks
+        with profiler.stage("chunking") as stage:
+            chunks = create_document_chunks(
+                document, EMBED_MODEL_ID, MAX_TOKENS, chunker
+            )
+            stage["items"] = len(chunks)
+        print(f"{pdf_path}: split into {len(chunks)} chunks")
+
+        # Process chunks and extract metadata
+        with profiler.stage("ner") as stage:
+            enriched_chunks = enrich_chunks_with_metadata(
+                chunks, ner_pipeline, source=os.path.basename(pdf_path)
+            )
+            stage["items"] = len(chunks)
+
+        # Collapse boilerplate repeated within and across documents
+        originals = [None] * len(enriched_chunks)
+        if index is not None:
+            with profiler.stage("dedup") as stage:
+                originals = index.add([chunk["text"] for chunk in enriched_chunks])
+                stage["items"] = len(enriched_chunks)
+
+        for position, chunk, original in zip(
+            itertools.count(total_chunks), enriched_chunks, originals
+        ):
+            if original is None:
+                pending.append((position, chunk))
+                # Display results
+                if verbose:
+                    print(chunk)
+            else:
+                duplicates.setdefault(original, []).append(
+                    chunk_location(chunk["metadata"])
+                )
+        total_chunks += len(enriched_chunks)
+
+        if fit_projection and len(pending) >= PROJECTION_FIT_CHUNKS:
+            dense_projection = resolve_dense_projection(
+                client,
+                collection_name,
+                [chunk for _, chunk in pending],
+                embedding_models[0],
+            )
+            fit_projection = False
+
+        # Embed and send the full batches to Qdrant
+        while not fit_projection and len(pending) >= INGEST_BATCH_CHUNKS:
+            upload(pending[:INGEST_BATCH_CHUNKS])
+            del pending[:INGEST_BATCH_CHUNKS]
+
+    if fit_projection and pending:
+        dense_projection = resolve_dense_projection(
+            client,
+            collection_name,
+            [chunk for _, chunk in pending],
+            embedding_models[0],
+        )
+    for start in range(0, len(pending), INGEST_BATCH_CHUNKS):
+        upload(pending[start : start + INGEST_BATCH_CHUNKS])
+
+    if not UPLOAD_WAIT:
+        print("Waiting for Qdrant to apply all batches...")
+        wait_for_points(client, collection_name, initial_count + len(point_ids))
+
+    if index is not None:
+        saved = 100.0 * (total_chunks - len(point_ids)) / max(total_chunks, 1)
+        print(
+            f"Deduplication: {total_chunks} chunks -> {len(point_ids)} unique "
+            f"({saved:.1f}% saved)"
+        )
+    if duplicates:
+        with profiler.stage("locations") as stage:
+            stage["items"] = add_duplicate_locations(
+                client,
+                collection_name,
+                {point_ids[p]: locations for p, locations in duplicates.items()},
+                docstore_path,
+            )
+
+    print_point_count(client, collection_name)
+    return len(point_ids)
+
+
+def ingest_to_file(pdf_paths, path, collection_name, colbert_vectors=True, **options):
+    """
+    Run the full pipeline without a Qdrant server and write the points to an
+    Arrow file in the export format (corpus_export.py).
+
+    The points are collected in an in-memory collection first, so the file
+    holds the same config and vectors as an exported collection. It can be
+    imported with create-collection.py --import or served by the API's local
+    retriever. With colbert_vectors=False the file leaves the ColBERT vectors
+    out, and they are only computed for a ColBERT store. Returns the number
+    of points.
+    """
+    client = QdrantClient(":memory:")
+    create_hybrid_collection(
+        client, collection_name, payload_indexes=False, colbert_vectors=colbert_vectors
     )
 
+    # The in-memory client is not thread-safe: upload one batch at a time
+    count = ingest_pdfs(
+        pdf_paths,
+        collection_name,
+        client=client,
+        upload_parallel=1,
+        require_colbert=False,
+        **options,
+    )
+    export_collection(client, collection_name, path)
+    print(f"{count} points written to {path}")
+    return count
 
-# Running
-# Convert PDF to document
-document = convert_pdf_to_document(PDF_PATH)
 
-# Create document chunks
-chunks = create_document_chunks(document, EMBED_MODEL_ID, MAX_TOKENS)
-print(f"Document split into {len(chunks)} chunks")
+def main():
+    load_dotenv()
 
-# Set up NER pipeline
-ner_pipeline = setup_ner_pipeline(NER_MODEL_NAME)
+    parser = argparse.ArgumentParser(description="Ingest PDF documents into Qdrant")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=[PDF_PATH],
+        help="PDF files, directories or glob patterns",
+    )
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME"))
+    parser.add_argument("--workers", type=int, default=CONVERSION_WORKERS)
+    parser.add_argument("--verbose", action="store_true", help="Print every chunk")
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help="Near-duplicate similarity threshold (0 disables deduplication)",
+    )
+    parser.add_argument(
+        "--colbert-compression",
+        choices=["none", *COMPRESSION_METHODS],
+        default=COLBERT_COMPRESSION or "none",
+        help="Reduce the ColBERT vectors of each chunk before upload",
+    )
+    parser.add_argument(
+        "--docstore",
+        default=DOCSTORE_PATH,
+        help="SQLite file for chunk texts; Qdrant then keeps only filterable fields",
+    )
+    parser.add_argument(
+        "--colbert-store",
+        default=COLBERT_STORE_PATH,
+        help="Directory for ColBERT matrices used by the API's local rerank",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Write the points to an Arrow export file instead of Qdrant",
+    )
+    parser.add_argument(
+        "--no-colbert-vectors",
+        action="store_true",
+        help="With --output, leave the ColBERT vectors out of the file",
+    )
+    args = parser.parse_args()
+    if args.no_colbert_vectors and not args.output:
+        parser.error("--no-colbert-vectors requires --output")
+
+    pdf_paths = resolve_pdf_paths(args.paths)
+    if not pdf_paths:
+        raise SystemExit("No PDF files found")
 
-# Process chunks and extract metadata
-enriched_chunks = enrich_chunks_with_metadata(chunks, ner_pipeline)
+    profiler = StageProfiler()
+    options = dict(
+        workers=args.workers,
+        profiler=profiler,
+        verbose=args.verbose,
+        dedup_threshold=args.dedup_threshold,
+        docstore_path=args.docstore,
+        colbert_store_path=args.colbert_store,
+        colbert_compression=None
+        if args.colbert_compression == "none"
+        else args.colbert_compression,
+    )
+    if args.output:
+        ingest_to_file(
+            pdf_paths,
+            args.output,
+            args.collection or "documents",
+            colbert_vectors=not args.no_colbert_vectors,
+            **options,
+        )
+    else:
+        ingest_pdfs(pdf_paths, args.collection, **options)
+    profiler.report()
 
-# Display results
-for i, chunk in enumerate(enriched_chunks):
-    print(chunk)
 
-# Send data to Qdrant
-COLLECTION_NAME = os.getenv("COLLECTION_NAME")
-process_and_upload_chunks(enriched_chunks, COLLECTION_NAME)
+if __name__ == "__main__":
+    main()
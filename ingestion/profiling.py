@@ -0,0 +1,105 @@
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb(children=False):
+    """
+    Peak resident set size of this process (or of its finished children), in MB.
+
+    This is the high-water mark since the process started, not of any stage.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """
+    Collect wall-clock time and throughput per pipeline stage, and the
+    process's peak RSS so far each time a stage ends.
+
+    ru_maxrss only grows, so a stage's figure is the cumulative peak of the
+    run up to that stage, not the memory the stage itself used: a stage that
+    follows a heavier one reports the heavier one's peak.
+
+    Usage:
+        profiler = StageProfiler()
+        with profiler.stage("embedding") as stage:
+            points = prepare_points(chunks, models)
+            stage["items"] = len(points)
+        profiler.report()
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, children=False):
+        """
+        Time a stage. Set record["items"] inside the block to report items/sec.
+        Use children=True to include the peak of finished worker processes.
+        """
+        record = self.stages.setdefault(
+            name, {"seconds": 0.0, "items": 0, "cumulative_peak_rss_mb": None}
+        )
+        items_before = record["items"]
+        record["items"] = 0
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] += time.perf_counter() - start
+            record["items"] += items_before
+            peak = peak_rss_mb()
+            if peak is not None and children:
+                peak = max(peak, peak_rss_mb(children=True))
+            if peak is not None:
+                record["cumulative_peak_rss_mb"] = max(
+                    record["cumulative_peak_rss_mb"] or 0.0, peak
+                )
+
+    def iterate(self, name, iterable, children=False):
+        """
+        Yield from iterable, timing each step as the stage name (one item each).
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name, children) as record:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                record["items"] = 1
+            yield item
+
+    def report(self):
+        """
+        Print one line per stage.
+        """
+        print(
+            f"\n{'stage':<12} {'seconds':>10} {'items':>8} {'items/s':>10} "
+            f"{'cumulative peak RSS MB':>22}"
+        )
+        for name, record in self.stages.items():
+            rate = record["items"] / record["seconds"] if record["seconds"] else 0.0
+            peak = (
+                f"{record['cumulative_peak_rss_mb']:.0f}"
+                if record["cumulative_peak_rss_mb"] is not None
+                else "n/a"
+            )
+            print(
+                f"{name:<12} {record['seconds']:>10.2f} {record['items']:>8} "
+                f"{rate:>10.2f} {peak:>22}"
+            )
+        total = sum(record["seconds"] for record in self.stages.values())
+        print(f"{'total':<12} {total:>10.2f}")
+        print("(peak RSS of the run so far when each stage last ended)")
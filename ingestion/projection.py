@@ -0,0 +1,80 @@
+import os
+import numpy as np
+
+# PCA projections of collections created with reduced dense vectors
+# (create-collection.py --dense-dimensions), one file per physical collection,
+# so a rebuild (a new version) is fitted on its own corpus. The API reads them
+# from DENSE_PROJECTION_DIR for the collection its alias points to.
+DENSE_PROJECTION_DIR = "./dense_projections"
+
+
+def fit_pca(vectors: np.ndarray, dimensions: int):
+    """
+    Fit a PCA projection on corpus vectors (one per row).
+
+    Returns (mean, components), with components of shape (dimensions, dim).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dimensions >= vectors.shape[1]:
+        raise ValueError(
+            f"Target dimension {dimensions} must be below {vectors.shape[1]}"
+        )
+    if len(vectors) <= dimensions:
+        raise ValueError(
+            f"PCA to {dimensions} dimensions needs more than {dimensions} vectors, "
+            f"got {len(vectors)}"
+        )
+
+    mean = vectors.mean(axis=0)
+    # Rows of vt are the principal axes, by decreasing explained variance
+    _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+    return mean, vt[:dimensions].astype(np.float32)
+
+
+def explained_variance(vectors: np.ndarray, mean, components) -> float:
+    """
+    Fraction of the corpus variance kept by the projection.
+    """
+    centered = np.asarray(vectors, dtype=np.float32) - mean
+    kept = ((centered @ components.T) ** 2).sum()
+    return float(kept / (centered**2).sum())
+
+
+def project(vectors: np.ndarray, mean, components) -> np.ndarray:
+    """
+    Project vectors (a single vector or one per row) and L2-normalize them,
+    so cosine scores stay comparable.
+    """
+    projected = (np.asarray(vectors, dtype=np.float32) - mean) @ components.T
+    norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+    return projected / np.maximum(norms, 1e-12)
+
+
+def save_projection(path: str, mean, components):
+    """
+    Persist a projection next to the collection it was fitted for.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, mean=mean, components=components)
+
+
+def load_projection(path: str):
+    """
+    Load (mean, components) saved with save_projection.
+    """
+    with np.load(path) as data:
+        return data["mean"], data["components"]
+
+
+def projection_path(directory: str, collection_name: str) -> str:
+    """
+    Where the projection of a physical collection (not an alias) is saved.
+    """
+    return os.path.join(directory, f"{collection_name}.npz")
+
+
+def export_projection_path(export_path: str) -> str:
+    """
+    Where an Arrow export keeps the projection of its collection.
+    """
+    return f"{os.path.splitext(export_path)[0]}.projection.npz"
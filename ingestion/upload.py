@@ -0,0 +1,223 @@
+import json
+import time
+from concurrent import futures
+from typing import Iterable, List, Optional
+from tqdm.auto import tqdm
+from qdrant_client import QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from qdrant_client.http.models import PointStruct
+
+# Upload tuning
+UPLOAD_MAX_BATCH_BYTES = 8 * 1024 * 1024  # Per request (Qdrant limit is 32MB)
+UPLOAD_MAX_BATCH_POINTS = 256  # Hard cap on points per request
+UPLOAD_PARALLEL = 4  # Concurrent in-flight batches
+UPLOAD_MAX_RETRIES = 5  # Attempts per batch on timeouts / transient errors
+UPLOAD_WAIT = False  # Apply batches asynchronously, wait once at the end
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+# Size estimate of a point in the request body: a float32 value serializes as
+# a ~22-character double, indices are at most 10 digits, plus the separators
+JSON_NUMBER_BYTES = 24
+POINT_OVERHEAD_BYTES = 128  # ID, vector names, brackets
+
+
+def vector_numbers(vector) -> int:
+    """
+    Numbers in a dense vector, a sparse vector (indices and values) or a
+    multivector (rows of equal size).
+    """
+    if hasattr(vector, "indices"):
+        return len(vector.indices) + len(vector.values)
+    if isinstance(vector, dict):
+        return len(vector["indices"]) + len(vector["values"])
+    if len(vector) and not isinstance(vector[0], (int, float)):
+        return len(vector) * len(vector[0])
+    return len(vector)
+
+
+def estimate_point_bytes(point: PointStruct) -> int:
+    """
+    Approximate the serialized size of a point from its vector shapes and
+    payload, without serializing the vectors (the client does that once, to
+    send them).
+    """
+    vectors = (
+        point.vector.values() if isinstance(point.vector, dict) else [point.vector]
+    )
+    numbers = sum(vector_numbers(vector) for vector in vectors)
+    payload = json.dumps(point.payload or {}, ensure_ascii=False, default=str)
+    return (
+        POINT_OVERHEAD_BYTES
+        + numbers * JSON_NUMBER_BYTES
+        + len(payload.encode("utf-8"))
+    )
+
+
+def split_batches_by_size(
+    points: Iterable[PointStruct],
+    max_batch_bytes: int = UPLOAD_MAX_BATCH_BYTES,
+    max_batch_points: int = UPLOAD_MAX_BATCH_POINTS,
+):
+    """
+    Group points into batches bounded by serialized size instead of point count.
+    Sizes are estimated from the vector shapes (estimate_point_bytes).
+
+    ColBERT multivectors make point sizes vary by orders of magnitude, so a
+    fixed point count either under-fills requests or exceeds the size limit.
+    A single point larger than max_batch_bytes is sent on its own. Batches are
+    yielded as they fill up, so points can come from a generator.
+    """
+    batch, batch_bytes = [], 0
+
+    for point in points:
+        point_bytes = estimate_point_bytes(point)
+        if batch and (
+            batch_bytes + point_bytes > max_batch_bytes
+            or len(batch) >= max_batch_points
+        ):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(point)
+        batch_bytes += point_bytes
+
+    if batch:
+        yield batch
+
+
+def is_retryable_upload_error(error: Exception) -> bool:
+    """
+    Timeouts and connection errors surface as ResponseHandlingException,
+    overload and gateway errors as UnexpectedResponse with a 5xx/429 status.
+    """
+    if isinstance(error, ResponseHandlingException):
+        return True
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def upload_batch_with_retry(
+    client: QdrantClient,
+    collection_name: str,
+    batch: List[PointStruct],
+    wait: bool = UPLOAD_WAIT,
+    max_retries: int = UPLOAD_MAX_RETRIES,
+):
+    """
+    Upsert a single batch, retrying transient failures with exponential backoff.
+    """
+    for attempt in range(1, max_retries + 1):
+        try:
+            client.upsert(collection_name=collection_name, points=batch, wait=wait)
+            return len(batch)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable_upload_error(e):
+                raise
+            # 0.5s, 1s, 2s, ... capped at 30s
+            delay = min(0.5 * 2 ** (attempt - 1), 30.0)
+            print(
+                f"Batch of {len(batch)} points failed ({e.__class__.__name__}), "
+                f"retrying in {delay:.1f}s ({attempt}/{max_retries})"
+            )
+            time.sleep(delay)
+
+
+def wait_for_points(
+    client: QdrantClient,
+    collection_name: str,
+    expected_count: int,
+    timeout: float = 300.0,
+    poll_interval: float = 1.0,
+):
+    """
+    Consistency barrier for uploads sent with wait=False: block until the
+    collection reports at least expected_count points.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        count = client.count(collection_name=collection_name, exact=True).count
+        if count >= expected_count:
+            return count
+        if time.monotonic() > deadline:
+            raise TimeoutError(
+                f"Collection '{collection_name}' has {count} points after {timeout}s, "
+                f"expected {expected_count}"
+            )
+        time.sleep(poll_interval)
+
+
+def upload_in_batches(
+    client: QdrantClient,
+    collection_name: str,
+    points: Iterable[PointStruct],
+    max_batch_bytes: int = UPLOAD_MAX_BATCH_BYTES,
+    max_batch_points: int = UPLOAD_MAX_BATCH_POINTS,
+    parallel: int = UPLOAD_PARALLEL,
+    max_retries: int = UPLOAD_MAX_RETRIES,
+    wait: bool = UPLOAD_WAIT,
+    total: Optional[int] = None,
+    barrier: bool = True,
+):
+    """
+    Upload points to Qdrant in size-bounded batches with several requests
+    in flight, so throughput is bound by bandwidth rather than round trips.
+
+    points may be a list or any iterable; at most 2 * parallel batches are
+    held in memory at a time. total is only used for progress reporting.
+    With wait=False, barrier=True blocks until Qdrant has applied the points;
+    callers that upload in several calls pass barrier=False and call
+    wait_for_points once at the end.
+
+    Returns the number of uploaded points.
+    """
+    if total is None and hasattr(points, "__len__"):
+        total = len(points)
+
+    # Points already present, so the barrier knows what to wait for
+    initial_count = (
+        client.count(collection_name=collection_name, exact=True).count
+        if barrier and not wait
+        else 0
+    )
+
+    print(
+        f"Uploading {total if total is not None else 'all'} points to collection "
+        f"'{collection_name}' ({parallel} batches in flight)..."
+    )
+
+    uploaded = 0
+    with (
+        futures.ThreadPoolExecutor(max_workers=parallel) as executor,
+        tqdm(total=total) as progress,
+    ):
+        pending = set()
+        for batch in split_batches_by_size(points, max_batch_bytes, max_batch_points):
+            # Backpressure: keep the queue short instead of buffering everything
+            if len(pending) >= 2 * parallel:
+                done, pending = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    uploaded += future.result()
+                    progress.update(future.result())
+            pending.add(
+                executor.submit(
+                    upload_batch_with_retry,
+                    client,
+                    collection_name,
+                    batch,
+                    wait,
+                    max_retries,
+                )
+            )
+
+        for future in futures.as_completed(pending):
+            uploaded += future.result()
+            progress.update(future.result())
+
+    if barrier and not wait:
+        print("Waiting for Qdrant to apply all batches...")
+        wait_for_points(client, collection_name, initial_count + uploaded)
+
+    print(f"Successfully uploaded {uploaded} points to collection '{collection_name}'")
+    return uploaded